@@ -0,0 +1,221 @@
+"""Пакетная конвертация цветов из командной строки (без Tk)
+
+Примеры:
+    python color_cli.py --from rgb --to hsv colors.csv > hsv.csv
+    python color_cli.py --from rgb --to cmyk --input-format hex < palette.txt
+    cat pixels.bin | python color_cli.py --from rgb --to hsv --input-format raw --lut
+"""
+
+import argparse
+import itertools
+import sys
+import time
+
+import numpy as np
+
+from color_models import ColorConverter
+
+
+CHANNELS = {'rgb': 3, 'hsv': 3, 'cmyk': 4}
+
+# Бинарный формат: RGB - байты uint8, HSV/CMYK - float64 little-endian
+RAW_DTYPES = {'rgb': np.dtype(np.uint8), 'hsv': np.dtype('<f8'), 'cmyk': np.dtype('<f8')}
+
+
+class ColorStreamConverter:
+    """Потоковая конвертация блоками фиксированного размера"""
+
+    def __init__(self, source, target, chunk_size=65536, use_lut=False):
+        if source not in CHANNELS or target not in CHANNELS:
+            raise ValueError(f"Неизвестная модель: {source} -> {target}")
+
+        self.source = source
+        self.target = target
+        self.chunk_size = chunk_size
+        self.lut = None
+
+        if use_lut and source == 'rgb' and target != 'rgb':
+            # Импорт только по запросу, чтобы не замедлять старт
+            from color_lut import ColorLUT
+            self.lut = ColorLUT.shared(target)
+
+    def convert(self, values):
+        """Конвертация одного блока (N, channels) через RGB"""
+        if self.source == 'rgb':
+            rgb = np.asarray(values)
+            if rgb.dtype != np.uint8:
+                rgb = np.clip(rgb, 0, 255).astype(np.uint8)
+        elif self.source == 'hsv':
+            rgb = ColorConverter.hsv_to_rgb_array(values)
+        else:
+            rgb = ColorConverter.cmyk_to_rgb_array(values)
+
+        if self.target == 'rgb':
+            return rgb
+        if self.lut is not None:
+            return self.lut.convert(rgb)
+        if self.target == 'hsv':
+            return ColorConverter.rgb_to_hsv_array(rgb)
+        return ColorConverter.rgb_to_cmyk_array(rgb)
+
+    # --- Чтение ----------------------------------------------------------
+
+    def read_chunks(self, stream, input_format):
+        """Генератор блоков (N, channels) из текстового или бинарного потока"""
+        channels = CHANNELS[self.source]
+
+        if input_format == 'raw':
+            dtype = RAW_DTYPES[self.source]
+            record_size = dtype.itemsize * channels
+            while True:
+                data = self._read_exact(stream, record_size * self.chunk_size)
+                if not data:
+                    break
+                if len(data) % record_size:
+                    raise ValueError("Неполная запись в конце бинарного потока")
+                yield np.frombuffer(data, dtype=dtype).reshape(-1, channels)
+            return
+
+        # (номер строки, текст) - номер нужен для сообщений об ошибках
+        lines = ((number, line.strip()) for number, line in enumerate(stream, 1))
+        lines = ((number, line) for number, line in lines if line)
+
+        while True:
+            chunk = list(itertools.islice(lines, self.chunk_size))
+            if not chunk:
+                break
+            if input_format == 'hex':
+                yield self._parse_hex([line for _, line in chunk])
+            else:
+                yield self._parse_csv(chunk, channels)
+
+    @staticmethod
+    def _read_exact(stream, size):
+        """Чтение size байт (pipe может отдавать данные частями)"""
+        parts = []
+        while size > 0:
+            data = stream.read(size)
+            if not data:
+                break
+            parts.append(data)
+            size -= len(data)
+        return b''.join(parts)
+
+    @staticmethod
+    def _parse_csv(chunk, channels):
+        """Разбор строк 'v1,v2,...'; в каждой строке ровно channels значений"""
+        for number, line in chunk:
+            count = line.count(',') + 1
+            if count != channels:
+                raise ValueError(
+                    f"Строка {number}: ожидается {channels} значения, получено {count}")
+        return np.loadtxt([line for _, line in chunk], delimiter=',', ndmin=2)
+
+    def _parse_hex(self, lines):
+        """Разбор строк вида #RRGGBB / RRGGBB"""
+        if self.source != 'rgb':
+            raise ValueError("Формат hex поддерживается только для RGB")
+        digits = ''.join(line.lstrip('#') for line in lines)
+        if len(digits) != 6 * len(lines):
+            raise ValueError("Ожидаются строки вида #RRGGBB")
+        return np.frombuffer(bytes.fromhex(digits), dtype=np.uint8).reshape(-1, 3)
+
+    # --- Запись ----------------------------------------------------------
+
+    def write_chunk(self, stream, values, output_format):
+        """Запись одного блока в выходной поток"""
+        if output_format == 'raw':
+            stream.write(np.ascontiguousarray(values, dtype=RAW_DTYPES[self.target]).tobytes())
+        elif output_format == 'hex':
+            if self.target != 'rgb':
+                raise ValueError("Формат hex поддерживается только для RGB")
+            digits = np.ascontiguousarray(values, dtype=np.uint8).tobytes().hex()
+            stream.write(''.join(f"#{digits[i:i + 6]}\n" for i in range(0, len(digits), 6)))
+        else:
+            fmt = '%d' if self.target == 'rgb' else '%.2f'
+            np.savetxt(stream, values, fmt=fmt, delimiter=',')
+
+    def run(self, inputs, output, input_format, output_format):
+        """Конвертация всех входов, возвращает количество цветов"""
+        total = 0
+        for stream in inputs:
+            for chunk in self.read_chunks(stream, input_format):
+                self.write_chunk(output, self.convert(chunk), output_format)
+                total += len(chunk)
+        return total
+
+
+def open_inputs(paths, input_format):
+    """Генератор открытых входных потоков ('-' - stdin)"""
+    binary = input_format == 'raw'
+    for path in paths or ['-']:
+        if path == '-':
+            yield sys.stdin.buffer if binary else sys.stdin
+        else:
+            with open(path, 'rb' if binary else 'r') as stream:
+                yield stream
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Пакетная конвертация цветов RGB ↔ CMYK ↔ HSV без графического интерфейса")
+    parser.add_argument('inputs', nargs='*',
+                        help="входные файлы ('-' или пусто - стандартный ввод)")
+    parser.add_argument('--from', dest='source', choices=CHANNELS, default='rgb',
+                        help="исходная модель (по умолчанию rgb)")
+    parser.add_argument('--to', dest='target', choices=CHANNELS, required=True,
+                        help="целевая модель")
+    parser.add_argument('--input-format', choices=('csv', 'hex', 'raw'), default='csv',
+                        help="формат входа: csv, hex (#RRGGBB) или raw (бинарный)")
+    parser.add_argument('--output-format', choices=('csv', 'hex', 'raw'), default='csv',
+                        help="формат выхода")
+    parser.add_argument('-o', '--output', default='-',
+                        help="выходной файл ('-' - стандартный вывод)")
+    parser.add_argument('--chunk-size', type=int, default=65536,
+                        help="количество цветов в одном блоке (ограничивает память)")
+    parser.add_argument('--lut', action='store_true',
+                        help="использовать предвычисленную таблицу для RGB → HSV/CMYK")
+    parser.add_argument('--stats', action='store_true',
+                        help="вывести статистику в stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.chunk_size <= 0:
+        print("Ошибка: --chunk-size должен быть положительным", file=sys.stderr)
+        return 2
+
+    converter = ColorStreamConverter(args.source, args.target, args.chunk_size, args.lut)
+    binary = args.output_format == 'raw'
+
+    if args.output == '-':
+        output = sys.stdout.buffer if binary else sys.stdout
+        close_output = False
+    else:
+        output = open(args.output, 'wb' if binary else 'w')
+        close_output = True
+
+    start = time.perf_counter()
+    try:
+        total = converter.run(open_inputs(args.inputs, args.input_format), output,
+                              args.input_format, args.output_format)
+    except (ValueError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if close_output:
+            output.close()
+        else:
+            output.flush()
+
+    if args.stats:
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else 0
+        print(f"Сконвертировано {total} цветов за {elapsed:.3f} с ({rate:,.0f} цветов/с)",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,113 +2,19 @@ import tkinter as tk
 from tkinter import ttk, colorchooser, messagebox
 import math
 
-
-class ColorConverter:
-    """Класс для конвертации цветов между различными цветовыми моделями"""
-    
-    @staticmethod
-    def rgb_to_hsv(r, g, b):
-        """Конвертация RGB в HSV"""
-        r, g, b = r/255.0, g/255.0, b/255.0
-        
-        max_val = max(r, g, b)
-        min_val = min(r, g, b)
-        diff = max_val - min_val
-        
-        # Value
-        v = max_val
-        
-        # Saturation
-        s = 0 if max_val == 0 else diff / max_val
-        
-        # Hue
-        if diff == 0:
-            h = 0
-        elif max_val == r:
-            h = (60 * ((g - b) / diff) + 360) % 360
-        elif max_val == g:
-            h = (60 * ((b - r) / diff) + 120) % 360
-        else:  # max_val == b
-            h = (60 * ((r - g) / diff) + 240) % 360
-        
-        return round(h, 2), round(s * 100, 2), round(v * 100, 2)
-    
-    @staticmethod
-    def hsv_to_rgb(h, s, v):
-        """Конвертация HSV в RGB"""
-        h = h % 360
-        s = max(0, min(100, s)) / 100.0
-        v = max(0, min(100, v)) / 100.0
-        
-        c = v * s
-        x = c * (1 - abs((h / 60) % 2 - 1))
-        m = v - c
-        
-        if 0 <= h < 60:
-            r, g, b = c, x, 0
-        elif 60 <= h < 120:
-            r, g, b = x, c, 0
-        elif 120 <= h < 180:
-            r, g, b = 0, c, x
-        elif 180 <= h < 240:
-            r, g, b = 0, x, c
-        elif 240 <= h < 300:
-            r, g, b = x, 0, c
-        else:
-            r, g, b = c, 0, x
-        
-        r = int(round((r + m) * 255))
-        g = int(round((g + m) * 255))
-        b = int(round((b + m) * 255))
-        
-        # Ограничиваем значения в пределах 0-255
-        r = max(0, min(255, r))
-        g = max(0, min(255, g))
-        b = max(0, min(255, b))
-        
-        return r, g, b
-    
-    @staticmethod
-    def rgb_to_cmyk(r, g, b):
-        """Конвертация RGB в CMYK"""
-        if r == 0 and g == 0 and b == 0:
-            return 0, 0, 0, 100
-        
-        r, g, b = r/255.0, g/255.0, b/255.0
-        
-        k = 1 - max(r, g, b)
-        c = (1 - r - k) / (1 - k) if k != 1 else 0
-        m = (1 - g - k) / (1 - k) if k != 1 else 0
-        y = (1 - b - k) / (1 - k) if k != 1 else 0
-        
-        return round(c * 100, 2), round(m * 100, 2), round(y * 100, 2), round(k * 100, 2)
-    
-    @staticmethod
-    def cmyk_to_rgb(c, m, y, k):
-        """Конвертация CMYK в RGB"""
-        c = max(0, min(100, c)) / 100.0
-        m = max(0, min(100, m)) / 100.0
-        y = max(0, min(100, y)) / 100.0
-        k = max(0, min(100, k)) / 100.0
-        
-        r = 255 * (1 - c) * (1 - k)
-        g = 255 * (1 - m) * (1 - k)
-        b = 255 * (1 - y) * (1 - k)
-        
-        r = int(round(max(0, min(255, r))))
-        g = int(round(max(0, min(255, g))))
-        b = int(round(max(0, min(255, b))))
-        
-        return r, g, b
+from color_models import ColorConverter
 
 
 class ColorConverterApp:
     """Основной класс приложения для конвертации цветов"""
     
+    # Допустимые диапазоны L, a, b
+    LAB_RANGES = [(0, 100), (-128, 127), (-128, 127)]
+    
     def __init__(self, root):
         self.root = root
-        self.root.title("Конвертер цветов RGB ↔ CMYK ↔ HSV")
-        self.root.geometry("900x800")
+        self.root.title("Конвертер цветов RGB ↔ CMYK ↔ HSV ↔ Lab")
+        self.root.geometry("1150x800")
         self.root.resizable(True, True)
         self.root.configure(bg='#f0f0f0')
         
@@ -121,6 +27,13 @@ class ColorConverterApp:
         # Размер круглого индикатора цвета
         self.circle_size = 150
         
+        # Отложенное обновление: серия событий ползунка схлопывается
+        # в один проход через after_idle
+        self.pending_source = None
+        self.pending_after_id = None
+        self.preview_color = None
+        self.update_stats = {'events': 0, 'passes': 0, 'coalesced': 0, 'skipped': 0}
+        
         self.setup_ui()
         self.update_all_from_rgb()
     
@@ -174,18 +87,24 @@ class ColorConverterApp:
         bottom_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Настройка колонок с одинаковым весом
-        for i in range(3):
+        for i in range(4):
             bottom_frame.columnconfigure(i, weight=1)
         
-        # Создаем три колонки
+        # Создаем четыре колонки
         self.setup_rgb_column(bottom_frame, 0)
         self.setup_cmyk_column(bottom_frame, 1) 
         self.setup_hsv_column(bottom_frame, 2)
+        self.setup_lab_column(bottom_frame, 3)
         
         # Статус бар для предупреждений
         self.status_var = tk.StringVar()
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, foreground="red", font=("Arial", 10))
         status_bar.grid(row=2, column=0, pady=(20, 0))
+        
+        # Статистика отложенных обновлений
+        self.stats_var = tk.StringVar()
+        stats_label = ttk.Label(main_frame, textvariable=self.stats_var, foreground="#888888", font=("Arial", 8))
+        stats_label.grid(row=3, column=0, pady=(5, 0))
     
     def setup_rgb_column(self, parent, column):
         """Создание колонки RGB"""
@@ -291,6 +210,42 @@ class ColorConverterApp:
                 self.hsv_scales = []
             self.hsv_scales.append(scale)
     
+    def setup_lab_column(self, parent, column):
+        """Создание колонки CIE L*a*b*"""
+        
+        # Контейнер колонки
+        lab_frame = ttk.LabelFrame(parent, text="CIE L*a*b* (D65)", padding="15")
+        lab_frame.grid(row=0, column=column, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10)
+        lab_frame.columnconfigure(1, weight=1)
+        
+        # Поля ввода Lab
+        self.lab_vars = [tk.StringVar(), tk.StringVar(), tk.StringVar()]
+        self.lab_entries = []
+        self.lab_scales = []
+        lab_labels = ["L (0-100):", "a (-128-127):", "b (-128-127):"]
+        
+        for i, (label, (min_val, max_val)) in enumerate(zip(lab_labels, self.LAB_RANGES)):
+            # Метка
+            label_widget = ttk.Label(lab_frame, text=label, font=("Arial", 10, "bold"))
+            label_widget.grid(row=i*3, column=0, sticky=tk.W, pady=(5, 0))
+            
+            # Поле ввода
+            entry = ttk.Entry(lab_frame, textvariable=self.lab_vars[i], width=8, font=("Arial", 10))
+            entry.grid(row=i*3, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=(5, 0))
+            entry.bind('<KeyRelease>', lambda e, idx=i: self.on_lab_change(idx))
+            self.lab_entries.append(entry)
+            
+            # Ползунок
+            scale = ttk.Scale(lab_frame, from_=min_val, to=max_val, orient=tk.HORIZONTAL, length=220,
+                             command=lambda val, idx=i: self.on_lab_scale_change(idx, val))
+            scale.grid(row=i*3+1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 10))
+            self.lab_scales.append(scale)
+        
+        # XYZ только для просмотра
+        self.xyz_var = tk.StringVar()
+        xyz_label = ttk.Label(lab_frame, textvariable=self.xyz_var, font=("Arial", 9))
+        xyz_label.grid(row=9, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+    
     def clear_status(self):
         """Очистить статус бар"""
         self.status_var.set("")
@@ -343,6 +298,20 @@ class ColorConverterApp:
         except ValueError:
             return None
     
+    def validate_lab_value(self, value, component, min_val, max_val):
+        """Валидация значения Lab"""
+        try:
+            val = float(value)
+            if val < min_val:
+                self.set_status(f"Предупреждение: {component} < {min_val}, значение обрезано до {min_val}")
+                return min_val
+            elif val > max_val:
+                self.set_status(f"Предупреждение: {component} > {max_val}, значение обрезано до {max_val}")
+                return max_val
+            return val
+        except ValueError:
+            return None
+    
     def choose_color(self):
         """Выбор цвета из палитры"""
         color = colorchooser.askcolor(title="Выберите цвет")
@@ -355,6 +324,10 @@ class ColorConverterApp:
         """Обновление круглого превью цвета"""
         r, g, b = self.current_color
         hex_color = f"#{r:02x}{g:02x}{b:02x}"
+        if hex_color == self.preview_color:
+            self.update_stats['skipped'] += 1
+            return
+        self.preview_color = hex_color
         
         # Обновляем цвет круга
         self.color_canvas.itemconfig(self.color_circle, fill=hex_color)
@@ -390,12 +363,7 @@ class ColorConverterApp:
         if self.updating:
             return
         
-        val = int(float(value))
-        self.current_color[index] = val
-        self.updating = True
-        self.rgb_vars[index].set(str(val))
-        self.updating = False
-        self.update_cmyk_hsv_from_rgb()
+        self.schedule_update('rgb')
     
     def on_cmyk_change(self, index):
         """Обработчик изменения CMYK через поля ввода"""
@@ -438,24 +406,7 @@ class ColorConverterApp:
         if self.updating:
             return
         
-        values = []
-        for i in range(4):
-            if i == index:
-                val = float(value)
-            else:
-                val = self.cmyk_scales[i].get()
-            values.append(val)
-        
-        # Конвертируем в RGB
-        r, g, b = ColorConverter.cmyk_to_rgb(*values)
-        self.current_color = [r, g, b]
-        
-        self.updating = True
-        for i, val in enumerate(values):
-            self.cmyk_vars[i].set(f"{val:.2f}")
-        self.updating = False
-        
-        self.update_rgb_hsv_from_current()
+        self.schedule_update('cmyk')
     
     def on_hsv_change(self, index):
         """Обработчик изменения HSV через поля ввода"""
@@ -499,24 +450,130 @@ class ColorConverterApp:
         if self.updating:
             return
         
-        values = []
-        for i in range(3):
-            if i == index:
-                val = float(value)
-            else:
-                val = self.hsv_scales[i].get()
-            values.append(val)
+        self.schedule_update('hsv')
+    
+    def on_lab_change(self, index):
+        """Обработчик изменения Lab через поля ввода"""
+        if self.updating:
+            return
         
-        # Конвертируем в RGB
-        r, g, b = ColorConverter.hsv_to_rgb(*values)
-        self.current_color = [r, g, b]
+        value = self.lab_vars[index].get()
+        if value == "":
+            return
         
-        self.updating = True
-        for i, val in enumerate(values):
-            self.hsv_vars[i].set(f"{val:.2f}")
-        self.updating = False
+        components = ["L", "a", "b"]
+        min_val, max_val = self.LAB_RANGES[index]
+        validated_value = self.validate_lab_value(value, components[index], min_val, max_val)
         
-        self.update_rgb_cmyk_from_current()
+        if validated_value is not None:
+            # Получаем все значения Lab
+            values = []
+            for i in range(3):
+                if i == index:
+                    values.append(validated_value)
+                else:
+                    low, high = self.LAB_RANGES[i]
+                    try:
+                        val = float(self.lab_vars[i].get()) if self.lab_vars[i].get() else 0
+                        values.append(max(low, min(high, val)))
+                    except ValueError:
+                        values.append(0)
+            
+            # Конвертируем в RGB (цвета вне охвата sRGB обрезаются)
+            r, g, b = ColorConverter.lab_to_rgb(*values)
+            self.current_color = [r, g, b]
+            
+            self.updating = True
+            self.lab_vars[index].set(f"{validated_value:.2f}")
+            self.lab_scales[index].set(validated_value)
+            self.updating = False
+            
+            self.update_rgb_cmyk_hsv_from_current()
+    
+    def on_lab_scale_change(self, index, value):
+        """Обработчик изменения Lab через ползунки"""
+        if self.updating:
+            return
+        
+        self.schedule_update('lab')
+    
+    def schedule_update(self, source):
+        """Планирование одного обновления на серию событий ползунков"""
+        self.update_stats['events'] += 1
+        
+        if self.pending_after_id is not None:
+            # Источником истины становится модель, изменённая последней,
+            # остальные колонки всё равно будут пересчитаны из неё
+            self.pending_source = source
+            self.update_stats['coalesced'] += 1
+            return
+        
+        self.pending_source = source
+        self.pending_after_id = self.root.after_idle(self.flush_update)
+    
+    def flush_update(self):
+        """Один проход обновления по текущим значениям ползунков"""
+        source = self.pending_source
+        self.pending_source = None
+        self.pending_after_id = None
+        if source is None:
+            return
+        
+        self.update_stats['passes'] += 1
+        
+        if source == 'rgb':
+            self.current_color = [int(float(scale.get())) for scale in self.rgb_scales]
+            self.updating = True
+            for i, val in enumerate(self.current_color):
+                self.set_var(self.rgb_vars[i], str(val))
+            self.updating = False
+            self.update_cmyk_hsv_from_rgb()
+        elif source == 'cmyk':
+            values = [float(scale.get()) for scale in self.cmyk_scales]
+            r, g, b = ColorConverter.cmyk_to_rgb(*values)
+            self.current_color = [r, g, b]
+            self.updating = True
+            for i, val in enumerate(values):
+                self.set_var(self.cmyk_vars[i], f"{val:.2f}")
+            self.updating = False
+            self.update_rgb_hsv_from_current()
+        elif source == 'hsv':
+            values = [float(scale.get()) for scale in self.hsv_scales]
+            r, g, b = ColorConverter.hsv_to_rgb(*values)
+            self.current_color = [r, g, b]
+            self.updating = True
+            for i, val in enumerate(values):
+                self.set_var(self.hsv_vars[i], f"{val:.2f}")
+            self.updating = False
+            self.update_rgb_cmyk_from_current()
+        else:
+            values = [float(scale.get()) for scale in self.lab_scales]
+            r, g, b = ColorConverter.lab_to_rgb(*values)
+            self.current_color = [r, g, b]
+            self.updating = True
+            for i, val in enumerate(values):
+                self.set_var(self.lab_vars[i], f"{val:.2f}")
+            self.updating = False
+            self.update_rgb_cmyk_hsv_from_current()
+        
+        stats = self.update_stats
+        self.stats_var.set(
+            f"Событий: {stats['events']}, проходов: {stats['passes']}, "
+            f"схлопнуто: {stats['coalesced']}, пропущено виджетов: {stats['skipped']}")
+    
+    def set_var(self, var, text):
+        """Установка StringVar только при изменении значения"""
+        if var.get() == text:
+            self.update_stats['skipped'] += 1
+            return
+        var.set(text)
+    
+    def set_scale(self, scale, value):
+        """Установка ползунка только при изменении значения"""
+        if abs(float(scale.get()) - value) < 1e-9:
+            self.update_stats['skipped'] += 1
+            return
+        scale.set(value)
     
     def update_all_from_rgb(self):
         """Обновить все модели из текущего RGB"""
@@ -524,23 +581,24 @@ class ColorConverterApp:
         
         # Обновляем RGB
         for i, val in enumerate(self.current_color):
-            self.rgb_vars[i].set(str(val))
-            self.rgb_scales[i].set(val)
+            self.set_var(self.rgb_vars[i], str(val))
+            self.set_scale(self.rgb_scales[i], val)
         
         # Обновляем CMYK
         c, m, y, k = ColorConverter.rgb_to_cmyk(*self.current_color)
         cmyk_values = [c, m, y, k]
         for i, val in enumerate(cmyk_values):
-            self.cmyk_vars[i].set(f"{val:.2f}")
-            self.cmyk_scales[i].set(val)
+            self.set_var(self.cmyk_vars[i], f"{val:.2f}")
+            self.set_scale(self.cmyk_scales[i], val)
         
         # Обновляем HSV
         h, s, v = ColorConverter.rgb_to_hsv(*self.current_color)
         hsv_values = [h, s, v]
         for i, val in enumerate(hsv_values):
-            self.hsv_vars[i].set(f"{val:.2f}")
-            self.hsv_scales[i].set(val)
+            self.set_var(self.hsv_vars[i], f"{val:.2f}")
+            self.set_scale(self.hsv_scales[i], val)
         
+        self.update_lab_from_current()
         self.update_color_preview()
         self.updating = False
     
@@ -552,16 +610,17 @@ class ColorConverterApp:
         c, m, y, k = ColorConverter.rgb_to_cmyk(*self.current_color)
         cmyk_values = [c, m, y, k]
         for i, val in enumerate(cmyk_values):
-            self.cmyk_vars[i].set(f"{val:.2f}")
-            self.cmyk_scales[i].set(val)
+            self.set_var(self.cmyk_vars[i], f"{val:.2f}")
+            self.set_scale(self.cmyk_scales[i], val)
         
         # Обновляем HSV
         h, s, v = ColorConverter.rgb_to_hsv(*self.current_color)
         hsv_values = [h, s, v]
         for i, val in enumerate(hsv_values):
-            self.hsv_vars[i].set(f"{val:.2f}")
-            self.hsv_scales[i].set(val)
+            self.set_var(self.hsv_vars[i], f"{val:.2f}")
+            self.set_scale(self.hsv_scales[i], val)
         
+        self.update_lab_from_current()
         self.update_color_preview()
         self.updating = False
     
@@ -571,16 +630,17 @@ class ColorConverterApp:
         
         # Обновляем RGB
         for i, val in enumerate(self.current_color):
-            self.rgb_vars[i].set(str(val))
-            self.rgb_scales[i].set(val)
+            self.set_var(self.rgb_vars[i], str(val))
+            self.set_scale(self.rgb_scales[i], val)
         
         # Обновляем HSV
         h, s, v = ColorConverter.rgb_to_hsv(*self.current_color)
         hsv_values = [h, s, v]
         for i, val in enumerate(hsv_values):
-            self.hsv_vars[i].set(f"{val:.2f}")
-            self.hsv_scales[i].set(val)
+            self.set_var(self.hsv_vars[i], f"{val:.2f}")
+            self.set_scale(self.hsv_scales[i], val)
         
+        self.update_lab_from_current()
         self.update_color_preview()
         self.updating = False
     
@@ -590,18 +650,60 @@ class ColorConverterApp:
         
         # Обновляем RGB
         for i, val in enumerate(self.current_color):
-            self.rgb_vars[i].set(str(val))
-            self.rgb_scales[i].set(val)
+            self.set_var(self.rgb_vars[i], str(val))
+            self.set_scale(self.rgb_scales[i], val)
+        
+        # Обновляем CMYK
+        c, m, y, k = ColorConverter.rgb_to_cmyk(*self.current_color)
+        cmyk_values = [c, m, y, k]
+        for i, val in enumerate(cmyk_values):
+            self.set_var(self.cmyk_vars[i], f"{val:.2f}")
+            self.set_scale(self.cmyk_scales[i], val)
+        
+        self.update_lab_from_current()
+        self.update_color_preview()
+        self.updating = False
+    
+    def update_rgb_cmyk_hsv_from_current(self):
+        """Обновить RGB, CMYK и HSV из текущего цвета (после изменения Lab)"""
+        self.updating = True
+        
+        # Обновляем RGB
+        for i, val in enumerate(self.current_color):
+            self.set_var(self.rgb_vars[i], str(val))
+            self.set_scale(self.rgb_scales[i], val)
         
         # Обновляем CMYK
         c, m, y, k = ColorConverter.rgb_to_cmyk(*self.current_color)
         cmyk_values = [c, m, y, k]
         for i, val in enumerate(cmyk_values):
-            self.cmyk_vars[i].set(f"{val:.2f}")
-            self.cmyk_scales[i].set(val)
+            self.set_var(self.cmyk_vars[i], f"{val:.2f}")
+            self.set_scale(self.cmyk_scales[i], val)
         
+        # Обновляем HSV
+        h, s, v = ColorConverter.rgb_to_hsv(*self.current_color)
+        hsv_values = [h, s, v]
+        for i, val in enumerate(hsv_values):
+            self.set_var(self.hsv_vars[i], f"{val:.2f}")
+            self.set_scale(self.hsv_scales[i], val)
+        
+        self.update_xyz_label()
         self.update_color_preview()
         self.updating = False
+    
+    def update_lab_from_current(self):
+        """Обновить Lab и XYZ из текущего цвета"""
+        lab_values = ColorConverter.rgb_to_lab(*self.current_color)
+        for i, val in enumerate(lab_values):
+            self.set_var(self.lab_vars[i], f"{val:.2f}")
+            self.set_scale(self.lab_scales[i], val)
+        
+        self.update_xyz_label()
+    
+    def update_xyz_label(self):
+        """Обновить строку XYZ из текущего цвета"""
+        x, y, z = ColorConverter.rgb_to_xyz(*self.current_color)
+        self.set_var(self.xyz_var, f"XYZ: {x:.2f}, {y:.2f}, {z:.2f}")
 
 
 def main():
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from color_models import ColorConverter
+
+
+class ColorLUT:
+    """Предвычисленная таблица RGB → HSV/CMYK для всех 2^24 цветов
+
+    Значения хранятся в uint16 как round(x, 2) * 100, поэтому после деления
+    на 100 они совпадают с результатами ColorConverter бит в бит.
+    Таблица сохраняется в .npy файл и открывается через memmap: повторный
+    запуск загружает её мгновенно, а процессы разделяют одни и те же страницы.
+    """
+
+    VERSION = 1
+    SIZE = 1 << 24
+    BUILD_CHUNK = 1 << 20
+
+    MODELS = {
+        'hsv': (ColorConverter.rgb_to_hsv_array, 3),
+        'cmyk': (ColorConverter.rgb_to_cmyk_array, 4),
+    }
+
+    _instances = {}
+
+    def __init__(self, model='hsv', cache_dir=None):
+        if model not in self.MODELS:
+            raise ValueError(f"Неизвестная модель: {model}")
+
+        self.model = model
+        self.cache_dir = cache_dir or self.default_cache_dir()
+        self.path = os.path.join(
+            self.cache_dir, f"rgb_to_{model}_v{self.VERSION}.npy")
+
+        if not os.path.exists(self.path):
+            self.build()
+
+        self.table = np.load(self.path, mmap_mode='r')
+
+    @classmethod
+    def shared(cls, model='hsv', cache_dir=None):
+        """Одна таблица на процесс для каждой модели и каталога кэша"""
+        key = (model, cache_dir)
+        if key not in cls._instances:
+            cls._instances[key] = cls(model, cache_dir)
+        return cls._instances[key]
+
+    @staticmethod
+    def default_cache_dir():
+        """Каталог кэша по умолчанию (~/.cache/color_converter)"""
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+            os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'color_converter')
+
+    def build(self):
+        """Построение таблицы и атомарная запись в файл кэша"""
+        convert, channels = self.MODELS[self.model]
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        table = np.lib.format.open_memmap(
+            tmp_path, mode='w+', dtype=np.uint16, shape=(self.SIZE, channels))
+
+        try:
+            for start in range(0, self.SIZE, self.BUILD_CHUNK):
+                index = np.arange(start, start + self.BUILD_CHUNK, dtype=np.uint32)
+                rgb = np.stack([index >> 16, (index >> 8) & 0xFF, index & 0xFF],
+                               axis=-1)
+                values = convert(rgb)
+                table[start:start + self.BUILD_CHUNK] = np.rint(values * 100)
+            table.flush()
+        except BaseException:
+            del table
+            os.remove(tmp_path)
+            raise
+
+        del table
+        # Несколько процессов могут строить таблицу одновременно -
+        # побеждает последний, файл всегда целостный
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def pack_indices(rgb):
+        """Массив RGB (..., 3) в индексы таблицы (r << 16 | g << 8 | b)"""
+        arr = np.asarray(rgb)
+        if arr.shape[-1:] != (3,):
+            raise ValueError(f"Ожидается массив формы (..., 3), получено {arr.shape}")
+        if arr.dtype != np.uint8:
+            if arr.size and (arr.min() < 0 or arr.max() > 255):
+                raise ValueError("Значения RGB должны быть в диапазоне 0-255")
+            arr = arr.astype(np.uint8)
+
+        arr = arr.astype(np.uint32)
+        return (arr[..., 0] << 16) | (arr[..., 1] << 8) | arr[..., 2]
+
+    def lookup_raw(self, rgb):
+        """Квантованные значения uint16 (значение * 100) без декодирования"""
+        return self.table[self.pack_indices(rgb)]
+
+    def convert(self, rgb):
+        """Конвертация массива RGB (..., 3), результат как у *_array методов"""
+        return self.lookup_raw(rgb) / 100
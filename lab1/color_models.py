@@ -0,0 +1,321 @@
+import numpy as np
+
+
+class ColorConverter:
+    """Класс для конвертации цветов между различными цветовыми моделями"""
+    
+    @staticmethod
+    def rgb_to_hsv(r, g, b):
+        """Конвертация RGB в HSV"""
+        r, g, b = r/255.0, g/255.0, b/255.0
+        
+        max_val = max(r, g, b)
+        min_val = min(r, g, b)
+        diff = max_val - min_val
+        
+        # Value
+        v = max_val
+        
+        # Saturation
+        s = 0 if max_val == 0 else diff / max_val
+        
+        # Hue
+        if diff == 0:
+            h = 0
+        elif max_val == r:
+            h = (60 * ((g - b) / diff) + 360) % 360
+        elif max_val == g:
+            h = (60 * ((b - r) / diff) + 120) % 360
+        else:  # max_val == b
+            h = (60 * ((r - g) / diff) + 240) % 360
+        
+        return round(h, 2), round(s * 100, 2), round(v * 100, 2)
+    
+    @staticmethod
+    def hsv_to_rgb(h, s, v):
+        """Конвертация HSV в RGB"""
+        h = h % 360
+        s = max(0, min(100, s)) / 100.0
+        v = max(0, min(100, v)) / 100.0
+        
+        c = v * s
+        x = c * (1 - abs((h / 60) % 2 - 1))
+        m = v - c
+        
+        if 0 <= h < 60:
+            r, g, b = c, x, 0
+        elif 60 <= h < 120:
+            r, g, b = x, c, 0
+        elif 120 <= h < 180:
+            r, g, b = 0, c, x
+        elif 180 <= h < 240:
+            r, g, b = 0, x, c
+        elif 240 <= h < 300:
+            r, g, b = x, 0, c
+        else:
+            r, g, b = c, 0, x
+        
+        r = int(round((r + m) * 255))
+        g = int(round((g + m) * 255))
+        b = int(round((b + m) * 255))
+        
+        # Ограничиваем значения в пределах 0-255
+        r = max(0, min(255, r))
+        g = max(0, min(255, g))
+        b = max(0, min(255, b))
+        
+        return r, g, b
+    
+    @staticmethod
+    def rgb_to_cmyk(r, g, b):
+        """Конвертация RGB в CMYK"""
+        if r == 0 and g == 0 and b == 0:
+            return 0, 0, 0, 100
+        
+        r, g, b = r/255.0, g/255.0, b/255.0
+        
+        k = 1 - max(r, g, b)
+        c = (1 - r - k) / (1 - k) if k != 1 else 0
+        m = (1 - g - k) / (1 - k) if k != 1 else 0
+        y = (1 - b - k) / (1 - k) if k != 1 else 0
+        
+        return round(c * 100, 2), round(m * 100, 2), round(y * 100, 2), round(k * 100, 2)
+    
+    @staticmethod
+    def cmyk_to_rgb(c, m, y, k):
+        """Конвертация CMYK в RGB"""
+        c = max(0, min(100, c)) / 100.0
+        m = max(0, min(100, m)) / 100.0
+        y = max(0, min(100, y)) / 100.0
+        k = max(0, min(100, k)) / 100.0
+        
+        r = 255 * (1 - c) * (1 - k)
+        g = 255 * (1 - m) * (1 - k)
+        b = 255 * (1 - y) * (1 - k)
+        
+        r = int(round(max(0, min(255, r))))
+        g = int(round(max(0, min(255, g))))
+        b = int(round(max(0, min(255, b))))
+        
+        return r, g, b
+    
+    # ------------------------------------------------------------------
+    # Векторизованные варианты для массивов (N, 3), (N, 4) и (H, W, 3).
+    # Порядок арифметических операций повторяет скалярные методы, поэтому
+    # результаты совпадают с ними бит в бит, включая округление и обрезку.
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _split_channels(values, channels):
+        """Разбиение массива (..., channels) на отдельные каналы float64"""
+        arr = np.asarray(values, dtype=np.float64)
+        if arr.shape[-1:] != (channels,):
+            raise ValueError(
+                f"Ожидается массив формы (..., {channels}), получено {arr.shape}")
+        return [arr[..., i] for i in range(channels)]
+    
+    @staticmethod
+    def _round2(values):
+        """Округление до двух знаков, как round(x, 2) для float"""
+        return np.round(values * 100) / 100
+    
+    @staticmethod
+    def rgb_to_hsv_array(rgb):
+        """Конвертация массива RGB (..., 3) в HSV (..., 3), float64"""
+        r, g, b = ColorConverter._split_channels(rgb, 3)
+        r, g, b = r / 255.0, g / 255.0, b / 255.0
+        
+        max_val = np.maximum(np.maximum(r, g), b)
+        min_val = np.minimum(np.minimum(r, g), b)
+        diff = max_val - min_val
+        
+        v = max_val
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = np.where(max_val == 0, 0.0, diff / max_val)
+            h_r = (60 * ((g - b) / diff) + 360) % 360
+            h_g = (60 * ((b - r) / diff) + 120) % 360
+            h_b = (60 * ((r - g) / diff) + 240) % 360
+        
+        # Приоритет веток такой же, как в rgb_to_hsv: diff == 0, затем R, G, B
+        h = np.where(diff == 0, 0.0,
+                     np.where(max_val == r, h_r,
+                              np.where(max_val == g, h_g, h_b)))
+        
+        return np.stack([ColorConverter._round2(h),
+                         ColorConverter._round2(s * 100),
+                         ColorConverter._round2(v * 100)], axis=-1)
+    
+    @staticmethod
+    def hsv_to_rgb_array(hsv):
+        """Конвертация массива HSV (..., 3) в RGB (..., 3), uint8"""
+        h, s, v = ColorConverter._split_channels(hsv, 3)
+        h = h % 360
+        s = np.clip(s, 0, 100) / 100.0
+        v = np.clip(v, 0, 100) / 100.0
+        
+        c = v * s
+        x = c * (1 - np.abs((h / 60) % 2 - 1))
+        m = v - c
+        zero = np.zeros_like(c)
+        
+        sector = np.clip((h // 60).astype(np.intp), 0, 5)
+        r = np.choose(sector, [c, x, zero, zero, x, c])
+        g = np.choose(sector, [x, c, c, x, zero, zero])
+        b = np.choose(sector, [zero, zero, x, c, c, x])
+        
+        rgb = np.stack([r + m, g + m, b + m], axis=-1)
+        return np.clip(np.round(rgb * 255), 0, 255).astype(np.uint8)
+    
+    @staticmethod
+    def rgb_to_cmyk_array(rgb):
+        """Конвертация массива RGB (..., 3) в CMYK (..., 4), float64"""
+        r, g, b = ColorConverter._split_channels(rgb, 3)
+        black = (r == 0) & (g == 0) & (b == 0)
+        r, g, b = r / 255.0, g / 255.0, b / 255.0
+        
+        k = 1 - np.maximum(np.maximum(r, g), b)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            c = np.where(k != 1, (1 - r - k) / (1 - k), 0.0)
+            m = np.where(k != 1, (1 - g - k) / (1 - k), 0.0)
+            y = np.where(k != 1, (1 - b - k) / (1 - k), 0.0)
+        
+        cmyk = np.stack([ColorConverter._round2(c * 100),
+                         ColorConverter._round2(m * 100),
+                         ColorConverter._round2(y * 100),
+                         ColorConverter._round2(k * 100)], axis=-1)
+        cmyk[black] = (0, 0, 0, 100)
+        return cmyk
+    
+    @staticmethod
+    def cmyk_to_rgb_array(cmyk):
+        """Конвертация массива CMYK (..., 4) в RGB (..., 3), uint8"""
+        c, m, y, k = ColorConverter._split_channels(cmyk, 4)
+        c = np.clip(c, 0, 100) / 100.0
+        m = np.clip(m, 0, 100) / 100.0
+        y = np.clip(y, 0, 100) / 100.0
+        k = np.clip(k, 0, 100) / 100.0
+        
+        r = 255 * (1 - c) * (1 - k)
+        g = 255 * (1 - m) * (1 - k)
+        b = 255 * (1 - y) * (1 - k)
+        
+        rgb = np.stack([r, g, b], axis=-1)
+        return np.round(np.clip(rgb, 0, 255)).astype(np.uint8)
+    
+    # ------------------------------------------------------------------
+    # CIE XYZ и L*a*b* (sRGB, опорный белый D65).
+    # XYZ в диапазоне 0-100, L 0-100, a и b примерно от -128 до 127.
+    # ------------------------------------------------------------------
+    
+    # Линеаризация гаммы sRGB для всех 256 значений канала
+    _srgb = np.arange(256) / 255.0
+    SRGB_TO_LINEAR = np.where(_srgb <= 0.04045, _srgb / 12.92,
+                              ((_srgb + 0.055) / 1.055) ** 2.4)
+    del _srgb
+    
+    RGB_TO_XYZ = np.array([
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ])
+    XYZ_TO_RGB = np.linalg.inv(RGB_TO_XYZ)
+    
+    WHITE_D65 = np.array([0.95047, 1.0, 1.08883])
+    
+    _LAB_EPSILON = (6 / 29) ** 3
+    _LAB_KAPPA = 3 * (6 / 29) ** 2
+    
+    @staticmethod
+    def _linearize(rgb):
+        """Линейные значения sRGB (0-1): таблица для целых, формула для дробных"""
+        arr = np.asarray(rgb)
+        if arr.shape[-1:] != (3,):
+            raise ValueError(f"Ожидается массив формы (..., 3), получено {arr.shape}")
+        if np.issubdtype(arr.dtype, np.integer):
+            return ColorConverter.SRGB_TO_LINEAR[np.clip(arr, 0, 255)]
+        c = np.clip(arr, 0, 255) / 255.0
+        return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    
+    @staticmethod
+    def _delinearize(linear):
+        """Линейные значения (0-1) в sRGB uint8"""
+        c = np.clip(linear, 0, 1)
+        c = np.where(c <= 0.0031308, c * 12.92, 1.055 * c ** (1 / 2.4) - 0.055)
+        return np.clip(np.round(c * 255), 0, 255).astype(np.uint8)
+    
+    @staticmethod
+    def _xyz_to_lab(xyz):
+        """XYZ (0-1) в L*a*b* без округления"""
+        t = xyz / ColorConverter.WHITE_D65
+        f = np.where(t > ColorConverter._LAB_EPSILON, np.cbrt(t),
+                     t / ColorConverter._LAB_KAPPA + 4 / 29)
+        L = 116 * f[..., 1] - 16
+        a = 500 * (f[..., 0] - f[..., 1])
+        b = 200 * (f[..., 1] - f[..., 2])
+        return np.stack([L, a, b], axis=-1)
+    
+    @staticmethod
+    def _lab_to_xyz(lab):
+        """L*a*b* в XYZ (0-1) без округления"""
+        L, a, b = ColorConverter._split_channels(lab, 3)
+        fy = (L + 16) / 116
+        f = np.stack([fy + a / 500, fy, fy - b / 200], axis=-1)
+        t = np.where(f > 6 / 29, f ** 3, ColorConverter._LAB_KAPPA * (f - 4 / 29))
+        return t * ColorConverter.WHITE_D65
+    
+    @staticmethod
+    def rgb_to_xyz_array(rgb):
+        """Конвертация массива RGB (..., 3) в XYZ (..., 3), float64"""
+        xyz = ColorConverter._linearize(rgb) @ ColorConverter.RGB_TO_XYZ.T
+        return ColorConverter._round2(xyz * 100)
+    
+    @staticmethod
+    def xyz_to_rgb_array(xyz):
+        """Конвертация массива XYZ (..., 3) в RGB (..., 3), uint8"""
+        xyz = np.asarray(xyz, dtype=np.float64) / 100
+        return ColorConverter._delinearize(xyz @ ColorConverter.XYZ_TO_RGB.T)
+    
+    @staticmethod
+    def rgb_to_lab_array(rgb):
+        """Конвертация массива RGB (..., 3) в L*a*b* (..., 3), float64"""
+        xyz = ColorConverter._linearize(rgb) @ ColorConverter.RGB_TO_XYZ.T
+        # + 0.0 убирает отрицательный ноль (-0.00 в полях ввода)
+        return ColorConverter._round2(ColorConverter._xyz_to_lab(xyz)) + 0.0
+    
+    @staticmethod
+    def lab_to_rgb_array(lab):
+        """Конвертация массива L*a*b* (..., 3) в RGB (..., 3), uint8"""
+        xyz = ColorConverter._lab_to_xyz(lab)
+        return ColorConverter._delinearize(xyz @ ColorConverter.XYZ_TO_RGB.T)
+    
+    @staticmethod
+    def delta_e_array(lab1, lab2):
+        """Цветовое отличие CIE76 для массивов L*a*b* (..., 3)"""
+        diff = np.asarray(lab1, dtype=np.float64) - np.asarray(lab2, dtype=np.float64)
+        return np.sqrt(np.einsum('...i,...i->...', diff, diff))
+    
+    @staticmethod
+    def rgb_to_xyz(r, g, b):
+        """Конвертация RGB в XYZ"""
+        return tuple(float(v) for v in ColorConverter.rgb_to_xyz_array([r, g, b]))
+    
+    @staticmethod
+    def xyz_to_rgb(x, y, z):
+        """Конвертация XYZ в RGB"""
+        return tuple(int(v) for v in ColorConverter.xyz_to_rgb_array([x, y, z]))
+    
+    @staticmethod
+    def rgb_to_lab(r, g, b):
+        """Конвертация RGB в L*a*b*"""
+        return tuple(float(v) for v in ColorConverter.rgb_to_lab_array([r, g, b]))
+    
+    @staticmethod
+    def lab_to_rgb(l, a, b):
+        """Конвертация L*a*b* в RGB"""
+        return tuple(int(v) for v in ColorConverter.lab_to_rgb_array([l, a, b]))
+    
+    @staticmethod
+    def delta_e(lab1, lab2):
+        """Цветовое отличие CIE76 двух цветов L*a*b*"""
+        return float(ColorConverter.delta_e_array(lab1, lab2))
@@ -0,0 +1,189 @@
+"""Генерация градиентов, цветовых кругов и шкал цветов
+
+Шкалы интерполируются в выбранной модели (RGB, HSV или CMYK) и переводятся
+в RGB векторизованными методами ColorConverter. ColorRamp вычисляет только
+запрошенные элементы, поэтому шкалы из миллионов цветов можно обходить
+блоками с ограниченной памятью. Готовые массивы кэшируются в LRU-кэше,
+ограниченном по объёму: шкалы больше RAMP_CACHE_ITEM_BYTES не кэшируются.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from color_models import ColorConverter
+
+
+CHANNELS = {'rgb': 3, 'hsv': 3, 'cmyk': 4}
+
+# Общий объём кэша шкал и наибольшая кэшируемая шкала (байт)
+RAMP_CACHE_BYTES = 64 * 1024 * 1024
+RAMP_CACHE_ITEM_BYTES = 8 * 1024 * 1024
+
+RampCacheInfo = namedtuple('RampCacheInfo', 'hits misses entries nbytes max_bytes')
+
+
+class ColorRamp:
+    """Ленивая шкала цветов из steps элементов через опорные цвета stops
+
+    Опорные цвета задаются в координатах модели model и равномерно
+    распределяются по шкале. Результат - RGB uint8 формы (N, 3).
+    """
+
+    def __init__(self, stops, steps, model='rgb', shortest_hue=True):
+        if model not in CHANNELS:
+            raise ValueError(f"Неизвестная модель: {model}")
+        if steps < 1:
+            raise ValueError("Количество шагов должно быть положительным")
+
+        self.stops = np.asarray(stops, dtype=np.float64)
+        if self.stops.ndim != 2 or self.stops.shape[1] != CHANNELS[model]:
+            raise ValueError(
+                f"Опорные цвета {model} должны иметь {CHANNELS[model]} компоненты")
+        if len(self.stops) < 2:
+            raise ValueError("Нужно минимум два опорных цвета")
+
+        self.steps = steps
+        self.model = model
+
+        # Разности между соседними опорными цветами
+        self.deltas = np.diff(self.stops, axis=0)
+        if model == 'hsv' and shortest_hue:
+            # Оттенок интерполируется по кратчайшей дуге круга
+            self.deltas[:, 0] = (self.deltas[:, 0] + 180) % 360 - 180
+
+    def __len__(self):
+        return self.steps
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(np.arange(*key.indices(self.steps)))
+
+        index = int(key)
+        if index < 0:
+            index += self.steps
+        if not 0 <= index < self.steps:
+            raise IndexError("Индекс вне шкалы")
+        return self.take(np.array([index]))[0]
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk
+
+    def take(self, indices):
+        """Цвета RGB для массива индексов шкалы"""
+        indices = np.asarray(indices, dtype=np.float64)
+        segments = len(self.stops) - 1
+
+        t = indices / (self.steps - 1) if self.steps > 1 else np.zeros_like(indices)
+        position = t * segments
+        segment = np.minimum(position.astype(np.intp), segments - 1)
+        local = (position - segment)[:, None]
+
+        values = self.stops[segment] + self.deltas[segment] * local
+        return self.to_rgb(values)
+
+    def to_rgb(self, values):
+        """Перевод значений модели в RGB uint8"""
+        if self.model == 'hsv':
+            return ColorConverter.hsv_to_rgb_array(values)
+        if self.model == 'cmyk':
+            return ColorConverter.cmyk_to_rgb_array(values)
+        return np.clip(np.round(values), 0, 255).astype(np.uint8)
+
+    def chunks(self, chunk_size=65536):
+        """Генератор блоков шкалы, память ограничена chunk_size"""
+        for start in range(0, self.steps, chunk_size):
+            yield self.take(np.arange(start, min(start + chunk_size, self.steps)))
+
+    def to_array(self):
+        """Вся шкала одним массивом (N, 3)"""
+        return self.take(np.arange(self.steps))
+
+
+def _normalize_stops(stops):
+    """Опорные цвета в хешируемый вид для ключа кэша"""
+    return tuple(tuple(float(v) for v in stop) for stop in stops)
+
+
+class _RampCache:
+    """LRU-кэш массивов шкал, ограниченный суммарным размером в байтах"""
+
+    def __init__(self, max_bytes=RAMP_CACHE_BYTES, max_item_bytes=RAMP_CACHE_ITEM_BYTES):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.arrays = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, stops, steps, model, shortest_hue):
+        key = (stops, steps, model, shortest_hue)
+        with self.lock:
+            array = self.arrays.get(key)
+            if array is not None:
+                self.arrays.move_to_end(key)
+                self.hits += 1
+                return array
+            self.misses += 1
+
+        array = ColorRamp(stops, steps, model, shortest_hue).to_array()
+        # Массив из кэша разделяется между вызовами - запрещаем запись
+        array.flags.writeable = False
+        if array.nbytes > self.max_item_bytes:
+            # Большие шкалы не вытесняют кэш; для них есть iter_ramp
+            return array
+
+        with self.lock:
+            if key not in self.arrays:
+                self.arrays[key] = array
+                self.nbytes += array.nbytes
+            while self.nbytes > self.max_bytes:
+                _, old = self.arrays.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return array
+
+    def info(self):
+        with self.lock:
+            return RampCacheInfo(self.hits, self.misses, len(self.arrays),
+                                 self.nbytes, self.max_bytes)
+
+
+_ramp_cache = _RampCache()
+
+
+def ramp(stops, steps, model='rgb', shortest_hue=True):
+    """Шкала через несколько опорных цветов (кэшируется)"""
+    return _ramp_cache.get(_normalize_stops(stops), int(steps), model, shortest_hue)
+
+
+def gradient(start, end, steps, model='rgb'):
+    """Градиент из steps цветов между двумя цветами (кэшируется)"""
+    return ramp([start, end], steps, model)
+
+
+def hue_wheel(steps, s=100, v=100):
+    """Цветовой круг: steps оттенков с шагом 360 / steps (кэшируется)"""
+    last_hue = 360 * (steps - 1) / steps
+    return ramp([(0, s, v), (last_hue, s, v)], steps, 'hsv', shortest_hue=False)
+
+
+def iter_ramp(stops, steps, model='rgb', chunk_size=65536, shortest_hue=True):
+    """Ленивый обход большой шкалы блоками, без кэширования"""
+    return ColorRamp(stops, steps, model, shortest_hue).chunks(chunk_size)
+
+
+def ramp_cache_info():
+    """Статистика LRU-кэша шкал"""
+    return _ramp_cache.info()
+
+
+def clear_ramp_cache():
+    """Очистка LRU-кэша шкал"""
+    with _ramp_cache.lock:
+        _ramp_cache.clear()
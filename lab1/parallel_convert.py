@@ -0,0 +1,196 @@
+"""Многопроцессная конвертация больших изображений RGB → HSV/CMYK
+
+Изображение копируется в разделяемую память один раз, результат пишется
+рабочими процессами прямо в разделяемый выходной массив. Задачи содержат
+только границы полос строк, поэтому пиксели не сериализуются через pickle.
+
+Пример:
+    python parallel_convert.py scan.npy --to hsv --workers 32 -o scan_hsv.npy
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from color_models import ColorConverter
+
+
+TARGETS = {
+    'hsv': (ColorConverter.rgb_to_hsv_array, 3),
+    'cmyk': (ColorConverter.rgb_to_cmyk_array, 4),
+}
+
+# Состояние рабочего процесса, заполняется в _init_worker
+_worker = {}
+
+
+def _attach(name):
+    """Подключение к существующему блоку разделяемой памяти"""
+    try:
+        # Python 3.13+: не передаём блок под контроль resource_tracker
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _open_array(spec, mode):
+    """Массив по описанию: ('shm', name, shape, dtype) или ('npy', path)"""
+    if spec[0] == 'npy':
+        return None, np.load(spec[1], mmap_mode=mode)
+    _, name, shape, dtype = spec
+    shm = _attach(name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _init_worker(src_spec, dst_spec, target, use_lut, quantize):
+    """Инициализация рабочего процесса: подключение к массивам"""
+    # Ссылки на блоки памяти держим, пока жив процесс
+    _worker['src_shm'], _worker['src'] = _open_array(src_spec, 'r')
+    _worker['dst_shm'], _worker['dst'] = _open_array(dst_spec, 'r+')
+
+    if use_lut:
+        from color_lut import ColorLUT
+        lut = ColorLUT.shared(target)
+        _worker['convert'] = lut.lookup_raw if quantize else lut.convert
+    else:
+        convert = TARGETS[target][0]
+        if quantize:
+            _worker['convert'] = lambda rgb: np.rint(convert(rgb) * 100)
+        else:
+            _worker['convert'] = convert
+
+
+def _convert_band(start, stop):
+    """Конвертация полосы строк [start, stop) в выходной массив"""
+    _worker['dst'][start:stop] = _worker['convert'](_worker['src'][start:stop])
+    return stop - start
+
+
+def convert_image_parallel(image, target='hsv', workers=None, chunk_rows=256,
+                           use_lut=False, quantize=False, out_path=None):
+    """Параллельная конвертация изображения RGB (H, W, 3)
+
+    target     - 'hsv' или 'cmyk'
+    workers    - количество процессов (по умолчанию os.cpu_count())
+    chunk_rows - высота полосы строк, обрабатываемой одной задачей
+    use_lut    - использовать ColorLUT вместо арифметики
+    quantize   - результат в uint16 (значение * 100) вместо float64, в 4 раза меньше памяти
+    out_path   - писать результат в .npy файл через memmap и вернуть его
+                 (без итоговой копии в памяти процесса)
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Неизвестная модель: {target}")
+
+    image = np.asarray(image)
+    if image.ndim != 3 or image.shape[2] != 3 or image.dtype != np.uint8:
+        raise ValueError("Ожидается изображение uint8 формы (H, W, 3)")
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows должен быть положительным")
+
+    workers = workers or os.cpu_count() or 1
+    height, width = image.shape[:2]
+    dst_shape = (height, width, TARGETS[target][1])
+    dst_dtype = np.dtype(np.uint16 if quantize else np.float64)
+
+    blocks = []
+    try:
+        src_shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+        blocks.append(src_shm)
+        src = np.ndarray(image.shape, dtype=np.uint8, buffer=src_shm.buf)
+        src[:] = image
+        src_spec = ('shm', src_shm.name, image.shape, np.uint8)
+
+        if out_path is not None:
+            dst = np.lib.format.open_memmap(out_path, mode='w+', dtype=dst_dtype,
+                                            shape=dst_shape)
+            dst.flush()
+            dst_spec = ('npy', out_path)
+        else:
+            dst_shm = shared_memory.SharedMemory(
+                create=True, size=max(1, int(np.prod(dst_shape)) * dst_dtype.itemsize))
+            blocks.append(dst_shm)
+            dst = np.ndarray(dst_shape, dtype=dst_dtype, buffer=dst_shm.buf)
+            dst_spec = ('shm', dst_shm.name, dst_shape, dst_dtype)
+
+        bands = [(start, min(start + chunk_rows, height))
+                 for start in range(0, height, chunk_rows)]
+
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(src_spec, dst_spec, target, use_lut, quantize)) as executor:
+            futures = [executor.submit(_convert_band, start, stop)
+                       for start, stop in bands]
+            for future in futures:
+                future.result()
+
+        del src
+        if out_path is not None:
+            # Открываем заново, чтобы увидеть записи рабочих процессов
+            del dst
+            return np.load(out_path, mmap_mode='r')
+
+        result = dst.copy()
+        del dst
+        return result
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def load_image(path):
+    """Загрузка изображения: .npy через memmap, остальные форматы через Pillow"""
+    if path.lower().endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = None
+    with Image.open(path) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Параллельная конвертация больших изображений RGB → HSV/CMYK")
+    parser.add_argument('input', help="изображение (.npy uint8 (H, W, 3) или формат Pillow)")
+    parser.add_argument('-o', '--output', required=True, help="выходной .npy файл")
+    parser.add_argument('--to', dest='target', choices=TARGETS, default='hsv',
+                        help="целевая модель")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="количество процессов (по умолчанию - все ядра)")
+    parser.add_argument('--chunk-rows', type=int, default=256,
+                        help="высота полосы строк на одну задачу")
+    parser.add_argument('--lut', action='store_true',
+                        help="использовать предвычисленную таблицу ColorLUT")
+    parser.add_argument('--quantize', action='store_true',
+                        help="сохранять uint16 (значение * 100) вместо float64")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    image = load_image(args.input)
+    start = time.perf_counter()
+    try:
+        convert_image_parallel(image, args.target, args.workers, args.chunk_rows,
+                               args.lut, args.quantize, out_path=args.output)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+
+    pixels = image.shape[0] * image.shape[1]
+    print(f"{pixels} пикселей за {elapsed:.3f} с ({pixels / elapsed:,.0f} пикс/с)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
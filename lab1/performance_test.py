@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from color_models import ColorConverter
+
+
+class PerformanceTester:
+    """Замеры скорости всех путей конвертации RGB → HSV/CMYK"""
+
+    SIZES = {
+        "1 цвет": (1, 1),
+        "1K": (1, 1000),
+        "1M": (1000, 1000),
+        "4K кадр": (2160, 3840),
+    }
+
+    PATHS = ("scalar", "batch", "lut", "parallel")
+
+    def __init__(self, sizes=None, paths=None, workers=None, max_scalar=1_000_000):
+        self.sizes = sizes or list(self.SIZES)
+        self.paths = paths or list(self.PATHS)
+        self.workers = workers
+        self.max_scalar = max_scalar
+        self.results = []
+
+    # --- Пути конвертации -------------------------------------------------
+
+    def scalar_path(self, image):
+        """Поэлементный вызов скалярных методов"""
+        pixels = image.reshape(-1, 3).tolist()
+        hsv = [ColorConverter.rgb_to_hsv(r, g, b) for r, g, b in pixels]
+        cmyk = [ColorConverter.rgb_to_cmyk(r, g, b) for r, g, b in pixels]
+        shape = image.shape[:2]
+        return np.array(hsv).reshape(*shape, 3), np.array(cmyk).reshape(*shape, 4)
+
+    def batch_path(self, image):
+        """Векторизованные методы *_array"""
+        return ColorConverter.rgb_to_hsv_array(image), ColorConverter.rgb_to_cmyk_array(image)
+
+    def lut_path(self, image):
+        """Предвычисленные таблицы ColorLUT"""
+        from color_lut import ColorLUT
+        return ColorLUT.shared('hsv').convert(image), ColorLUT.shared('cmyk').convert(image)
+
+    def parallel_path(self, image):
+        """Пул процессов с разделяемой памятью (включая запуск пула)"""
+        from parallel_convert import convert_image_parallel
+        return (convert_image_parallel(image, 'hsv', self.workers),
+                convert_image_parallel(image, 'cmyk', self.workers))
+
+    # --- Замеры -----------------------------------------------------------
+
+    @staticmethod
+    def make_image(shape):
+        """Детерминированное случайное изображение RGB"""
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 256, size=(*shape, 3), dtype=np.uint8)
+
+    @staticmethod
+    def round_trip_error(image, hsv, cmyk):
+        """Максимальное отклонение RGB после обратной конвертации"""
+        rgb = image.astype(np.int16)
+        hsv_error = np.abs(ColorConverter.hsv_to_rgb_array(hsv).astype(np.int16) - rgb).max()
+        cmyk_error = np.abs(ColorConverter.cmyk_to_rgb_array(cmyk).astype(np.int16) - rgb).max()
+        return int(hsv_error), int(cmyk_error)
+
+    def test_path(self, path, size_name):
+        """Тестирование одного пути на одном размере"""
+        shape = self.SIZES[size_name]
+        pixels = shape[0] * shape[1]
+
+        if path == "scalar" and pixels > self.max_scalar:
+            print(f"  {path:<10} пропущен (больше {self.max_scalar} пикселей)")
+            return
+
+        func = getattr(self, f"{path}_path")
+        image = self.make_image(shape)
+        iterations = max(1, min(1000, 100_000 // pixels))
+
+        # Прогрев: построение LUT, импорт модулей
+        hsv, cmyk = func(image)
+
+        times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func(image)
+            end = time.perf_counter()
+            times.append(end - start)
+
+        # Пиковая память - отдельным прогоном, tracemalloc замедляет работу.
+        # Память рабочих процессов parallel сюда не входит.
+        tracemalloc.start()
+        func(image)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        avg_time = sum(times) / len(times)
+        min_time = min(times)
+        hsv_error, cmyk_error = self.round_trip_error(image, hsv, cmyk)
+
+        result = {
+            "path": path,
+            "size": size_name,
+            "pixels": pixels,
+            "iterations": iterations,
+            "avg_time": avg_time,
+            "min_time": min_time,
+            "pixels_per_second": pixels / min_time if min_time > 0 else None,
+            "peak_memory_bytes": peak,
+            "hsv_round_trip_error": hsv_error,
+            "cmyk_round_trip_error": cmyk_error,
+        }
+        self.results.append(result)
+
+        print(f"  {path:<10} {avg_time * 1000:>12.3f} мс  "
+              f"{self._format_rate(result['pixels_per_second'], 16)} пикс/с  "
+              f"{peak / 1024 / 1024:>10.1f} МБ  "
+              f"ошибка HSV/CMYK: {hsv_error}/{cmyk_error}")
+
+    def run_all_tests(self):
+        """Запуск всех тестов"""
+        for size_name in self.sizes:
+            shape = self.SIZES[size_name]
+            print(f"\n{'=' * 80}")
+            print(f"Размер: {size_name} ({shape[0]} x {shape[1]})")
+            print(f"{'=' * 80}")
+
+            for path in self.paths:
+                self.test_path(path, size_name)
+
+        self.print_summary()
+
+    @staticmethod
+    def _format_rate(rate, width):
+        """Пикселей в секунду с разделителями; '-', если скорость не измерена"""
+        return f"{rate:>{width},.0f}" if rate is not None else f"{'-':>{width}}"
+
+    def print_summary(self):
+        """Вывод сводной таблицы результатов"""
+        print(f"\n{'=' * 80}")
+        print("СВОДНАЯ ТАБЛИЦА (пикселей в секунду)")
+        print(f"{'=' * 80}")
+
+        header = f"{'Путь':<12}" + "".join(f"{name:>17}" for name in self.sizes)
+        print(header)
+        print("-" * len(header))
+
+        for path in self.paths:
+            row = f"{path:<12}"
+            for size_name in self.sizes:
+                match = [r for r in self.results
+                         if r["path"] == path and r["size"] == size_name]
+                rate = match[0]["pixels_per_second"] if match else None
+                row += self._format_rate(rate, 17)
+            print(row)
+
+    def save_json(self, path):
+        """Сохранение результатов в JSON для сравнения между версиями"""
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": self.results,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Тестирование производительности конвертации цветов")
+    parser.add_argument("--sizes", nargs="+", choices=PerformanceTester.SIZES,
+                        help="размеры входа (по умолчанию все)")
+    parser.add_argument("--paths", nargs="+", choices=PerformanceTester.PATHS,
+                        help="пути конвертации (по умолчанию все)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="количество процессов для parallel")
+    parser.add_argument("--max-scalar", type=int, default=1_000_000,
+                        help="максимальный размер для скалярного пути")
+    parser.add_argument("--json", help="файл для результатов в формате JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 80)
+    print("ТЕСТИРОВАНИЕ ПРОИЗВОДИТЕЛЬНОСТИ КОНВЕРТАЦИИ ЦВЕТОВ")
+    print("=" * 80)
+
+    tester = PerformanceTester(args.sizes, args.paths, args.workers, args.max_scalar)
+    tester.run_all_tests()
+
+    if args.json:
+        tester.save_json(args.json)
+        print(f"\nРезультаты сохранены в {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""Поиск точных копий и похожих изображений
+
+Поиск идёт по этапам, каждый следующий этап обрабатывает только кандидатов
+предыдущего:
+
+1. Группировка по размеру файла и заголовку (размеры, глубина цвета) -
+   без чтения содержимого.
+2. Точные копии: хеш первых HEAD_SIZE байт, затем хеш всего файла - только
+   внутри групп первого этапа.
+3. Похожие изображения: pHash считается только для файлов, у которых есть
+   другие изображения с близким соотношением сторон (по одному на группу
+   точных копий), и ищется в индексе MultiIndexHash, а не попарным
+   сравнением.
+"""
+
+import functools
+import hashlib
+import math
+import multiprocessing
+import os
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# Этапы поиска для progress(): ключ -> название
+STAGES = {
+    'size': 'группировка по размеру',
+    'head': 'хеш начала файлов',
+    'content': 'хеш содержимого',
+    'phash': 'перцептивный хеш',
+}
+
+# exact - группы точных копий, near - группы похожих изображений
+# (в near каждая группа точных копий представлена одним файлом)
+DuplicateReport = namedtuple('DuplicateReport', 'exact near')
+
+# Расстояние Хэмминга между 64-битными pHash, до которого изображения похожи
+DEFAULT_MAX_DISTANCE = 8
+
+HEAD_SIZE = 64 * 1024
+READ_CHUNK = 1024 * 1024
+# Путей в одной задаче пула процессов pHash
+PHASH_BATCH = 64
+
+# Точность группировки по соотношению сторон (шаг логарифма)
+ASPECT_STEP = 0.02
+
+
+class DuplicateSearchCancelled(Exception):
+    pass
+
+
+def content_hash(filepath, limit=None):
+    """BLAKE2 содержимого файла (или первых limit байт)"""
+    digest = hashlib.blake2b(digest_size=20)
+    remaining = limit
+    with open(filepath, 'rb') as f:
+        while remaining is None or remaining > 0:
+            size = READ_CHUNK if remaining is None else min(READ_CHUNK, remaining)
+            data = f.read(size)
+            if not data:
+                break
+            digest.update(data)
+            if remaining is not None:
+                remaining -= len(data)
+    return digest.hexdigest()
+
+
+def _try_hash(filepath, limit):
+    try:
+        return content_hash(filepath, limit)
+    except OSError:
+        return None
+
+
+def compute_phash(filepath):
+    """pHash яркости; JPEG декодируется сразу в уменьшенном масштабе"""
+    from PIL import Image
+    from pixel_stats import HASH_SCALE, HASH_SIZE, perceptual_hash
+
+    size = HASH_SIZE * HASH_SCALE
+    with Image.open(filepath) as img:
+        # pHash использует только 32x32, полное разрешение не нужно
+        img.draft('L', (size * 2, size * 2))
+        return perceptual_hash(img.convert('L'))
+
+
+def _try_phash(filepath):
+    try:
+        return compute_phash(filepath)
+    except Exception:
+        return None
+
+
+def _map_batch(func, items):
+    return [func(item) for item in items]
+
+
+def _bounded_map(executor, func, items, max_in_flight, batch_size=1):
+    """Генератор func(item) в порядке items, как executor.map
+
+    Задачи отправляются по мере выдачи результатов: в работе не больше
+    max_in_flight пачек по batch_size элементов, поэтому память не растёт
+    с числом файлов, а при отмене не остаётся очереди из всех путей.
+    """
+    pending = deque()
+    for start in range(0, len(items), batch_size):
+        pending.append(executor.submit(_map_batch, func, items[start:start + batch_size]))
+        if len(pending) >= max_in_flight:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+class MultiIndexHash:
+    """Индекс 64-битных хешей для поиска по расстоянию Хэмминга
+
+    Хеш делится на chunks частей, для каждой части - своя хеш-таблица.
+    Если расстояние между хешами не больше max_distance, то хотя бы одна
+    часть отличается не больше чем на max_distance // chunks бит
+    (принцип Дирихле), поэтому достаточно проверить соседей каждой части
+    с таким радиусом. При ~2^(bits / chunks) хешах в индексе кандидатов на
+    запрос единицы, время поиска почти не зависит от размера индекса.
+    BK-дерево для 64-битных хешей и радиуса 8 просматривает большую часть
+    узлов, поэтому здесь не используется.
+    """
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, bits=64, chunks=None):
+        self.max_distance = max_distance
+        # Радиус поиска в части не больше 2: иначе вариантов слишком много
+        self.chunks = chunks or max_distance // 3 + 1
+        self.radius = max_distance // self.chunks
+        widths = [bits // self.chunks + (i < bits % self.chunks) for i in range(self.chunks)]
+        self.parts = []
+        shift = 0
+        for width in widths:
+            self.parts.append((shift, (1 << width) - 1, self._flips(width, self.radius)))
+            shift += width
+        self.tables = [defaultdict(list) for _ in widths]
+        self.values = []
+        self.items = []
+
+    @staticmethod
+    def _flips(width, radius):
+        """Маски из не более radius единичных бит среди width"""
+        flips = [0]
+        for _ in range(radius):
+            flips = sorted(set(flips) | {flip | (1 << bit) for flip in flips
+                                         for bit in range(width)})
+        return flips
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, value, item):
+        index = len(self.values)
+        self.values.append(value)
+        self.items.append(item)
+        for table, (shift, mask, _) in zip(self.tables, self.parts):
+            table[(value >> shift) & mask].append(index)
+
+    def search(self, value, max_distance=None):
+        """Список (расстояние, элемент) для хешей не дальше max_distance"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        candidates = set()
+        for table, (shift, mask, flips) in zip(self.tables, self.parts):
+            key = (value >> shift) & mask
+            for flip in flips:
+                bucket = table.get(key ^ flip)
+                if bucket:
+                    candidates.update(bucket)
+        found = []
+        for index in candidates:
+            distance = (value ^ self.values[index]).bit_count()
+            if distance <= max_distance:
+                found.append((distance, self.items[index]))
+        return found
+
+
+class _DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[b] = a
+
+    def groups(self):
+        result = defaultdict(list)
+        for item in self.parent:
+            result[self.find(item)].append(item)
+        return [sorted(group) for group in result.values() if len(group) > 1]
+
+
+def _aspect_bucket(width, height):
+    return round(math.log(width / height) / ASPECT_STEP)
+
+
+def find_duplicates(entries, max_distance=DEFAULT_MAX_DISTANCE, io_workers=8,
+                    cpu_workers=None, near=True, progress=None, should_stop=None):
+    """Поиск точных копий и похожих изображений
+
+    entries - (путь, ширина, высота, заголовок), где заголовок - любое
+    хешируемое описание файла (формат, глубина цвета); файлы с разным
+    заголовком не считаются точными копиями. progress(этап, сделано, всего)
+    вызывается из рабочего потока; should_stop() прерывает поиск исключением
+    DuplicateSearchCancelled.
+    """
+    def check(stage, done, total):
+        if should_stop is not None and should_stop():
+            raise DuplicateSearchCancelled()
+        if progress is not None:
+            progress(stage, done, total)
+
+    # 1. Группы по размеру файла и заголовку
+    entries = list(entries)
+    groups = defaultdict(list)
+    sizes = {}
+    dimensions = {}
+    for i, (path, width, height, header) in enumerate(entries):
+        if i % 1000 == 0:
+            check('size', i, len(entries))
+        try:
+            sizes[path] = os.stat(path).st_size
+        except OSError:
+            continue
+        groups[(sizes[path], width, height, header)].append(path)
+        dimensions[path] = (width, height)
+    candidates = [group for group in groups.values() if len(group) > 1]
+
+    # 2. Точные копии: сначала начало файла, затем (для больших файлов) целиком
+    hashes = {}
+    # При отмене ещё не начатые задачи снимаются, а не дочитываются
+    executor = ThreadPoolExecutor(max_workers=io_workers)
+    try:
+        for stage, limit in (('head', HEAD_SIZE), ('content', None)):
+            paths = [path for group in candidates for path in group
+                     if limit is not None or sizes[path] > HEAD_SIZE]
+            digests = _bounded_map(executor, functools.partial(_try_hash, limit=limit),
+                                   paths, io_workers * 4)
+            for i, (path, digest) in enumerate(zip(paths, digests)):
+                if i % 100 == 0:
+                    check(stage, i, len(paths))
+                hashes[path] = digest
+            refined = []
+            for group in candidates:
+                by_hash = defaultdict(list)
+                for path in group:
+                    if hashes[path] is not None:
+                        by_hash[hashes[path]].append(path)
+                refined.extend(g for g in by_hash.values() if len(g) > 1)
+            candidates = refined
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    exact = sorted(sorted(group) for group in candidates)
+
+    if not near:
+        return DuplicateReport(exact, [])
+
+    # 3. Похожие: по одному файлу на группу копий, только при близком соотношении сторон
+    copies = {path for group in exact for path in group[1:]}
+    buckets = defaultdict(int)
+    unique = [path for path in dimensions if path not in copies]
+    for path in unique:
+        width, height = dimensions[path]
+        if width > 0 and height > 0:
+            buckets[_aspect_bucket(width, height)] += 1
+    phash_paths = []
+    for path in unique:
+        width, height = dimensions[path]
+        if width <= 0 or height <= 0:
+            continue
+        bucket = _aspect_bucket(width, height)
+        if buckets[bucket] + buckets.get(bucket - 1, 0) + buckets.get(bucket + 1, 0) > 1:
+            phash_paths.append(path)
+
+    if not phash_paths:
+        return DuplicateReport(exact, [])
+    index = MultiIndexHash(max_distance)
+    linked = _DisjointSet()
+    # pHash ограничен процессором; spawn - как в PixelStatsPool
+    cpu_workers = cpu_workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=cpu_workers,
+                                   mp_context=multiprocessing.get_context('spawn'))
+    try:
+        # Пачки по PHASH_BATCH путей уменьшают накладные расходы на передачу между процессами
+        results = _bounded_map(executor, _try_phash, phash_paths, cpu_workers * 2,
+                               PHASH_BATCH)
+        for i, (path, phash) in enumerate(zip(phash_paths, results)):
+            if i % 100 == 0:
+                check('phash', i, len(phash_paths))
+            if phash is None:
+                continue
+            for _, other in index.search(phash, max_distance):
+                linked.union(other, path)
+            index.add(phash, path)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return DuplicateReport(exact, sorted(linked.groups()))
@@ -0,0 +1,140 @@
+"""Источники файлов для обработки: список файлов и потоковый обход папки
+
+Оба источника отдают пути пачками через get_chunk(), поэтому обработка
+начинается сразу, не дожидаясь окончания поиска файлов.
+"""
+
+import os
+import queue
+import threading
+import time
+
+
+IMAGE_EXTENSIONS = ('.bmp', '.jpg', '.jpeg', '.png', '.gif', '.tiff', '.tif')
+
+
+class FileListSource:
+    """Заранее известный список файлов"""
+
+    def __init__(self, files):
+        self.files = list(files)
+        self.position = 0
+        self.found = len(self.files)
+        self.done = True
+        # Как у FolderScanner; обхода нет, поэтому не используется
+        self.stats = None
+
+    def start(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def get_chunk(self, max_size, block=True):
+        """Следующие пути (до max_size) или None, если файлы закончились"""
+        if self.position >= len(self.files):
+            return None
+        chunk = self.files[self.position:self.position + max_size]
+        self.position += len(chunk)
+        return chunk
+
+
+class FolderScanner:
+    """Рекурсивный обход папки через os.scandir в фоновом потоке
+
+    Найденные пути передаются через ограниченную очередь, поэтому в памяти
+    не хранится полный список файлов. found - количество найденных файлов,
+    done - обход завершён (после этого found - итоговое количество).
+    stats (ScanStats) - необязательный сбор длительности обхода каждой папки.
+    """
+
+    # Признак конца обхода в очереди
+    _END = None
+
+    def __init__(self, folder, extensions=IMAGE_EXTENSIONS, queue_size=10000, stats=None):
+        self.folder = folder
+        self.stats = stats
+        self.extensions = tuple(extensions)
+        self.paths = queue.Queue(maxsize=queue_size)
+        self.found = 0
+        self.done = False
+        self.cancelled = False
+        self.finished = False
+
+    def start(self):
+        thread = threading.Thread(target=self._walk)
+        thread.daemon = True
+        thread.start()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _walk(self):
+        """Обход в глубину без рекурсии; недоступные папки пропускаются"""
+        stack = [self.folder]
+        try:
+            while stack and not self.cancelled:
+                start = time.perf_counter()
+                # Время ожидания места в очереди не относится к обходу
+                blocked = 0.0
+                try:
+                    with os.scandir(stack.pop()) as entries:
+                        for entry in entries:
+                            try:
+                                # Как Path.rglob: по символическим ссылкам на папки не переходим
+                                if entry.is_dir(follow_symlinks=False):
+                                    stack.append(entry.path)
+                                elif (entry.name.lower().endswith(self.extensions)
+                                      and entry.is_file()):
+                                    blocked += self._put(entry.path)
+                                    self.found += 1
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+                if self.stats is not None:
+                    self.stats.record('walk', time.perf_counter() - start - blocked)
+        finally:
+            self.done = True
+            self._put(self._END)
+
+    def _put(self, item):
+        """Передача пути в очередь; возвращает время ожидания, с"""
+        try:
+            self.paths.put_nowait(item)
+            return 0.0
+        except queue.Full:
+            pass
+        # Очередь ограничена: ждём, пока обработка заберёт пути, проверяя отмену
+        start = time.perf_counter()
+        while not self.cancelled:
+            try:
+                self.paths.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        return time.perf_counter() - start
+
+    def get_chunk(self, max_size, block=True):
+        """Уже найденные пути (до max_size), [] если новых пока нет, None в конце
+
+        При block=True ожидает хотя бы один путь или конец обхода.
+        """
+        if self.finished:
+            return None
+        chunk = []
+        try:
+            item = self.paths.get(timeout=0.1) if block else self.paths.get_nowait()
+            while True:
+                if item is self._END:
+                    self.finished = True
+                    break
+                chunk.append(item)
+                if len(chunk) >= max_size:
+                    break
+                item = self.paths.get_nowait()
+        except queue.Empty:
+            pass
+        if not chunk and self.finished:
+            return None
+        return chunk
@@ -0,0 +1,446 @@
+"""Быстрое чтение заголовков BMP, PNG, JPEG, GIF и TIFF без PIL
+
+Парсеры читают только начало файла (и, при необходимости, заголовки
+блоков/маркеров/IFD с переходом по смещениям) и возвращают те же ширину,
+высоту, режим, DPI и сжатие, что Pillow помещает в Image.open().
+Для необычных файлов (редкие режимы, MPO, BigTIFF и т.п.) возвращается None,
+и вызывающий код использует Pillow.
+"""
+
+import io
+import os
+import struct
+from collections import namedtuple
+
+
+# Те же поля, что get_image_info берёт у PIL: img.format, img.width,
+# img.height, img.mode, img.info.get('dpi'), img.info.get('compression')
+ImageHeader = namedtuple('ImageHeader', 'format width height mode dpi compression')
+
+# Размер буфера чтения: заголовок BMP с палитрой помещается целиком
+PREFIX_SIZE = 4096
+
+
+class CountingFileIO(io.FileIO):
+    """Файл, считающий байты, фактически прочитанные с диска"""
+
+    bytes_read = 0
+
+    def readinto(self, buffer):
+        n = super().readinto(buffer)
+        if n:
+            self.bytes_read += n
+        return n
+
+
+def open_counted(filepath):
+    """Буферизованное чтение файла; прочитанный объём - f.raw.bytes_read"""
+    return io.BufferedReader(CountingFileIO(filepath, 'rb'), PREFIX_SIZE)
+
+
+def read_image_header(source):
+    """Заголовок изображения или None, если формат требует Pillow
+
+    source - путь к файлу или открытый двоичный файл (позиция - начало файла,
+    файл не закрывается).
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open_counted(source) as f:
+            return read_image_header(f)
+
+    f = source
+    signature = f.read(16)
+    f.seek(0)
+    try:
+        if signature.startswith(b'BM'):
+            return _parse_bmp(f)
+        if signature.startswith(b'\x89PNG\r\n\x1a\n'):
+            return _parse_png(f)
+        if signature.startswith(b'\xff\xd8\xff'):
+            return _parse_jpeg(f)
+        if signature[:6] in (b'GIF87a', b'GIF89a'):
+            return _parse_gif(f)
+        if signature[:4] in (b'II*\x00', b'MM\x00*'):
+            return _parse_tiff(f)
+    except (struct.error, IndexError, ValueError):
+        # Повреждённый заголовок - пусть Pillow сформирует ошибку
+        return None
+    return None
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Неожиданный конец файла")
+    return data
+
+
+# --- BMP -----------------------------------------------------------------
+
+# Маски BITFIELDS, которые Pillow открывает как RGBA (32 бита)
+_BMP_ALPHA_MASKS = {
+    (0xFF000000, 0xFF0000, 0xFF00, 0xFF),
+    (0xFF, 0xFF00, 0xFF0000, 0xFF000000),
+    (0xFF0000, 0xFF00, 0xFF, 0xFF000000),
+    (0xFF000000, 0xFF00, 0xFF, 0xFF0000),
+    (0x0, 0x0, 0x0, 0x0),
+}
+_BMP_RGB_MASKS = {
+    32: {(0xFF0000, 0xFF00, 0xFF, 0x0), (0xFF000000, 0xFF0000, 0xFF00, 0x0),
+         (0xFF000000, 0xFF00, 0xFF, 0x0)},
+    24: {(0xFF0000, 0xFF00, 0xFF)},
+    16: {(0xF800, 0x7E0, 0x1F), (0x7C00, 0x3E0, 0x1F)},
+}
+_BMP_BIT_MODES = {1: 'P', 4: 'P', 8: 'P', 16: 'RGB', 24: 'RGB', 32: 'RGB'}
+
+
+def _parse_bmp(f):
+    f.seek(14)
+    header_size = struct.unpack_from('<I', _read_exact(f, 4))[0]
+    data = _read_exact(f, header_size - 4)
+    dpi = None
+
+    if header_size == 12:
+        width, height, _, bits = struct.unpack_from('<HHHH', data)
+        compression = 0
+        colors = 0
+        padding = 3
+    elif header_size in (40, 52, 56, 64, 108, 124):
+        width, height, _, bits, compression = struct.unpack_from('<IIHHI', data)
+        if data[7] == 0xFF:
+            height = 2 ** 32 - height
+        ppm_x, ppm_y, colors = struct.unpack_from('<iiI', data, 20)
+        dpi = (ppm_x / 39.3701, ppm_y / 39.3701)
+        padding = 4
+    else:
+        return None
+
+    mode = _BMP_BIT_MODES.get(bits)
+    if mode is None:
+        return None
+
+    if compression == 3:
+        if header_size >= 56:
+            masks = struct.unpack_from('<IIII', data, 36)
+        elif header_size == 52:
+            masks = struct.unpack_from('<III', data, 36) + (0,)
+        else:
+            masks = struct.unpack('<III', _read_exact(f, 12)) + (0,)
+        if bits == 32 and masks in _BMP_ALPHA_MASKS:
+            mode = 'RGBA'
+        elif bits == 32 and masks in _BMP_RGB_MASKS[32]:
+            pass
+        elif bits in (24, 16) and masks[:3] in _BMP_RGB_MASKS[bits]:
+            pass
+        else:
+            return None
+    elif compression not in (0, 1, 2):
+        return None
+
+    if mode == 'P':
+        colors = colors or 1 << bits
+        if not 0 < colors <= 256:
+            return None
+        palette = _read_exact(f, padding * colors)
+        indices = (0, 255) if colors == 2 else range(colors)
+        grayscale = all(
+            palette[i * padding:i * padding + 3] == bytes((value,)) * 3
+            for i, value in enumerate(indices))
+        if grayscale:
+            mode = '1' if colors == 2 else 'L'
+
+    return ImageHeader('BMP', width, height, mode, dpi, compression)
+
+
+# --- PNG -----------------------------------------------------------------
+
+_PNG_MODES = {
+    (1, 0): '1', (2, 0): 'L', (4, 0): 'L', (8, 0): 'L', (16, 0): 'I;16',
+    (8, 2): 'RGB', (16, 2): 'RGB',
+    (1, 3): 'P', (2, 3): 'P', (4, 3): 'P', (8, 3): 'P',
+    (8, 4): 'LA', (16, 4): 'RGBA',
+    (8, 6): 'RGBA', (16, 6): 'RGBA',
+}
+
+
+def _parse_png(f):
+    f.seek(8)
+    length, chunk_type = struct.unpack('>I4s', _read_exact(f, 8))
+    if chunk_type != b'IHDR' or length < 13:
+        return None
+    ihdr = _read_exact(f, length)
+    width, height, bit_depth, color_type, _, filter_method = struct.unpack_from(
+        '>IIBBBB', ihdr)
+    mode = _PNG_MODES.get((bit_depth, color_type))
+    if mode is None or filter_method:
+        return None
+    f.seek(4, 1)  # CRC
+
+    # pHYs обязан стоять до IDAT, остальные блоки пропускаем без чтения
+    dpi = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        if chunk_type == b'pHYs' and length >= 9:
+            px, py, unit = struct.unpack_from('>IIB', _read_exact(f, length))
+            if unit == 1:
+                dpi = (px * 0.0254, py * 0.0254)
+            f.seek(4, 1)
+        else:
+            f.seek(length + 4, 1)
+
+    return ImageHeader('PNG', width, height, mode, dpi, None)
+
+
+# --- JPEG ----------------------------------------------------------------
+
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+             0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_LAYER_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+
+def _parse_jpeg(f):
+    f.seek(2)
+    size = None
+    mode = None
+    dpi = None
+    exif = None
+
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker == 0 or 0xD0 <= marker <= 0xD8 or marker == 0x01:
+            continue
+
+        length = struct.unpack('>H', _read_exact(f, 2))[0] - 2
+
+        if marker == 0xDA:  # начало скана - дальше только данные
+            break
+        if marker in _JPEG_SOF:
+            segment = _read_exact(f, length)
+            bits, height, width, layers = struct.unpack_from('>BHHB', segment)
+            if bits != 8 or layers not in _JPEG_LAYER_MODES:
+                return None
+            size = (width, height)
+            mode = _JPEG_LAYER_MODES[layers]
+        elif marker == 0xE0:
+            segment = _read_exact(f, length)
+            if segment.startswith(b'JFIF') and len(segment) >= 12:
+                unit = segment[7]
+                density = struct.unpack_from('>HH', segment, 8)
+                if unit == 1:
+                    dpi = density
+                elif unit == 2:
+                    dpi = tuple(d * 2.54 for d in density)
+        elif marker == 0xE1:
+            segment = _read_exact(f, length)
+            if segment.startswith(b'Exif\x00\x00') and exif is None:
+                exif = segment[6:]
+        elif marker == 0xE2:
+            segment = _read_exact(f, length)
+            if segment.startswith(b'MPF\x00'):
+                # Многокадровый MPO - Pillow открывает его другим классом
+                return None
+        else:
+            f.seek(length, 1)
+
+    if size is None:
+        return None
+
+    if dpi is None and exif is not None:
+        dpi = _exif_dpi(exif)
+
+    return ImageHeader('JPEG', size[0], size[1], mode, dpi, None)
+
+
+def _exif_dpi(exif):
+    """DPI из EXIF по правилам Pillow (72 x 72, если данных нет)"""
+    try:
+        endian = _tiff_endian(exif[:4])
+        if endian is None:
+            return (72, 72)
+        offset = struct.unpack_from(endian + 'I', exif, 4)[0]
+        tags = _read_ifd(lambda pos, n: exif[pos:pos + n], offset, endian, {0x011A, 0x0128})
+        unit = tags[0x0128][0]
+        resolution = tags[0x011A][0]
+        if isinstance(resolution, tuple):
+            dpi = resolution[0] / resolution[1]
+        else:
+            dpi = resolution
+        if unit == 3:
+            dpi *= 2.54
+        return (dpi, dpi)
+    except (KeyError, IndexError, ValueError, ZeroDivisionError, struct.error):
+        return (72, 72)
+
+
+# --- GIF -----------------------------------------------------------------
+
+def _gif_palette_needed(palette):
+    """Палитра Pillow считается лишней, если она повторяет градации серого"""
+    return any(not (i // 3 == palette[i] == palette[i + 1] == palette[i + 2])
+               for i in range(0, len(palette), 3))
+
+
+def _gif_skip_sub_blocks(f):
+    while True:
+        size = _read_exact(f, 1)[0]
+        if size == 0:
+            return
+        f.seek(size, 1)
+
+
+def _parse_gif(f):
+    screen = _read_exact(f, 13)
+    width, height, flags = struct.unpack_from('<HHB', screen, 6)
+    global_palette = False
+    if flags & 128:
+        global_palette = _gif_palette_needed(_read_exact(f, 3 << ((flags & 7) + 1)))
+
+    # Первый кадр: пропускаем расширения до дескриптора изображения
+    while True:
+        block = f.read(1)
+        if not block or block == b';':
+            return None
+        if block == b'!':
+            _read_exact(f, 1)
+            _gif_skip_sub_blocks(f)
+        elif block == b',':
+            x0, y0, w, h, frame_flags = struct.unpack('<HHHHB', _read_exact(f, 9))
+            width = max(width, x0 + w)
+            height = max(height, y0 + h)
+            if frame_flags & 128:
+                palette = _gif_palette_needed(_read_exact(f, 3 << ((frame_flags & 7) + 1)))
+            else:
+                palette = global_palette
+            mode = 'P' if palette else 'L'
+            return ImageHeader('GIF', width, height, mode, None, None)
+
+
+# --- TIFF ----------------------------------------------------------------
+
+_TIFF_COMPRESSION = {
+    1: 'raw', 2: 'tiff_ccitt', 3: 'group3', 4: 'group4', 5: 'tiff_lzw',
+    7: 'jpeg', 8: 'tiff_adobe_deflate', 32771: 'tiff_raw_16', 32773: 'packbits',
+    32809: 'tiff_thunderscan', 32946: 'tiff_deflate', 34676: 'tiff_sgilog',
+    34677: 'tiff_sgilog24', 34925: 'lzma', 50000: 'zstd', 50001: 'webp',
+}
+
+# (photometric, bits per sample, extra samples) -> режим Pillow
+# для SampleFormat = 1 и FillOrder = 1; остальное читает Pillow
+_TIFF_MODES = {
+    (0, (1,), ()): '1', (1, (1,), ()): '1',
+    (0, (8,), ()): 'L', (1, (8,), ()): 'L',
+    (1, (8, 8), (2,)): 'LA',
+    (2, (8, 8, 8), ()): 'RGB',
+    (2, (8, 8, 8, 8), ()): 'RGBA',
+    (2, (8, 8, 8, 8), (0,)): 'RGB',
+    (2, (8, 8, 8, 8), (1,)): 'RGBA',
+    (2, (8, 8, 8, 8), (2,)): 'RGBA',
+    (2, (16, 16, 16), ()): 'RGB',
+    (3, (1,), ()): 'P', (3, (2,), ()): 'P', (3, (4,), ()): 'P', (3, (8,), ()): 'P',
+    (5, (8, 8, 8, 8), ()): 'CMYK',
+    (6, (8, 8, 8), ()): 'RGB',
+}
+
+_TIFF_TAGS = {256, 257, 258, 259, 262, 266, 274, 277, 282, 283, 284, 296, 338, 339, 0xBC01}
+
+# Тип поля TIFF -> (формат struct, размер)
+_TIFF_TYPES = {1: ('B', 1), 3: ('H', 2), 4: ('I', 4), 5: ('II', 8), 7: ('B', 1)}
+
+
+def _tiff_endian(prefix):
+    if prefix == b'II*\x00':
+        return '<'
+    if prefix == b'MM\x00*':
+        return '>'
+    return None
+
+
+def _read_ifd(read_at, offset, endian, wanted):
+    """Значения нужных тегов IFD: {тег: кортеж значений}"""
+    count = struct.unpack(endian + 'H', read_at(offset, 2))[0]
+    entries = read_at(offset + 2, count * 12)
+    tags = {}
+    for i in range(count):
+        tag, field_type, n, raw = struct.unpack_from(endian + 'HHI4s', entries, i * 12)
+        if tag not in wanted:
+            continue
+        if field_type not in _TIFF_TYPES:
+            raise ValueError(f"Неподдерживаемый тип поля TIFF: {field_type}")
+        fmt, size = _TIFF_TYPES[field_type]
+        total = size * n
+        if total > 4:
+            raw = read_at(struct.unpack(endian + 'I', raw)[0], total)
+        values = struct.unpack_from(endian + fmt * n, raw)
+        if field_type == 5:
+            values = tuple(zip(values[::2], values[1::2]))
+        tags[tag] = values
+    return tags
+
+
+def _parse_tiff(f):
+    prefix = _read_exact(f, 8)
+    endian = _tiff_endian(prefix[:4])
+    offset = struct.unpack_from(endian + 'I', prefix, 4)[0]
+
+    def read_at(pos, size):
+        f.seek(pos)
+        return _read_exact(f, size)
+
+    tags = _read_ifd(read_at, offset, endian, _TIFF_TAGS)
+
+    code = tags.get(259, (1,))[0]
+    if 0xBC01 in tags or code not in _TIFF_COMPRESSION:
+        return None
+    if tags.get(266, (1,))[0] != 1 or tags.get(284, (1,))[0] != 1:
+        return None
+
+    sample_format = tags.get(339, (1,))
+    if set(sample_format) != {1}:
+        return None
+
+    photometric = tags.get(262, (0,))[0]
+    bps = tags.get(258, (1,))
+    extra = tags.get(338, ())
+    samples = tags.get(277, (1,))[0]
+    if samples < len(bps):
+        bps = bps[:samples]
+    elif samples > len(bps) and len(bps) == 1:
+        bps = bps * samples
+    mode = _TIFF_MODES.get((photometric, bps, extra))
+    if mode is None or len(bps) != samples:
+        return None
+
+    width, height = tags[256][0], tags[257][0]
+    if tags.get(274, (1,))[0] in (5, 6, 7, 8):
+        width, height = height, width
+
+    # Разрешение - по правилам TiffImagePlugin
+    dpi = None
+    xres = tags.get(282, ((1, 1),))[0]
+    yres = tags.get(283, ((1, 1),))[0]
+    if xres[1] == 0 or yres[1] == 0:
+        return None
+    xres, yres = xres[0] / xres[1], yres[0] / yres[1]
+    if xres and yres:
+        unit = tags.get(296, (None,))[0]
+        if unit == 2 or unit is None:
+            dpi = (xres, yres)
+        elif unit == 3:
+            dpi = (xres * 2.54, yres * 2.54)
+
+    return ImageHeader('TIFF', width, height, mode, dpi, _TIFF_COMPRESSION[code])
@@ -0,0 +1,161 @@
+"""Извлечение метаданных изображений без графического интерфейса
+
+Используется просмотрщиком (image_info_viewer.py) и утилитой командной
+строки (image_info_cli.py).
+"""
+
+import os
+import time
+from collections import namedtuple
+
+from image_headers import ImageHeader, open_counted, read_image_header
+
+
+# format, width, height, mode, dpi, compression - как в ImageHeader;
+# file_size - размер файла, bytes_read - сколько байт прочитано с диска
+ImageMetadata = namedtuple(
+    'ImageMetadata',
+    'path format width height mode dpi compression file_size bytes_read')
+
+DEFAULT_DPI = "96 x 96 (по умолчанию)"
+
+
+def read_metadata(filepath, stats=None):
+    """Метаданные изображения (исключение, если файл не читается)
+
+    Сначала заголовок разбирается собственными парсерами, Pillow - только
+    для необычных файлов. Файл открывается один раз. stats (ScanStats) -
+    необязательный сбор длительности этапов.
+    """
+    start = time.perf_counter()
+    with open_counted(filepath) as f:
+        opened = time.perf_counter()
+        header = read_image_header(f)
+        if header is None:
+            f.seek(0)
+            header = read_header_pil(f, filepath)
+        parsed = time.perf_counter()
+        file_size = os.fstat(f.fileno()).st_size
+        metadata = ImageMetadata(filepath, *header, file_size, f.raw.bytes_read)
+    if stats is not None:
+        stats.record_file(opened - start, parsed - opened,
+                          time.perf_counter() - parsed, metadata.bytes_read)
+    return metadata
+
+
+def read_header_pil(source, filepath=None):
+    """Заголовок через Pillow (полный разбор файла)
+
+    source - путь или открытый файл, filepath - имя файла для сообщения об ошибке.
+    """
+    # Pillow импортируется только при необходимости
+    from PIL import Image, UnidentifiedImageError
+    try:
+        img = Image.open(source)
+    except UnidentifiedImageError:
+        raise UnidentifiedImageError(
+            f"cannot identify image file {filepath or source!r}") from None
+    with img:
+        dpi = img.info.get('dpi', None)
+        if isinstance(dpi, tuple):
+            # TIFF и EXIF дают IFDRational, который не форматируется как число
+            dpi = tuple(float(value) for value in dpi)
+        return ImageHeader(img.format, img.width, img.height, img.mode,
+                           dpi, img.info.get('compression', None))
+
+
+def format_dpi(dpi):
+    """Разрешение для отображения"""
+    if dpi:
+        if isinstance(dpi, tuple):
+            if dpi[0] > 0 and dpi[1] > 0:
+                return f"{dpi[0]:.0f} x {dpi[1]:.0f}"
+            return DEFAULT_DPI
+        if dpi > 0:
+            return str(dpi)
+    return DEFAULT_DPI
+
+
+def get_bit_depth(mode):
+    """Описание глубины цвета по режиму PIL"""
+    mode_bits = {
+        '1': '1 бит (монохромное)',
+        'L': '8 бит (градации серого)',
+        'P': '8 бит (палитра)',
+        'RGB': '24 бита (RGB)',
+        'RGBA': '32 бита (RGBA)',
+        'CMYK': '32 бита (CMYK)',
+        'YCbCr': '24 бита (YCbCr)',
+        'LAB': '24 бита (LAB)',
+        'HSV': '24 бита (HSV)',
+        'I': '32 бита (целые)',
+        'F': '32 бита (float)',
+        'LA': '16 бит (градации серого + альфа)',
+        'PA': '16 бит (палитра + альфа)',
+        'RGBX': '32 бита (RGB + padding)',
+        'RGBa': '32 бита (RGB + альфа предварительно умноженная)',
+        'La': '16 бит (градации серого + альфа предварительно умноженная)',
+        'I;16': '16 бит (целые)',
+        'I;16B': '16 бит (целые, big endian)',
+        'I;16L': '16 бит (целые, little endian)',
+        'I;16S': '16 бит (целые со знаком)',
+        'I;16BS': '16 бит (целые со знаком, big endian)',
+        'I;16LS': '16 бит (целые со знаком, little endian)',
+    }
+    return mode_bits.get(mode, f'{mode} (неизвестно)')
+
+
+def get_bmp_compression(comp_code):
+    """Определение типа сжатия BMP"""
+    if isinstance(comp_code, int):
+        compression_types = {
+            0: 'RGB (без сжатия)',
+            1: 'RLE 8-bit',
+            2: 'RLE 4-bit',
+            3: 'Bitfields',
+            4: 'JPEG',
+            5: 'PNG',
+        }
+        return compression_types.get(comp_code, f'Неизвестное ({comp_code})')
+    return str(comp_code)
+
+
+def describe_compression(metadata):
+    """Тип сжатия: из заголовка (BMP, TIFF) или по формату файла"""
+    if metadata.compression is not None:
+        return get_bmp_compression(metadata.compression)
+    format_name = metadata.format
+    if format_name == 'JPEG':
+        return 'JPEG'
+    if format_name == 'PNG':
+        return 'PNG (deflate)'
+    if format_name == 'BMP':
+        return 'RGB (без сжатия)'
+    if format_name == 'GIF':
+        return 'LZW'
+    return 'Не указано'
+
+
+def format_row(metadata):
+    """Строка таблицы просмотрщика"""
+    return (os.path.basename(metadata.path),
+            f"{metadata.width} x {metadata.height}",
+            format_dpi(metadata.dpi),
+            get_bit_depth(metadata.mode),
+            f"{describe_compression(metadata)}, {metadata.file_size / 1024:.2f} КБ")
+
+
+def error_row(filepath, error):
+    """Строка таблицы для файла, который не удалось прочитать"""
+    filename = os.path.basename(filepath)
+    return (filename, "Ошибка", "Ошибка", "Ошибка", f"Ошибка: {str(error)}")
+
+
+def get_image_info(filepath, stats=None):
+    """Получение информации об изображении (строка таблицы, ошибки - в строке)"""
+    try:
+        return format_row(read_metadata(filepath, stats))
+    except Exception as e:
+        if stats is not None:
+            stats.record_error()
+        return error_row(filepath, e)
@@ -0,0 +1,238 @@
+"""Экспорт метаданных изображений из командной строки (без Tk)
+
+Файлы разбираются пулом потоков, записи выводятся по мере готовности в
+исходном порядке, поэтому память не зависит от количества файлов.
+
+Примеры:
+    python image_info_cli.py test_files > info.csv
+    python image_info_cli.py /archive --format jsonl -o info.jsonl --workers 64
+    python image_info_cli.py /archive --format parquet -o info.parquet
+    python image_info_cli.py /mnt/nas --workers 64 --report nas_64.txt > /dev/null
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from file_scanner import IMAGE_EXTENSIONS, FolderScanner
+from image_info import describe_compression, get_bit_depth, read_metadata
+from scan_stats import ScanStats
+
+
+FIELDS = ('path', 'format', 'width', 'height', 'dpi_x', 'dpi_y', 'mode',
+          'bit_depth', 'compression', 'file_size', 'error')
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def extract_record(filepath, stats=None):
+    """Запись о файле и количество прочитанных байт; ошибка - в поле error"""
+    record = dict.fromkeys(FIELDS)
+    record['path'] = filepath
+    try:
+        metadata = read_metadata(filepath, stats)
+    except Exception as e:
+        if stats is not None:
+            stats.record_error()
+        record['error'] = str(e)
+        return record, 0
+
+    dpi = metadata.dpi
+    if dpi and not isinstance(dpi, tuple):
+        dpi = (dpi, dpi)
+    record.update(
+        format=metadata.format,
+        width=metadata.width,
+        height=metadata.height,
+        dpi_x=float(dpi[0]) if dpi else None,
+        dpi_y=float(dpi[1]) if dpi else None,
+        mode=metadata.mode,
+        bit_depth=get_bit_depth(metadata.mode),
+        compression=describe_compression(metadata),
+        file_size=metadata.file_size,
+    )
+    return record, metadata.bytes_read
+
+
+def iter_paths(inputs, extensions=IMAGE_EXTENSIONS, stats=None):
+    """Пути файлов: файлы - как есть, папки - потоковым обходом FolderScanner"""
+    for path in inputs:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        scanner = FolderScanner(path, extensions, stats=stats)
+        scanner.start()
+        try:
+            while True:
+                chunk = scanner.get_chunk(1024)
+                if chunk is None:
+                    break
+                yield from chunk
+        finally:
+            scanner.cancel()
+
+
+def scan(paths, workers=DEFAULT_WORKERS, max_in_flight=None, stats=None):
+    """Генератор (запись, прочитано байт) в порядке путей
+
+    Одновременно обрабатывается не больше max_in_flight файлов.
+    stats (ScanStats) - необязательный сбор длительности этапов.
+    """
+    max_in_flight = max_in_flight or workers * 4
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(extract_record, path, stats))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# --- Запись --------------------------------------------------------------
+
+class CsvRecordWriter:
+    def __init__(self, stream):
+        self.writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+
+    def close(self):
+        pass
+
+
+class JsonLinesRecordWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        pass
+
+
+class ParquetRecordWriter:
+    """Запись в Parquet группами строк по row_group_size записей"""
+
+    def __init__(self, path, row_group_size=65536):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Для формата parquet нужен пакет pyarrow") from None
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ('path', pa.string()), ('format', pa.string()),
+            ('width', pa.int64()), ('height', pa.int64()),
+            ('dpi_x', pa.float64()), ('dpi_y', pa.float64()),
+            ('mode', pa.string()), ('bit_depth', pa.string()),
+            ('compression', pa.string()), ('file_size', pa.int64()),
+            ('error', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.row_group_size = row_group_size
+        self.columns = {name: [] for name in FIELDS}
+
+    def write(self, record):
+        for name in FIELDS:
+            self.columns[name].append(record[name])
+        if len(self.columns['path']) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.columns['path']:
+            self.writer.write_table(self.pa.table(self.columns, schema=self.schema))
+            self.columns = {name: [] for name in FIELDS}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Экспорт метаданных изображений (размер, DPI, глубина цвета, сжатие)")
+    parser.add_argument('inputs', nargs='+', help="файлы и папки (папки обходятся рекурсивно)")
+    parser.add_argument('--format', choices=('csv', 'jsonl', 'parquet'), default='csv',
+                        help="формат вывода (по умолчанию csv)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="выходной файл ('-' - стандартный вывод, кроме parquet)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="количество потоков чтения")
+    parser.add_argument('--report', metavar='FILE',
+                        help="сохранить статистику по этапам (текст или *.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers <= 0:
+        print("Ошибка: --workers должен быть положительным", file=sys.stderr)
+        return 2
+
+    output = None
+    try:
+        if args.format == 'parquet':
+            if args.output == '-':
+                print("Ошибка: для parquet укажите файл через -o", file=sys.stderr)
+                return 2
+            writer = ParquetRecordWriter(args.output)
+        else:
+            if args.output == '-':
+                output = sys.stdout
+            else:
+                output = open(args.output, 'w', newline='', encoding='utf-8')
+            writer_class = CsvRecordWriter if args.format == 'csv' else JsonLinesRecordWriter
+            writer = writer_class(output)
+    except (ValueError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+    stats = ScanStats(', '.join(args.inputs), args.workers) if args.report else None
+    files = errors = bytes_read = 0
+    start = time.perf_counter()
+    try:
+        for record, size in scan(iter_paths(args.inputs, stats=stats), args.workers,
+                                 stats=stats):
+            writer.write(record)
+            files += 1
+            errors += record['error'] is not None
+            bytes_read += size
+        writer.close()
+    except OSError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if output is not None and output is not sys.stdout:
+            output.close()
+        elif output is not None:
+            output.flush()
+    elapsed = time.perf_counter() - start
+
+    rate = files / elapsed if elapsed > 0 else 0
+    mb_rate = bytes_read / 1024 / 1024 / elapsed if elapsed > 0 else 0
+    print(f"Обработано {files} файлов (ошибок: {errors}) за {elapsed:.3f} с: "
+          f"{rate:,.0f} файлов/с, прочитано {bytes_read / 1024 / 1024:.1f} МБ "
+          f"({mb_rate:,.1f} МБ/с)", file=sys.stderr)
+
+    if stats is not None:
+        stats.finish()
+        try:
+            stats.dump(args.report)
+        except OSError as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,54 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-from PIL import Image
+import sqlite3
+from image_info import error_row, format_row, get_image_info, read_metadata
+from metadata_index import MetadataIndex
+from result_store import ResultStore
+from file_scanner import IMAGE_EXTENSIONS, FileListSource, FolderScanner
+from pixel_stats import PixelStatsPool, chain_row
+from duplicates import STAGES as DUPLICATE_STAGES, DuplicateSearchCancelled, find_duplicates
+from scan_stats import ScanStats
+from thumbnails import ThumbnailCache
+import queue
 import threading
-from pathlib import Path
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 
 
 class ImageInfoViewer:
+    # Чтение метаданных ограничено вводом-выводом, поэтому потоков больше, чем ядер
+    MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+    # Сколько файлов может обрабатываться одновременно (ограничивает память)
+    MAX_IN_FLIGHT = MAX_WORKERS * 4
+    # Результаты передаются в интерфейс пачками не чаще, чем раз в FLUSH_INTERVAL секунд
+    FLUSH_INTERVAL = 0.1
+    # Сколько файлов проверяется по индексу одним запросом
+    INDEX_CHUNK = 500
+    # Период разбора очереди результатов в интерфейсе, мс (~30 кадров/с)
+    FRAME_INTERVAL = 33
+    # Сколько времени кадра можно тратить на приём результатов, с
+    FRAME_BUDGET = 0.015
+    # Строк за один шаг колеса мыши
+    WHEEL_ROWS = 3
+    
+    COLUMNS = ("Имя файла", "Размер (пиксели)", "Разрешение (DPI)",
+               "Глубина цвета", "Сжатие")
+    # Столбцы глубокого анализа (заполняются только в этом режиме)
+    STATS_COLUMNS = ("Среднее", "Мин – Макс", "Гистограмма", "pHash")
+    EMPTY_STATS = ("",) * len(STATS_COLUMNS)
+    # Полный путь к файлу хранится в скрытом столбце
+    PATH_COLUMN = "Путь"
+    
+    # Миниатюры: размер, потоки генерации и сколько PhotoImage держать в памяти
+    THUMBNAIL_SIZE = (64, 64)
+    THUMBNAIL_WORKERS = 4
+    PHOTO_CACHE_SIZE = 256
+    
+    # Сколько групп дубликатов показывать в окне результатов
+    MAX_DUPLICATE_GROUPS = 1000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Просмотр информации об изображениях")
@@ -14,6 +56,32 @@ class ImageInfoViewer:
         
         self.loading = False
         self.cancel_loading = False
+        # Путь к индексу метаданных (None - каталог кэша пользователя)
+        self.index_path = None
+        
+        # Все строки хранятся в ResultStore, Treeview показывает только видимое окно
+        self.store = ResultStore(
+            encoded=(False, True, True, True, False, False, True, False, False, False))
+        self.view_start = 0
+        self.visible_rows = 20
+        self.rendered = []
+        # Рабочий поток передаёт результаты через очередь, интерфейс разбирает её по таймеру
+        self.results_queue = queue.SimpleQueue()
+        self.progress_mode = 'determinate'
+        
+        # Миниатюры генерируются только для видимых строк, по требованию
+        self.thumbnail_cache = None
+        self.thumbnail_executor = None
+        self.thumbnail_requests = {}
+        self.thumbnail_failed = set()
+        self.thumbnail_photos = OrderedDict()
+        self.thumbnail_queue = queue.SimpleQueue()
+        self.thumbnail_polling = False
+        
+        # Длительность этапов последнего сканирования (ScanStats)
+        self.scan_stats = None
+        # Сообщения потока поиска дубликатов
+        self.duplicates_queue = queue.SimpleQueue()
         
         self.create_widgets()
         
@@ -32,6 +100,23 @@ class ImageInfoViewer:
                                        command=self.cancel_load, state=tk.DISABLED)
         self.cancel_button.pack(side=tk.LEFT, padx=5)
         
+        self.report_button = ttk.Button(top_frame, text="Отчёт о скорости",
+                                        command=self.save_report, state=tk.DISABLED)
+        self.report_button.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(top_frame, text="Найти дубликаты",
+                  command=self.search_duplicates).pack(side=tk.LEFT, padx=5)
+        
+        # Глубокий анализ: полное декодирование в пуле процессов
+        self.deep_scan_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Глубокий анализ (статистика пикселей)",
+                        variable=self.deep_scan_var,
+                        command=self._update_display_columns).pack(side=tk.LEFT, padx=5)
+        
+        self.thumbnails_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Миниатюры", variable=self.thumbnails_var,
+                        command=self._toggle_thumbnails).pack(side=tk.LEFT, padx=5)
+        
         self.progress_frame = ttk.Frame(self.root, padding="10")
         self.progress_frame.pack(fill=tk.X)
         
@@ -44,10 +129,10 @@ class ImageInfoViewer:
         table_frame = ttk.Frame(self.root)
         table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        columns = ("Имя файла", "Размер (пиксели)", "Разрешение (DPI)", 
-                   "Глубина цвета", "Сжатие")
+        columns = self.COLUMNS + self.STATS_COLUMNS + (self.PATH_COLUMN,)
         
-        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=20)
+        self.tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=20,
+                                 displaycolumns=self.COLUMNS)
         
         self.tree.heading("Имя файла", text="Имя файла")
         self.tree.heading("Размер (пиксели)", text="Размер (пиксели)")
@@ -61,14 +146,26 @@ class ImageInfoViewer:
         self.tree.column("Глубина цвета", width=150, anchor=tk.CENTER)
         self.tree.column("Сжатие", width=200, anchor=tk.CENTER)
         
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
+        for column in self.STATS_COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=150, anchor=tk.CENTER)
+        
+        # Столбец #0 (дерево) показывает миниатюры, включается флажком
+        self.tree.column('#0', width=self.THUMBNAIL_SIZE[0] + 16, stretch=False)
+        ttk.Style().configure('Thumbnails.Treeview', rowheight=self.THUMBNAIL_SIZE[1] + 4)
+        
+        # Прокрутка виртуальная: полоса управляет окном строк, а не самим Treeview
+        self.vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self._on_scroll)
+        self.tree.bind('<Configure>', self._on_tree_resize)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', self._on_mousewheel)
+        self.tree.bind('<Button-5>', self._on_mousewheel)
         
         hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
         self.tree.configure(xscrollcommand=hsb.set)
         
         self.tree.grid(row=0, column=0, sticky='nsew')
-        vsb.grid(row=0, column=1, sticky='ns')
+        self.vsb.grid(row=0, column=1, sticky='ns')
         hsb.grid(row=1, column=0, sticky='ew')
         
         table_frame.grid_rowconfigure(0, weight=1)
@@ -100,22 +197,15 @@ class ImageInfoViewer:
         folder = filedialog.askdirectory(title='Выберите папку с изображениями')
         
         if folder:
-            image_extensions = ('.bmp', '.jpg', '.jpeg', '.png', '.gif', '.tiff', '.tif')
-            files = []
-            
-            for file in Path(folder).rglob('*'):
-                if file.is_file() and file.suffix.lower() in image_extensions:
-                    files.append(str(file))
-            
-            if files:
-                self.process_files(files)
-            else:
-                messagebox.showinfo("Информация", "В выбранной папке не найдено изображений")
+            # Поиск файлов идёт в фоне параллельно с обработкой уже найденных
+            self.process_source(FolderScanner(folder, IMAGE_EXTENSIONS))
     
     def clear_table(self):
         """Очистка таблицы"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.store.clear()
+        self.view_start = 0
+        self._refresh_view()
+        self._cancel_thumbnails(set())
         self.status_label.config(text="Готов")
         self.progress_label.config(text="")
         self.progress_bar['value'] = 0
@@ -125,8 +215,34 @@ class ImageInfoViewer:
         self.cancel_loading = True
         self.cancel_button.config(state=tk.DISABLED)
     
+    def save_report(self):
+        """Сохранение статистики по этапам последнего сканирования"""
+        if self.scan_stats is None:
+            return
+        filename = filedialog.asksaveasfilename(
+            title='Сохранить отчёт о скорости',
+            defaultextension='.txt',
+            filetypes=(('Текст', '*.txt'), ('JSON', '*.json'))
+        )
+        if filename:
+            try:
+                self.scan_stats.dump(filename)
+            except OSError as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить отчёт: {e}")
+    
     def process_files(self, files):
         """Обработка списка файлов в отдельном потоке"""
+        self.process_source(FileListSource(files))
+    
+    def _update_display_columns(self):
+        """Показ столбцов статистики только в режиме глубокого анализа"""
+        if self.deep_scan_var.get():
+            self.tree.configure(displaycolumns=self.COLUMNS + self.STATS_COLUMNS)
+        else:
+            self.tree.configure(displaycolumns=self.COLUMNS)
+    
+    def process_source(self, source):
+        """Обработка файлов из источника (FileListSource или FolderScanner)"""
         if self.loading:
             messagebox.showwarning("Предупреждение", 
                                   "Дождитесь завершения текущей загрузки")
@@ -135,137 +251,546 @@ class ImageInfoViewer:
         self.loading = True
         self.cancel_loading = False
         self.cancel_button.config(state=tk.NORMAL)
+        self.status_label.config(text="Загрузка...")
         
-        thread = threading.Thread(target=self._process_files_thread, args=(files,))
+        # Обход папки тоже записывает длительность в статистику
+        self.scan_stats = ScanStats(getattr(source, 'folder', f"{source.found} файлов"),
+                                    self.MAX_WORKERS)
+        source.stats = self.scan_stats
+        self.report_button.config(state=tk.NORMAL)
+        
+        if not source.done:
+            self._set_progress_mode('indeterminate')
+        source.start()
+        thread = threading.Thread(target=self._process_files_thread,
+                                  args=(source, self.deep_scan_var.get()))
         thread.daemon = True
         thread.start()
+        self.root.after(self.FRAME_INTERVAL, self._drain_queue)
     
-    def _process_files_thread(self, files):
-        """Обработка файлов в отдельном потоке"""
-        total = len(files)
+    def _process_files_thread(self, source, deep_scan=False):
+        """Обработка файлов пулом потоков с сохранением порядка
         
-        for idx, filepath in enumerate(files):
-            if self.cancel_loading:
-                self.root.after(0, lambda: self.status_label.config(
-                    text=f"Загрузка отменена. Обработано {idx} из {total} файлов"))
-                break
-            
-            progress = (idx / total) * 100
-            self.root.after(0, lambda p=progress, i=idx, t=total: self._update_progress(p, i, t))
-            
-            info = self.get_image_info(filepath)
-            
-            if info:
-                self.root.after(0, lambda i=info: self.tree.insert('', 'end', values=i))
+        Пути берутся из источника пачками по мере поиска, в обработке
+        одновременно не больше MAX_IN_FLIGHT файлов. При deep_scan заголовки
+        тоже читаются в пуле потоков, а файлы с прочитанным заголовком по
+        порядку передаются на декодирование в пул процессов PixelStatsPool,
+        пока это позволяет его ограничение по количеству задач и памяти.
+        """
+        processed = 0
+        from_index = 0
+        batch = []
+        records = []
+        # Первая пачка отправляется сразу, следующие - раз в FLUSH_INTERVAL
+        last_flush = float('-inf')
+        exhausted = False
+        
+        index = None if deep_scan else self._open_index()
+        executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+        stats_pool = PixelStatsPool() if deep_scan else None
+        # Глубокий анализ: (путь, future заголовка, future строки) в ожидании пула процессов
+        headers = deque()
+        pending = deque()
         
-        self.loading = False
-        self.root.after(0, lambda: self.cancel_button.config(state=tk.DISABLED))
-        self.root.after(0, lambda t=total: self.status_label.config(
-            text=f"Загружено {t} файлов"))
-        self.root.after(0, lambda: self.progress_bar.config(value=100))
-    
-    def _update_progress(self, progress, current, total):
-        """Обновление прогресс-бара"""
-        self.progress_bar['value'] = progress
-        self.progress_label.config(text=f"Обработано {current} из {total}")
-    
-    def get_image_info(self, filepath):
-        """Получение информации об изображении"""
         try:
-            with Image.open(filepath) as img:
-                filename = os.path.basename(filepath)
-                
-                size = f"{img.width} x {img.height}"
-                
-                dpi = img.info.get('dpi', None)
-                if dpi:
-                    if isinstance(dpi, tuple):
-                        if dpi[0] > 0 and dpi[1] > 0:
-                            dpi_str = f"{dpi[0]:.0f} x {dpi[1]:.0f}"
-                        else:
-                            dpi_str = "96 x 96 (по умолчанию)"
+            while not self.cancel_loading:
+                while not exhausted and len(pending) < self.MAX_IN_FLIGHT:
+                    # Пачка не больше свободных мест, чтобы не превысить MAX_IN_FLIGHT;
+                    # ждём новые пути, только если обрабатывать пока нечего
+                    chunk = source.get_chunk(min(self.INDEX_CHUNK, self.MAX_IN_FLIGHT - len(pending)),
+                                             block=not pending)
+                    if chunk is None:
+                        exhausted = True
+                    elif not chunk:
+                        break
+                    elif stats_pool is not None:
+                        pending.extend(self._submit_headers(executor, chunk, headers, source.stats))
                     else:
-                        if dpi > 0:
-                            dpi_str = str(dpi)
-                        else:
-                            dpi_str = "96 x 96 (по умолчанию)"
-                else:
-                    dpi_str = "96 x 96 (по умолчанию)"
-                
-                mode = img.mode
-                bit_depth = self._get_bit_depth(mode)
+                        pending.extend(self._submit_chunk(executor, chunk, index, source.stats))
                 
-                file_size_kb = os.path.getsize(filepath) / 1024
+                if stats_pool is not None:
+                    self._submit_deep(stats_pool, headers)
                 
-                compression = img.info.get('compression', None)
-                
-                if compression is not None:
-                    compression = self._get_bmp_compression(compression)
-                elif hasattr(img, 'format'):
-                    format_name = img.format
-                    if format_name == 'JPEG':
-                        compression = 'JPEG'
-                    elif format_name == 'PNG':
-                        compression = 'PNG (deflate)'
-                    elif format_name == 'BMP':
-                        compression = 'RGB (без сжатия)'
-                    elif format_name == 'GIF':
-                        compression = 'LZW'
-                    elif format_name == 'TIFF':
-                        compression = img.info.get('compression', 'Не указано')
-                    else:
-                        compression = 'Не указано'
-                else:
-                    compression = 'Не указано'
+                if not pending:
+                    if exhausted:
+                        break
+                    continue
                 
-                compression_with_size = f"{compression}, {file_size_kb:.2f} КБ"
+                key, future, cached = pending[0]
+                if not future.done():
+                    waiting = [future]
+                    if headers and not headers[0][1].done():
+                        # Готовый заголовок нужно сразу передать в пул процессов
+                        waiting.append(headers[0][1])
+                    # Ждём с таймаутом, чтобы отмена и новые пути обрабатывались даже на медленных файлах
+                    wait(waiting, timeout=0.1 if exhausted else 0.01, return_when=FIRST_COMPLETED)
+                    continue
                 
-                return (filename, size, dpi_str, bit_depth, compression_with_size)
+                pending.popleft()
+                info = future.result()
+                processed += 1
+                if cached:
+                    from_index += 1
+                elif key[1] is not None and info[1] != "Ошибка":
+                    records.append((*key, info))
+                if info:
+                    if not deep_scan:
+                        info += self.EMPTY_STATS
+                    # Полный путь - скрытый последний столбец (нужен для миниатюр)
+                    batch.append(info + (key[0],))
                 
+                now = time.monotonic()
+                if now - last_flush >= self.FLUSH_INTERVAL:
+                    self.results_queue.put(('rows', batch, processed, source.found, source.done))
+                    self._store_records(index, records)
+                    batch = []
+                    records = []
+                    last_flush = now
+        finally:
+            source.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if stats_pool is not None:
+                stats_pool.shutdown(cancel=True)
+            self._store_records(index, records)
+            if index is not None:
+                index.close()
+        
+        self.results_queue.put(('rows', batch, processed, source.found, source.done))
+        self.results_queue.put(('done', processed, source.found, from_index))
+    
+    def _submit_chunk(self, executor, files, index, stats=None):
+        """Тройки (ключ, future, из индекса) для пачки файлов в исходном порядке
+        
+        Ключи файлов (os.stat) получаются в пуле потоков - на сетевых дисках
+        это по обращению к серверу на файл. Затем пачка проверяется по индексу
+        одним запросом: для найденных файлов возвращается готовый future,
+        остальные отправляются в пул. Если файл недоступен, размер и mtime_ns
+        в ключе равны None.
+        """
+        start = time.perf_counter()
+        # По одной части пачки на поток: задача на каждый файл дороже самого stat на локальном диске
+        step = -(-len(files) // self.MAX_WORKERS)
+        parts = executor.map(ImageInfoViewer._file_keys,
+                             [files[i:i + step] for i in range(0, len(files), step)])
+        keys = [key for part in parts for key in part]
+        
+        found = index.lookup(keys) if index is not None else {}
+        if stats is not None:
+            stats.record_index(time.perf_counter() - start, len(found))
+        tasks = []
+        for key in keys:
+            row = found.get(key[0])
+            if row is not None:
+                future = Future()
+                future.set_result(row)
+                tasks.append((key, future, True))
+            else:
+                tasks.append((key, executor.submit(get_image_info, key[0], stats), False))
+        return tasks
+    
+    @staticmethod
+    def _file_keys(files):
+        keys = []
+        for filepath in files:
+            try:
+                keys.append(MetadataIndex.file_key(filepath))
+            except OSError:
+                # Ошибку покажет get_image_info, в индекс такой файл не попадёт
+                keys.append((filepath, None, None))
+        return keys
+    
+    @staticmethod
+    def _submit_headers(executor, files, headers, stats=None):
+        """Тройки (ключ, future строки со статистикой, False) для глубокого анализа
+        
+        Заголовки читаются в пуле потоков (по размерам оценивается память),
+        строка заполняется после декодирования пикселей (_submit_deep).
+        В индекс такие строки не записываются.
+        """
+        tasks = []
+        for filepath in files:
+            row = Future()
+            headers.append((filepath, executor.submit(ImageInfoViewer._read_header, filepath, stats), row))
+            tasks.append(((filepath, None, None), row, False))
+        return tasks
+    
+    @staticmethod
+    def _read_header(filepath, stats=None):
+        """(метаданные, None) или (None, строка с ошибкой) - выполняется в пуле потоков"""
+        try:
+            return read_metadata(filepath, stats), None
+        except Exception as e:
+            # Строка ошибки - как у get_image_info, без повторного чтения файла
+            if stats is not None:
+                stats.record_error()
+            return None, error_row(filepath, e) + ImageInfoViewer.EMPTY_STATS
+    
+    @staticmethod
+    def _submit_deep(stats_pool, headers):
+        """Передача файлов с прочитанными заголовками в пул процессов
+        
+        Файлы передаются по порядку, пока пул принимает задачи (обратное
+        давление по количеству задач и памяти).
+        """
+        while headers and headers[0][1].done() and stats_pool.can_submit():
+            filepath, header, row = headers.popleft()
+            metadata, error_row = header.result()
+            if metadata is None:
+                row.set_result(error_row)
+                continue
+            stats_future = stats_pool.submit(filepath, metadata.width, metadata.height)
+            chain_row(stats_future, format_row(metadata), row)
+    
+    def _open_index(self):
+        """Открытие индекса метаданных (None, если кэш недоступен)"""
+        try:
+            return MetadataIndex(self.index_path)
+        except (sqlite3.Error, OSError):
+            return None
+    
+    @staticmethod
+    def _store_records(index, records):
+        """Запись новых строк в индекс; ошибка записи не прерывает загрузку"""
+        if index is None or not records:
+            return
+        try:
+            index.store(records)
+        except sqlite3.Error:
+            pass
+    
+    def _drain_queue(self):
+        """Приём результатов из очереди раз в кадр (поток Tk)
+        
+        Все пачки, пришедшие за кадр, добавляются в хранилище, после чего
+        видимое окно таблицы перерисовывается один раз.
+        """
+        start = time.perf_counter()
+        deadline = start + self.FRAME_BUDGET
+        progress = None
+        finished = None
+        
+        while time.perf_counter() < deadline:
+            try:
+                message = self.results_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'rows':
+                _, rows, processed, total, total_known = message
+                self.store.append_rows(rows)
+                progress = (processed, total, total_known)
+            else:
+                finished = message[1:]
+                break
+        
+        self._refresh_view()
+        if progress is not None:
+            if self.scan_stats is not None:
+                self.scan_stats.record('tk', time.perf_counter() - start)
+                self.status_label.config(text=f"Загрузка... {self.scan_stats.status_line()}")
+            processed, total, total_known = progress
+            if total_known:
+                self._set_progress_mode('determinate')
+                self._update_progress(processed / total * 100 if total else 100, processed, total)
+            else:
+                # Общее количество ещё неизвестно - поиск файлов продолжается
+                self.progress_label.config(
+                    text=f"Обработано {processed}, найдено {total} (поиск продолжается)")
+        
+        if finished is None:
+            self.root.after(self.FRAME_INTERVAL, self._drain_queue)
+        else:
+            self._finish_loading(*finished)
+    
+    def _finish_loading(self, processed, total, from_index):
+        """Завершение загрузки после приёма всех результатов"""
+        self.loading = False
+        self.cancel_button.config(state=tk.DISABLED)
+        self._set_progress_mode('determinate')
+        self.scan_stats.finish()
+        if self.cancel_loading:
+            self.status_label.config(
+                text=f"Загрузка отменена. Обработано {processed} из {total} файлов")
+        else:
+            self.status_label.config(text=f"Загружено {total} файлов (из индекса: {from_index}), "
+                                          f"{self.scan_stats.status_line()}")
+            self.progress_bar.config(value=100)
+            if total == 0:
+                messagebox.showinfo("Информация", "В выбранной папке не найдено изображений")
+    
+    def _set_progress_mode(self, mode):
+        """Переключение прогресс-бара: 'indeterminate' пока общее количество неизвестно"""
+        if self.progress_mode == mode:
+            return
+        self.progress_mode = mode
+        if mode == 'indeterminate':
+            self.progress_bar.config(mode=mode)
+            self.progress_bar.start(15)
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode=mode)
+    
+    def _refresh_view(self):
+        """Перерисовка видимого окна строк и полосы прокрутки"""
+        total = len(self.store)
+        self.view_start = max(0, min(self.view_start, total - self.visible_rows))
+        rows = self.store.rows(self.view_start, self.view_start + self.visible_rows)
+        
+        if rows != self.rendered:
+            items = self.tree.get_children()
+            for i, row in enumerate(rows):
+                if i >= len(items):
+                    self.tree.insert('', 'end', values=row)
+                elif i >= len(self.rendered) or row != self.rendered[i]:
+                    self.tree.item(items[i], values=row)
+            if len(items) > len(rows):
+                self.tree.delete(*items[len(rows):])
+            self.rendered = rows
+        
+        if total:
+            self.vsb.set(self.view_start / total,
+                         min(1.0, (self.view_start + self.visible_rows) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+        
+        if self.thumbnails_var.get():
+            self._update_thumbnails()
+    
+    def _scroll_to(self, start):
+        self.view_start = int(start)
+        self._refresh_view()
+    
+    def _on_scroll(self, *args):
+        """Команда вертикальной полосы прокрутки: moveto или scroll"""
+        if args[0] == 'moveto':
+            self._scroll_to(float(args[1]) * len(self.store))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.visible_rows
+            self._scroll_to(self.view_start + step)
+    
+    def _on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self._scroll_to(self.view_start - self.WHEEL_ROWS)
+        else:
+            self._scroll_to(self.view_start + self.WHEEL_ROWS)
+        return 'break'
+    
+    def _on_tree_resize(self, event):
+        self._update_visible_rows(event.height)
+    
+    def _update_visible_rows(self, height):
+        """Пересчёт количества видимых строк по высоте таблицы"""
+        style = self.tree.cget('style') or 'Treeview'
+        row_height = int(ttk.Style().lookup(style, 'rowheight') or 20)
+        # Одна строка высоты занята заголовком
+        visible_rows = max(1, height // row_height - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self._refresh_view()
+    
+    # --- Миниатюры -------------------------------------------------------
+    
+    def _toggle_thumbnails(self):
+        """Включение и выключение столбца миниатюр"""
+        if self.thumbnails_var.get():
+            if self.thumbnail_cache is None:
+                try:
+                    self.thumbnail_cache = ThumbnailCache(size=self.THUMBNAIL_SIZE,
+                                                          index_path=self.index_path)
+                except OSError as e:
+                    self.thumbnails_var.set(False)
+                    messagebox.showwarning("Предупреждение",
+                                           f"Кэш миниатюр недоступен: {e}")
+                    return
+                self.thumbnail_executor = ThreadPoolExecutor(
+                    max_workers=self.THUMBNAIL_WORKERS)
+            self.tree.configure(show=('tree', 'headings'), style='Thumbnails.Treeview')
+        else:
+            self._cancel_thumbnails(set())
+            for item in self.tree.get_children():
+                self.tree.item(item, image='')
+            self.tree.configure(show='headings', style='Treeview')
+        # Высота строки изменилась - пересчитываем число видимых строк
+        self._update_visible_rows(self.tree.winfo_height())
+        self._refresh_view()
+    
+    def _update_thumbnails(self):
+        """Миниатюры видимых строк: готовые - показать, остальные - заказать"""
+        paths = [row[-1] for row in self.rendered]
+        self._cancel_thumbnails(set(paths))
+        
+        for item, path in zip(self.tree.get_children(), paths):
+            photo = self.thumbnail_photos.get(path)
+            if photo is not None:
+                self.thumbnail_photos.move_to_end(path)
+            elif path not in self.thumbnail_requests and path not in self.thumbnail_failed:
+                future = self.thumbnail_executor.submit(self.thumbnail_cache.get, path)
+                self.thumbnail_requests[path] = future
+                future.add_done_callback(
+                    lambda f, p=path: self.thumbnail_queue.put((p, f)))
+            self.tree.item(item, image=photo or '')
+        
+        if self.thumbnail_requests and not self.thumbnail_polling:
+            self.thumbnail_polling = True
+            self.root.after(self.FRAME_INTERVAL, self._poll_thumbnails)
+    
+    def _cancel_thumbnails(self, keep):
+        """Отмена ещё не начатых заказов для строк, ушедших из видимого окна"""
+        for path, future in list(self.thumbnail_requests.items()):
+            if path not in keep and future.cancel():
+                del self.thumbnail_requests[path]
+    
+    def _poll_thumbnails(self):
+        """Приём готовых миниатюр (поток Tk)"""
+        received = False
+        while True:
+            try:
+                path, future = self.thumbnail_queue.get_nowait()
+            except queue.Empty:
+                break
+            if self.thumbnail_requests.get(path) is future:
+                del self.thumbnail_requests[path]
+            if future.cancelled():
+                continue
+            try:
+                photo = tk.PhotoImage(file=future.result())
+            except Exception:
+                # Файл не читается - миниатюры не будет, повторно не заказываем
+                self.thumbnail_failed.add(path)
+                continue
+            self.thumbnail_photos[path] = photo
+            if len(self.thumbnail_photos) > self.PHOTO_CACHE_SIZE:
+                self.thumbnail_photos.popitem(last=False)
+            received = True
+        
+        if received and self.thumbnails_var.get():
+            self._update_thumbnails()
+        if self.thumbnail_requests:
+            self.root.after(self.FRAME_INTERVAL, self._poll_thumbnails)
+        else:
+            self.thumbnail_polling = False
+    
+    # --- Дубликаты -------------------------------------------------------
+    
+    def search_duplicates(self):
+        """Поиск точных копий и похожих изображений среди загруженных файлов"""
+        if self.loading:
+            messagebox.showwarning("Предупреждение",
+                                  "Дождитесь завершения текущей загрузки")
+            return
+        if not len(self.store):
+            messagebox.showinfo("Информация", "Сначала загрузите изображения")
+            return
+        
+        self.loading = True
+        self.cancel_loading = False
+        self.cancel_button.config(state=tk.NORMAL)
+        self.status_label.config(text="Поиск дубликатов...")
+        self.progress_bar['value'] = 0
+        
+        # Снимок таблицы в потоке Tk: «Очистить» может изменить её во время поиска
+        store = self.store.snapshot()
+        thread = threading.Thread(target=self._duplicates_thread, args=(store,))
+        thread.daemon = True
+        thread.start()
+        self.root.after(self.FRAME_INTERVAL, self._poll_duplicates)
+    
+    def _duplicate_entries(self, store):
+        """(путь, ширина, высота, заголовок) для строк store без ошибок"""
+        for start in range(0, len(store), self.INDEX_CHUNK):
+            for row in store.rows(start, start + self.INDEX_CHUNK):
+                try:
+                    width, height = map(int, row[1].split(' x '))
+                except ValueError:
+                    # Строка с ошибкой чтения
+                    continue
+                # Сжатие без размера файла: размер сравнивается точно через os.stat
+                header = (row[3], row[4].rsplit(', ', 1)[0])
+                yield row[-1], width, height, header
+    
+    def _duplicates_thread(self, store):
+        """Поиск дубликатов в отдельном потоке; результат - в duplicates_queue"""
+        try:
+            report = find_duplicates(
+                self._duplicate_entries(store),
+                progress=lambda *args: self.duplicates_queue.put(('progress', *args)),
+                should_stop=lambda: self.cancel_loading)
+        except DuplicateSearchCancelled:
+            self.duplicates_queue.put(('done', None))
         except Exception as e:
-            filename = os.path.basename(filepath)
-            return (filename, "Ошибка", "Ошибка", "Ошибка", f"Ошибка: {str(e)}")
-    
-    def _get_bit_depth(self, mode):
-        mode_bits = {
-            '1': '1 бит (монохромное)',
-            'L': '8 бит (градации серого)',
-            'P': '8 бит (палитра)',
-            'RGB': '24 бита (RGB)',
-            'RGBA': '32 бита (RGBA)',
-            'CMYK': '32 бита (CMYK)',
-            'YCbCr': '24 бита (YCbCr)',
-            'LAB': '24 бита (LAB)',
-            'HSV': '24 бита (HSV)',
-            'I': '32 бита (целые)',
-            'F': '32 бита (float)',
-            'LA': '16 бит (градации серого + альфа)',
-            'PA': '16 бит (палитра + альфа)',
-            'RGBX': '32 бита (RGB + padding)',
-            'RGBa': '32 бита (RGB + альфа предварительно умноженная)',
-            'La': '16 бит (градации серого + альфа предварительно умноженная)',
-            'I;16': '16 бит (целые)',
-            'I;16B': '16 бит (целые, big endian)',
-            'I;16L': '16 бит (целые, little endian)',
-            'I;16S': '16 бит (целые со знаком)',
-            'I;16BS': '16 бит (целые со знаком, big endian)',
-            'I;16LS': '16 бит (целые со знаком, little endian)',
-        }
-        return mode_bits.get(mode, f'{mode} (неизвестно)')
-    
-    def _get_bmp_compression(self, comp_code):
-        """Определение типа сжатия BMP"""
-        if isinstance(comp_code, int):
-            compression_types = {
-                0: 'RGB (без сжатия)',
-                1: 'RLE 8-bit',
-                2: 'RLE 4-bit',
-                3: 'Bitfields',
-                4: 'JPEG',
-                5: 'PNG',
-            }
-            return compression_types.get(comp_code, f'Неизвестное ({comp_code})')
-        return str(comp_code)
+            self.duplicates_queue.put(('error', e))
+        else:
+            self.duplicates_queue.put(('done', report))
+    
+    def _poll_duplicates(self):
+        """Приём прогресса и результата поиска дубликатов (поток Tk)"""
+        progress = None
+        finished = None
+        while True:
+            try:
+                message = self.duplicates_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'progress':
+                progress = message[1:]
+            else:
+                finished = message
+                break
+        
+        if progress is not None:
+            stage, done, total = progress
+            self.progress_bar['value'] = done / total * 100 if total else 100
+            self.progress_label.config(
+                text=f"Дубликаты: {DUPLICATE_STAGES[stage]}, {done} из {total}")
+        
+        if finished is None:
+            self.root.after(self.FRAME_INTERVAL, self._poll_duplicates)
+            return
+        
+        self.loading = False
+        self.cancel_button.config(state=tk.DISABLED)
+        self.progress_label.config(text="")
+        kind, result = finished
+        if kind == 'error':
+            self.status_label.config(text="Ошибка поиска дубликатов")
+            messagebox.showerror("Ошибка", f"Не удалось найти дубликаты: {result}")
+        elif result is None:
+            self.status_label.config(text="Поиск дубликатов отменён")
+        else:
+            self.progress_bar['value'] = 100
+            self.status_label.config(
+                text=f"Групп точных копий: {len(result.exact)}, "
+                     f"групп похожих изображений: {len(result.near)}")
+            self._show_duplicates(result)
+    
+    def _show_duplicates(self, report):
+        """Окно с группами дубликатов"""
+        window = tk.Toplevel(self.root)
+        window.title("Дубликаты")
+        window.geometry("900x500")
+        
+        tree = ttk.Treeview(window, show='tree')
+        vsb = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        for title, groups in (("Точные копии", report.exact),
+                              ("Похожие изображения", report.near)):
+            text = f"{title}: {len(groups)} групп"
+            if len(groups) > self.MAX_DUPLICATE_GROUPS:
+                text += f" (показаны первые {self.MAX_DUPLICATE_GROUPS})"
+            section = tree.insert('', 'end', text=text, open=True)
+            for number, group in enumerate(groups[:self.MAX_DUPLICATE_GROUPS], 1):
+                node = tree.insert(section, 'end', text=f"Группа {number}: {len(group)} файлов")
+                for path in group:
+                    tree.insert(node, 'end', text=path)
+    
+    def _update_progress(self, progress, current, total):
+        """Обновление прогресс-бара"""
+        self.progress_bar['value'] = progress
+        self.progress_label.config(text=f"Обработано {current} из {total}")
 
 
 def main():
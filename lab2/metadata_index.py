@@ -0,0 +1,104 @@
+"""Постоянный индекс метаданных изображений (SQLite)
+
+Строки таблицы сохраняются с ключом (путь, размер, mtime_ns). При повторном
+сканировании неизменённые файлы берутся из индекса, заново разбираются
+только новые и изменённые. Там же с тем же ключом хранятся хеши содержимого
+файлов (ключи кэша миниатюр), чтобы не перечитывать файлы после перезапуска.
+"""
+
+import os
+import sqlite3
+
+
+class MetadataIndex:
+    """Индекс строк таблицы по (путь, размер, mtime_ns)"""
+
+    # Версия входит в имя файла: при изменении формата строк индекс строится заново
+    FILENAME = 'metadata_index_v1.sqlite3'
+    # Ограничение SQLite на количество параметров в одном запросе - 999
+    LOOKUP_CHUNK = 500
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(self.default_cache_dir(), self.FILENAME)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+        # WAL и synchronous=NORMAL: запись пачек без fsync на каждую транзакцию
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, '
+            'name TEXT, dimensions TEXT, dpi TEXT, bit_depth TEXT, compression TEXT)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS content_hashes ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)')
+        self.connection.commit()
+
+    @staticmethod
+    def default_cache_dir():
+        """Каталог кэша пользователя (XDG_CACHE_HOME или ~/.cache)"""
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+            os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'image_info_viewer')
+
+    @staticmethod
+    def file_key(filepath):
+        """Ключ файла (путь, размер, mtime_ns); OSError, если файл недоступен"""
+        st = os.stat(filepath)
+        return (filepath, st.st_size, st.st_mtime_ns)
+
+    def lookup(self, keys):
+        """Строки для ключей, совпадающих с индексом: {путь: строка}"""
+        keys = {path: (size, mtime_ns) for path, size, mtime_ns in keys}
+        paths = list(keys)
+        found = {}
+        for start in range(0, len(paths), self.LOOKUP_CHUNK):
+            chunk = paths[start:start + self.LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            cursor = self.connection.execute(
+                'SELECT path, size, mtime_ns, name, dimensions, dpi, bit_depth, compression '
+                f'FROM files WHERE path IN ({placeholders})', chunk)
+            for path, size, mtime_ns, *row in cursor:
+                if keys[path] == (size, mtime_ns):
+                    found[path] = tuple(row)
+        return found
+
+    def store(self, records):
+        """Сохранение пачки записей (путь, размер, mtime_ns, строка) одной транзакцией"""
+        if not records:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(path, size, mtime_ns, *row) for path, size, mtime_ns, row in records])
+
+    def content_hash(self, key):
+        """Сохранённый хеш содержимого для ключа (путь, размер, mtime_ns) или None"""
+        path, size, mtime_ns = key
+        row = self.connection.execute(
+            'SELECT size, mtime_ns, digest FROM content_hashes WHERE path = ?',
+            (path,)).fetchone()
+        if row is None or row[:2] != (size, mtime_ns):
+            return None
+        return row[2]
+
+    def store_content_hash(self, key, digest):
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO content_hashes VALUES (?, ?, ?, ?)', (*key, digest))
+
+    def clear(self):
+        """Удаление всех записей"""
+        with self.connection:
+            self.connection.execute('DELETE FROM files')
+            self.connection.execute('DELETE FROM content_hashes')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
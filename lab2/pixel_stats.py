@@ -0,0 +1,169 @@
+"""Статистика по пикселям изображения (глубокий анализ)
+
+Изображение декодируется полностью, поэтому работа ограничена процессором:
+PixelStatsPool выполняет её в пуле процессов, ограничивая количество задач
+в работе и оценку занятой ими памяти.
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+# mean, minimum, maximum - по каналам; histogram - 256 значений яркости;
+# phash - 64-битный перцептивный хеш яркости
+PixelStats = namedtuple('PixelStats', 'mean minimum maximum histogram phash')
+
+# Одноканальные режимы, статистика которых считается без преобразования
+SINGLE_BAND_MODES = ('L', 'I', 'F', 'I;16', 'I;16L', 'I;16B', 'I;16N')
+
+HASH_SIZE = 8
+HASH_SCALE = 4
+
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+SPARK_BINS = 16
+
+
+def _dct_matrix(n):
+    """Матрица DCT-II размера n x n"""
+    import numpy as np
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+
+def perceptual_hash(gray_image):
+    """pHash: знаки низкочастотных коэффициентов DCT относительно медианы"""
+    import numpy as np
+    from PIL import Image
+
+    size = HASH_SIZE * HASH_SCALE
+    small = np.asarray(gray_image.resize((size, size), Image.Resampling.LANCZOS),
+                       dtype=np.float64)
+    dct = _dct_matrix(size)
+    low = (dct @ small @ dct.T)[:HASH_SIZE, :HASH_SIZE]
+    bits = (low > np.median(low)).ravel()
+    return int(''.join('1' if bit else '0' for bit in bits), 2)
+
+
+def compute_pixel_stats(filepath):
+    """Полное декодирование первого кадра и расчёт PixelStats"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(filepath) as img:
+        if img.mode in SINGLE_BAND_MODES:
+            pixels = np.asarray(img)
+        else:
+            img = img.convert('L' if img.mode in ('1', 'LA', 'La') else 'RGB')
+            pixels = np.asarray(img)
+
+        bands = pixels.reshape(pixels.shape[0] * pixels.shape[1], -1)
+        mean = tuple(float(v) for v in bands.mean(axis=0))
+        minimum = tuple(bands.min(axis=0).tolist())
+        maximum = tuple(bands.max(axis=0).tolist())
+
+        if img.mode == 'RGB':
+            gray_image = img.convert('L')
+            gray = np.asarray(gray_image)
+        elif pixels.dtype == np.uint8:
+            gray_image = img
+            gray = pixels
+        else:
+            # 16/32-битные и float изображения приводятся к 0..255 по диапазону
+            low, high = float(pixels.min()), float(pixels.max())
+            scale = 255 / (high - low) if high > low else 0
+            gray = ((pixels.astype(np.float64) - low) * scale).astype(np.uint8)
+            gray_image = Image.fromarray(gray)
+
+        histogram = tuple(np.bincount(gray.ravel(), minlength=256).tolist())
+        phash = perceptual_hash(gray_image)
+
+    return PixelStats(mean, minimum, maximum, histogram, phash)
+
+
+def format_stats(stats):
+    """Ячейки таблицы: среднее, мин / макс, гистограмма, pHash"""
+    mean = ' / '.join(f"{v:.1f}" for v in stats.mean)
+    min_max = f"{'/'.join(map(str, stats.minimum))} – {'/'.join(map(str, stats.maximum))}"
+
+    # Гистограмма яркости в виде строки из SPARK_BINS символов
+    step = len(stats.histogram) // SPARK_BINS
+    bins = [sum(stats.histogram[i:i + step]) for i in range(0, len(stats.histogram), step)]
+    top = max(bins) or 1
+    spark = ''.join(SPARK_CHARS[min(len(SPARK_CHARS) - 1, v * len(SPARK_CHARS) // top)]
+                    for v in bins)
+
+    return (mean, min_max, spark, f"{stats.phash:016x}")
+
+
+class PixelStatsPool:
+    """Пул процессов для compute_pixel_stats с ограничением по памяти
+
+    Перед отправкой задачи оценивается память декодированного изображения
+    (width * height * BYTES_PER_PIXEL). Новые задачи принимаются, пока
+    суммарная оценка задач в работе меньше memory_budget и их меньше
+    max_in_flight; одно изображение больше бюджета выполняется в одиночку.
+    """
+
+    # Декодированные пиксели, копия в RGB/L и рабочие массивы numpy
+    BYTES_PER_PIXEL = 16
+    DEFAULT_MEMORY_BUDGET = 1024 * 1024 * 1024
+
+    def __init__(self, workers=None, memory_budget=DEFAULT_MEMORY_BUDGET, max_in_flight=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.memory_budget = memory_budget
+        self.max_in_flight = max_in_flight or self.workers * 2
+        # spawn: пул создаётся из потока процесса с Tk, fork здесь небезопасен
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        self.lock = threading.Lock()
+        self.reserved = 0
+        self.in_flight = 0
+
+    def can_submit(self):
+        with self.lock:
+            return self.in_flight == 0 or (self.in_flight < self.max_in_flight
+                                           and self.reserved < self.memory_budget)
+
+    def submit(self, filepath, width, height):
+        """Future с PixelStats; память резервируется до завершения задачи"""
+        estimate = width * height * self.BYTES_PER_PIXEL
+        with self.lock:
+            self.reserved += estimate
+            self.in_flight += 1
+        future = self.executor.submit(compute_pixel_stats, filepath)
+        future.add_done_callback(lambda _: self._release(estimate))
+        return future
+
+    def _release(self, estimate):
+        with self.lock:
+            self.reserved -= estimate
+            self.in_flight -= 1
+
+    def shutdown(self, cancel=False):
+        self.executor.shutdown(wait=not cancel, cancel_futures=cancel)
+
+
+def chain_row(stats_future, row, result=None):
+    """Future строки таблицы: row + ячейки статистики (или ошибки)
+
+    result - уже созданный Future, который нужно заполнить (по умолчанию новый).
+    """
+    if result is None:
+        result = Future()
+
+    def done(future):
+        if future.cancelled():
+            result.cancel()
+            return
+        error = future.exception()
+        if error is not None:
+            result.set_result(row + ("Ошибка",) * 3 + (f"Ошибка: {error}",))
+        else:
+            result.set_result(row + format_stats(future.result()))
+
+    stats_future.add_done_callback(done)
+    return result
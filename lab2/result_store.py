@@ -0,0 +1,76 @@
+"""Компактное поколоночное хранилище строк таблицы
+
+Столбцы с небольшим числом различных значений (размер, DPI, глубина цвета)
+хранятся словарным кодированием: каждое значение один раз в словаре, в
+столбце - массив 32-битных кодов. Остальные столбцы - списки строк.
+"""
+
+from array import array
+
+
+class DictColumn:
+    """Столбец со словарным кодированием значений"""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+        self.data = array('I')
+
+    def append(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        self.data.append(code)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            values = self.values
+            return [values[code] for code in self.data[key]]
+        return self.values[self.data[key]]
+
+    def __len__(self):
+        return len(self.data)
+
+    def copy(self):
+        column = DictColumn()
+        column.values = list(self.values)
+        column.codes = dict(self.codes)
+        column.data = array('I', self.data)
+        return column
+
+
+class ResultStore:
+    """Строки результатов по столбцам; encoded - какие столбцы кодировать словарём"""
+
+    def __init__(self, encoded=(False, True, True, True, False)):
+        self.encoded = tuple(encoded)
+        self.clear()
+
+    def clear(self):
+        self.columns = [DictColumn() if enc else [] for enc in self.encoded]
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def append_rows(self, rows):
+        """Добавление пачки строк"""
+        for column, values in zip(self.columns, zip(*rows)):
+            if isinstance(column, DictColumn):
+                for value in values:
+                    column.append(value)
+            else:
+                column.extend(values)
+
+    def snapshot(self):
+        """Копия строк для чтения из другого потока (копируются ссылки и коды)"""
+        store = ResultStore(self.encoded)
+        store.columns = [column.copy() for column in self.columns]
+        return store
+
+    def rows(self, start, stop):
+        """Строки [start, stop) в виде кортежей"""
+        return list(zip(*(column[start:stop] for column in self.columns)))
+
+    def row(self, index):
+        return tuple(column[index] for column in self.columns)
@@ -0,0 +1,201 @@
+"""Статистика производительности сканирования по этапам
+
+ScanStats собирает гистограммы длительности этапов (обход папок, поиск в
+индексе, открытие файла, разбор заголовка, размер файла, вставка в таблицу),
+количество прочитанных байт и скорость обработки. Запись безопасна для
+вызова из нескольких потоков и стоит несколько вызовов perf_counter на файл.
+"""
+
+import json
+import threading
+import time
+
+
+# Этапы в порядке вывода: ключ -> название для отчёта
+STAGES = {
+    'walk': 'обход папки',
+    'index': 'проверка по индексу',
+    'open': 'открытие файла',
+    'header': 'разбор заголовка',
+    'stat': 'размер файла',
+    'tk': 'вставка в таблицу',
+}
+
+# Корзины гистограммы: 0 - меньше 1 мкс, k - от 2^(k-1) до 2^k мкс
+HISTOGRAM_BUCKETS = 32
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей с логарифмическими корзинами"""
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds):
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    @staticmethod
+    def bucket_bound(bucket):
+        """Верхняя граница корзины, с"""
+        return (1 << bucket) / 1e6
+
+    def percentile(self, q):
+        """Оценка q-го процентиля сверху (граница корзины), с"""
+        if not self.count:
+            return 0.0
+        threshold = q / 100 * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if count and cumulative >= threshold:
+                return min(self.bucket_bound(bucket), self.maximum)
+        return self.maximum
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class ScanStats:
+    """Статистика одного сканирования"""
+
+    def __init__(self, source='', workers=None):
+        self.source = source
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+        self.files = 0
+        self.cached = 0
+        self.errors = 0
+        self.bytes_read = 0
+        self.started = time.perf_counter()
+        self.finished = None
+        self.started_at = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.stages[stage].add(seconds)
+
+    def record_index(self, seconds, cached):
+        """Проверка пачки по индексу; cached файлов взяты из него без чтения"""
+        with self.lock:
+            self.stages['index'].add(seconds)
+            self.files += cached
+            self.cached += cached
+
+    def record_file(self, open_time, header_time, stat_time, bytes_read):
+        """Этапы чтения метаданных одного файла (одна блокировка на файл)"""
+        with self.lock:
+            self.stages['open'].add(open_time)
+            self.stages['header'].add(header_time)
+            self.stages['stat'].add(stat_time)
+            self.files += 1
+            self.bytes_read += bytes_read
+
+    def record_error(self):
+        with self.lock:
+            self.files += 1
+            self.errors += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def status_line(self):
+        """Краткая сводка для строки состояния"""
+        with self.lock:
+            files = self.files
+            bytes_read = self.bytes_read
+            slowest = max(self.stages.items(), key=lambda item: item[1].total)
+        elapsed = self.elapsed()
+        rate = files / elapsed if elapsed > 0 else 0
+        mb_rate = bytes_read / 1024 / 1024 / elapsed if elapsed > 0 else 0
+        line = f"{rate:,.0f} файлов/с, {mb_rate:,.1f} МБ/с"
+        stage, histogram = slowest
+        if histogram.count:
+            line += (f"; дольше всего: {STAGES[stage]} "
+                     f"(p50 {histogram.percentile(50) * 1000:.2f} мс, "
+                     f"p99 {histogram.percentile(99) * 1000:.2f} мс)")
+        return line
+
+    def as_dict(self):
+        """Вся статистика в виде словаря (для JSON)"""
+        with self.lock:
+            elapsed = self.elapsed()
+            return {
+                'source': self.source,
+                'started_at': self.started_at,
+                'workers': self.workers,
+                'elapsed': elapsed,
+                'files': self.files,
+                'cached': self.cached,
+                'errors': self.errors,
+                'bytes_read': self.bytes_read,
+                'files_per_second': self.files / elapsed if elapsed > 0 else 0,
+                'stages': {
+                    stage: {
+                        'count': histogram.count,
+                        'total': histogram.total,
+                        'mean': histogram.mean(),
+                        'p50': histogram.percentile(50),
+                        'p90': histogram.percentile(90),
+                        'p99': histogram.percentile(99),
+                        'max': histogram.maximum,
+                        # Верхняя граница корзины, с -> количество
+                        'histogram': {histogram.bucket_bound(bucket): count
+                                      for bucket, count in enumerate(histogram.counts)
+                                      if count},
+                    }
+                    for stage, histogram in self.stages.items()
+                },
+            }
+
+    def report(self):
+        """Текстовый отчёт"""
+        data = self.as_dict()
+        elapsed = data['elapsed']
+        mb = data['bytes_read'] / 1024 / 1024
+        lines = [
+            f"Источник: {data['source']}",
+            f"Начало: {data['started_at']}",
+            f"Потоков чтения: {data['workers']}",
+            f"Файлов: {data['files']} (из индекса: {data['cached']}, ошибок: {data['errors']}) "
+            f"за {elapsed:.3f} с, "
+            f"{data['files_per_second']:,.0f} файлов/с",
+            f"Прочитано: {mb:.1f} МБ ({mb / elapsed if elapsed > 0 else 0:,.1f} МБ/с)",
+            "",
+            f"{'Этап':<20}{'Кол-во':>10}{'Сумма, с':>11}{'Сред., мс':>11}"
+            f"{'p50, мс':>10}{'p90, мс':>10}{'p99, мс':>10}{'Макс, мс':>10}",
+        ]
+        for stage, values in data['stages'].items():
+            lines.append(
+                f"{STAGES[stage]:<20}{values['count']:>10}{values['total']:>11.3f}"
+                f"{values['mean'] * 1000:>11.3f}{values['p50'] * 1000:>10.3f}"
+                f"{values['p90'] * 1000:>10.3f}{values['p99'] * 1000:>10.3f}"
+                f"{values['max'] * 1000:>10.3f}")
+
+        lines += ["", "Гистограммы (до, мс: количество)"]
+        for stage, values in data['stages'].items():
+            if values['count']:
+                buckets = ', '.join(f"{bound * 1000:g}: {count}"
+                                    for bound, count in values['histogram'].items())
+                lines.append(f"{STAGES[stage]}: {buckets}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Запись отчёта в файл: JSON для *.json, иначе текст"""
+        if path.lower().endswith('.json'):
+            content = json.dumps(self.as_dict(), ensure_ascii=False, indent=2)
+        else:
+            content = self.report()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
@@ -0,0 +1,165 @@
+"""Миниатюры изображений с дисковым кэшем
+
+Миниатюры хранятся в кэше, адресуемом по содержимому: ключ - хеш всего
+файла, поэтому копии файла в разных папках используют одну миниатюру, а
+изменённый файл получает новую. Чтобы не читать файл при каждой
+перерисовке и после перезапуска, хеш запоминается по (путь, размер,
+mtime_ns) в памяти и в индексе метаданных (MetadataIndex). Общий размер
+кэша ограничен, при превышении удаляются давно не использованные файлы.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from metadata_index import MetadataIndex
+
+
+class ThumbnailCache:
+    """Дисковый кэш миниатюр PNG с вытеснением LRU по размеру"""
+
+    # Размер блока чтения при хешировании файла
+    READ_CHUNK = 1024 * 1024
+    # Сколько ключей файлов помнить по (путь, размер, mtime_ns)
+    KEY_MEMO_SIZE = 10000
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, cache_dir=None, size=(64, 64), max_bytes=DEFAULT_MAX_BYTES,
+                 index_path=None):
+        self.cache_dir = cache_dir or self.default_cache_dir()
+        self.size = tuple(size)
+        self.max_bytes = max_bytes
+        self.index_path = index_path
+        self.lock = threading.Lock()
+        # Путь -> (размер, mtime_ns, ключ)
+        self.keys = {}
+        # Соединение SQLite нельзя использовать из другого потока: своё у каждого
+        self.local = threading.local()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Имя файла -> (размер, время последнего использования)
+        self.entries = {}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.png'):
+                st = os.stat(os.path.join(self.cache_dir, name))
+                self.entries[name] = (st.st_size, st.st_mtime)
+        self.total_bytes = sum(size for size, _ in self.entries.values())
+
+    @staticmethod
+    def default_cache_dir():
+        """Каталог кэша пользователя (XDG_CACHE_HOME или ~/.cache)"""
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+            os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'image_info_viewer', 'thumbnails')
+
+    def _index(self):
+        """Индекс метаданных текущего потока (None, если недоступен)"""
+        index = getattr(self.local, 'index', None)
+        if index is None:
+            try:
+                index = MetadataIndex(self.index_path)
+            except (sqlite3.Error, OSError):
+                index = False
+            self.local.index = index
+        return index or None
+
+    def content_key(self, filepath):
+        """Ключ по содержимому: хеш всего файла и размер миниатюры"""
+        file_key = MetadataIndex.file_key(filepath)
+        with self.lock:
+            memo = self.keys.get(filepath)
+        if memo is not None and memo[:2] == file_key[1:]:
+            return memo[2]
+
+        index = self._index()
+        digest = None
+        if index is not None:
+            try:
+                digest = index.content_hash(file_key)
+            except sqlite3.Error:
+                pass
+        if digest is None:
+            content = hashlib.blake2b(digest_size=20)
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.READ_CHUNK), b''):
+                    content.update(chunk)
+            digest = content.hexdigest()
+            if index is not None:
+                try:
+                    index.store_content_hash(file_key, digest)
+                except sqlite3.Error:
+                    # Индекс занят другим процессом: хеш посчитается снова
+                    pass
+        key = f"{digest}-{self.size[0]}x{self.size[1]}"
+
+        with self.lock:
+            self.keys.pop(filepath, None)
+            if len(self.keys) >= self.KEY_MEMO_SIZE:
+                # Словарь хранит порядок вставки: удаляется самый старый ключ
+                del self.keys[next(iter(self.keys))]
+            self.keys[filepath] = (*file_key[1:], key)
+        return key
+
+    def get(self, filepath):
+        """Путь к PNG миниатюре файла (создаётся при отсутствии в кэше)"""
+        name = self.content_key(filepath) + '.png'
+        path = os.path.join(self.cache_dir, name)
+
+        with self.lock:
+            if name in self.entries:
+                size, _ = self.entries[name]
+                self.entries[name] = (size, time.time())
+                hit = True
+            else:
+                hit = False
+        if hit:
+            try:
+                # Время использования хранится в mtime, чтобы LRU переживал перезапуск
+                os.utime(path)
+                return path
+            except OSError:
+                with self.lock:
+                    self._forget(name)
+
+        self._create(filepath, path)
+        size = os.path.getsize(path)
+        with self.lock:
+            if name not in self.entries:
+                self.entries[name] = (size, time.time())
+                self.total_bytes += size
+            self._evict(keep=name)
+        return path
+
+    def _create(self, filepath, path):
+        from PIL import Image
+        with Image.open(filepath) as img:
+            # Для JPEG draft() декодирует сразу с уменьшением 1/2 - 1/8
+            img.draft('RGB', self.size)
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                img = img.convert('RGBA' if 'A' in img.mode or 'transparency' in img.info
+                                  else 'RGB')
+            img.thumbnail(self.size)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            img.save(tmp_path, 'PNG')
+        os.replace(tmp_path, path)
+
+    def _forget(self, name):
+        size, _ = self.entries.pop(name, (0, 0))
+        self.total_bytes -= size
+
+    def _evict(self, keep=None):
+        """Удаление давно использованных миниатюр, пока кэш больше max_bytes"""
+        if self.total_bytes <= self.max_bytes:
+            return
+        for name, _ in sorted(self.entries.items(), key=lambda item: item[1][1]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            self._forget(name)
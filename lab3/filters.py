@@ -0,0 +1,212 @@
+"""
+Фильтры обработки изображений без графического интерфейса
+
+Используются приложением (image_processor.py) и потоковой обработкой по
+тайлам (tiled.py). Все функции принимают и возвращают массивы uint8
+(кроме карт порога float32) и не изменяют входные данные.
+
+Необязательный параметр executor (parallel.TileExecutor) включает обработку
+полосами в пуле потоков; результат не отличается от однопоточного.
+"""
+
+from typing import Optional, Union
+
+import cv2
+import numpy as np
+
+from local_stats import CachedStatistics, LocalStatistics
+from parallel import TileExecutor
+
+ELEMENT_OPERATIONS = ("add", "subtract", "multiply", "divide")
+
+# Все значения байта: аргумент таблиц поэлементных операций
+BYTE_VALUES = np.arange(256, dtype=np.uint8)
+
+
+def to_grayscale(image: np.ndarray) -> np.ndarray:
+    """Изображение в градациях серого (BGR -> GRAY)"""
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def _map_rows(executor: Optional[TileExecutor], func, *arrays, halo: int = 0):
+    if executor is None:
+        return func(*arrays)
+    return executor.map_rows(func, *arrays, halo=halo)
+
+
+def niblack_threshold(
+    image: np.ndarray,
+    window_size: int,
+    k: float,
+    stats: Optional[Union[LocalStatistics, CachedStatistics]] = None,
+    executor: Optional[TileExecutor] = None,
+) -> np.ndarray:
+    """
+    Метод Niblack для локальной пороговой обработки
+    T(x,y) = m(x,y) + k * s(x,y)
+    где m - локальное среднее, s - локальное стандартное отклонение
+    stats - интегральные изображения image (если уже построены)
+    """
+    if stats is None:
+        stats = LocalStatistics(image, window_size, executor)
+    mean, std = stats.mean_std(window_size)
+
+    def threshold(mean, std):
+        return mean + k * std
+
+    return _map_rows(executor, threshold, mean, std)
+
+
+def sauvola_threshold(
+    image: np.ndarray,
+    window_size: int,
+    k: float,
+    R: float = 128,
+    stats: Optional[Union[LocalStatistics, CachedStatistics]] = None,
+    executor: Optional[TileExecutor] = None,
+) -> np.ndarray:
+    """
+    Метод Sauvola для локальной пороговой обработки
+    T(x,y) = m(x,y) * (1 + k * (s(x,y)/R - 1))
+    где m - локальное среднее, s - локальное стандартное отклонение, R - динамический диапазон
+    stats - интегральные изображения image (если уже построены)
+    """
+    if stats is None:
+        stats = LocalStatistics(image, window_size, executor)
+    mean, std = stats.mean_std(window_size)
+
+    def threshold(mean, std):
+        return mean * (1 + k * (std / R - 1))
+
+    return _map_rows(executor, threshold, mean, std)
+
+
+def binarize(
+    gray: np.ndarray, threshold: np.ndarray, executor: Optional[TileExecutor] = None
+) -> np.ndarray:
+    """Бинарное изображение: 255, где яркость больше порога"""
+
+    def compare(gray, threshold):
+        return (gray > threshold).view(np.uint8) * 255
+
+    return _map_rows(executor, compare, gray, threshold)
+
+
+def adaptive_threshold(
+    gray: np.ndarray,
+    method: str,
+    window_size: int,
+    c: float,
+    executor: Optional[TileExecutor] = None,
+) -> np.ndarray:
+    """Адаптивная пороговая обработка OpenCV ("mean" или "gaussian")"""
+    adaptive_method = (
+        cv2.ADAPTIVE_THRESH_MEAN_C
+        if method == "mean"
+        else cv2.ADAPTIVE_THRESH_GAUSSIAN_C
+    )
+
+    def threshold(gray):
+        return cv2.adaptiveThreshold(
+            gray, 255, adaptive_method, cv2.THRESH_BINARY, window_size, c
+        )
+
+    # Полосе нужны соседние строки в пределах окна
+    return _map_rows(executor, threshold, gray, halo=window_size // 2)
+
+
+def _element_values(values: np.ndarray, operation: str, value: float) -> np.ndarray:
+    """Поэлементная операция в float32 (для построения таблицы)"""
+    values = values.astype(np.float32)
+
+    if operation == "add":
+        result = values + value
+    elif operation == "subtract":
+        result = values - value
+    elif operation == "multiply":
+        result = values * (value / 100.0)
+    else:
+        result = values / (value / 100.0)
+
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def element_lut(operation: str, value: float) -> np.ndarray:
+    """
+    Таблица из 256 значений для поэлементной операции: результат float32-
+    вычисления для каждого возможного байта
+    """
+    if operation not in ELEMENT_OPERATIONS:
+        raise ValueError(f"Неизвестная операция: {operation}")
+    if operation == "divide" and value == 0:
+        raise ValueError("Деление на ноль невозможно")
+    return _element_values(BYTE_VALUES, operation, value)
+
+
+def contrast_lut(
+    min_out: int, max_out: int, min_in: float, max_in: float
+) -> np.ndarray:
+    """Таблица из 256 значений для линейного контрастирования"""
+    values = BYTE_VALUES.astype(np.float32)
+
+    if max_in - min_in > 0:
+        result = (values - min_in) * (max_out - min_out) / (max_in - min_in) + min_out
+    else:
+        result = values
+
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def apply_lut(
+    image: np.ndarray, lut: np.ndarray, executor: Optional[TileExecutor] = None
+) -> np.ndarray:
+    """Применение таблицы из 256 значений ко всем каналам изображения"""
+
+    def apply(image):
+        return cv2.LUT(image, lut)
+
+    return _map_rows(executor, apply, image)
+
+
+def element_operation(
+    image: np.ndarray,
+    operation: str,
+    value: float,
+    executor: Optional[TileExecutor] = None,
+) -> np.ndarray:
+    """
+    Поэлементная операция: add / subtract - со значением, multiply / divide -
+    с коэффициентом value / 100
+
+    Результат зависит только от значения байта, поэтому операция
+    вычисляется в float32 один раз для 256 значений и применяется таблицей
+    (cv2.LUT) без float32-копии изображения; результат совпадает с
+    вычислением по всему изображению.
+    """
+    return apply_lut(image, element_lut(operation, value), executor)
+
+
+def linear_contrast(
+    image: np.ndarray,
+    min_out: int,
+    max_out: int,
+    min_in: Optional[float] = None,
+    max_in: Optional[float] = None,
+    executor: Optional[TileExecutor] = None,
+) -> np.ndarray:
+    """
+    Линейное контрастирование
+    out = (in - min_in) * (max_out - min_out) / (max_in - min_in) + min_out
+    min_in / max_in по умолчанию - минимум и максимум image (при обработке
+    по частям передаются минимум и максимум всего изображения)
+    Применяется таблицей из 256 значений, как element_operation.
+    """
+    # Минимум и максимум uint8 совпадают с минимумом и максимумом float32-копии
+    if min_in is None:
+        min_in = np.float32(image.min())
+    if max_in is None:
+        max_in = np.float32(image.max())
+
+    return apply_lut(image, contrast_lut(min_out, max_out, min_in, max_in), executor)
@@ -1,14 +1,31 @@
+import queue
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from tkinter import font as tkfont
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 
 import cv2
 import numpy as np
 from PIL import Image, ImageTk
 
+import filters
+from jobs import Job, JobRunner
+from local_stats import LocalStatisticsCache
+from parallel import TileExecutor
+from pipeline import Pipeline, PipelineError
+
 
 class ImageProcessorApp:
+    # Период опроса очереди событий фоновой обработки, мс
+    POLL_INTERVAL = 50
+
+    ELEMENT_NAMES = {
+        "add": "Сложение",
+        "subtract": "Вычитание",
+        "multiply": "Умножение",
+        "divide": "Деление",
+    }
+
     def __init__(self, root):
         self.root = root
         self.root.title("Обработка изображений - Lab 3")
@@ -28,6 +45,19 @@ class ImageProcessorApp:
 
         self.original_image: Optional[np.ndarray] = None
         self.processed_image: Optional[np.ndarray] = None
+        # Пул потоков: фильтры обрабатывают изображение полосами на всех ядрах
+        self.executor = TileExecutor()
+        # Полутоновое изображение, интегральные изображения и карты среднего и
+        # отклонения для Niblack/Sauvola; при изменении только k не пересчитываются
+        self.stats_cache = LocalStatisticsCache()
+        # Фоновая обработка: выполняется только последняя запрошенная
+        self.jobs = JobRunner()
+        self.job: Optional[Job] = None
+        self.job_name = ""
+        self.polling_jobs = False
+        # Цепочка операций, которая получает processed_image из original_image
+        self.pipeline = Pipeline()
+        self.job_pipeline: Optional[Pipeline] = None
 
         self.display_size = (600, 400)
 
@@ -91,6 +121,25 @@ class ImageProcessorApp:
         )
         self.load_button.pack(pady=8, padx=10, fill=tk.X)
 
+        self.status_frame = ttk.Frame(self.top_frame)
+        self.status_frame.pack(fill=tk.X, padx=10)
+
+        self.status_label = ttk.Label(self.status_frame, text="", width=40)
+        self.status_label.pack(side=tk.LEFT)
+
+        self.cancel_button = ttk.Button(
+            self.status_frame,
+            text="Отменить",
+            command=self.cancel_job,
+            state=tk.DISABLED,
+        )
+        self.cancel_button.pack(side=tk.RIGHT)
+
+        self.progress_bar = ttk.Progressbar(
+            self.status_frame, mode="determinate", maximum=100
+        )
+        self.progress_bar.pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=10)
+
         self.images_frame = ttk.Frame(self.top_frame)
         self.images_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
@@ -374,6 +423,25 @@ class ImageProcessorApp:
             style="Accent.TButton",
         ).pack(side=tk.LEFT, padx=5, ipadx=20)
 
+        pipeline_section = ttk.Frame(action_container)
+        pipeline_section.pack(pady=(10, 0))
+
+        self.chain_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            pipeline_section,
+            text="Применять к результату",
+            variable=self.chain_var,
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            pipeline_section, text="Сохранить цепочку", command=self.save_pipeline
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Button(
+            pipeline_section, text="Загрузить цепочку", command=self.load_pipeline
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.pipeline_label = ttk.Label(action_container, text="", wraplength=600)
+        self.pipeline_label.pack(pady=(5, 0))
+
         self.control_frame.columnconfigure(0, weight=1)
         self.control_frame.columnconfigure(1, weight=1)
         self.control_frame.columnconfigure(2, weight=1)
@@ -435,9 +503,13 @@ class ImageProcessorApp:
         )
 
         if file_path:
+            self.cancel_job()
             self.original_image = cv2.imread(file_path)
+            self.stats_cache.clear()
             if self.original_image is not None:
                 self.processed_image = self.original_image.copy()
+                self.pipeline = Pipeline()
+                self.pipeline_label.config(text="")
                 self.update_display_size()
                 self.display_images()
             else:
@@ -505,102 +577,167 @@ class ImageProcessorApp:
 
         return image
 
-    def get_grayscale(self) -> Optional[np.ndarray]:
-        """Получение изображения в градациях серого"""
+    def run_filter(
+        self,
+        name: str,
+        task: Callable[[np.ndarray, TileExecutor], np.ndarray],
+        image: Optional[np.ndarray] = None,
+        pipeline: Optional[Pipeline] = None,
+    ):
+        """
+        Запуск task(image, executor) в фоновом потоке (по умолчанию - для
+        исходного изображения)
+
+        Предыдущая незавершённая обработка отменяется, в display_images
+        попадает только результат последней. Параметры из виджетов читаются
+        до запуска: переменные Tk нельзя читать из другого потока.
+        pipeline - цепочка, которая получает обработанное изображение из
+        исходного; становится текущей вместе с результатом.
+        """
         if self.original_image is None:
             messagebox.showwarning("Предупреждение", "Сначала загрузите изображение")
-            return None
+            return
 
-        if len(self.original_image.shape) == 3:
-            return cv2.cvtColor(self.original_image, cv2.COLOR_BGR2GRAY)
-        return self.original_image
+        if image is None:
+            image = self.original_image
+        executor = self.executor
+
+        def job_func(job: Job) -> np.ndarray:
+            return task(image, executor.for_job(job))
+
+        self.job = self.jobs.submit(job_func)
+        self.job_name = name
+        self.job_pipeline = pipeline
+        self.status_label.config(text=f"{name}: обработка...")
+        self.progress_bar["value"] = 0
+        self.cancel_button.config(state=tk.NORMAL)
+        if not self.polling_jobs:
+            self.polling_jobs = True
+            self.root.after(self.POLL_INTERVAL, self._poll_jobs)
+
+    def cancel_job(self):
+        """Отмена текущей обработки"""
+        if self.job is None:
+            return
+        self.jobs.cancel()
+        self.job = None
+        self.status_label.config(text=f"{self.job_name}: отменено")
+        self.progress_bar["value"] = 0
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def _poll_jobs(self):
+        """Приём прогресса и результата фоновой обработки (поток Tk)"""
+        progress = None
+        finished = None
+        while True:
+            try:
+                message = self.jobs.events.get_nowait()
+            except queue.Empty:
+                break
+            # События отменённых и заменённых задач пропускаются
+            if self.job is None or message[1] != self.job.id:
+                continue
+            if message[0] == "progress":
+                progress = message[2:]
+            else:
+                finished = message
+                break
+
+        if progress is not None and finished is None:
+            stage, done, total = progress
+            self.progress_bar["value"] = done / total * 100 if total else 0
+            self.status_label.config(
+                text=f"{self.job_name}: этап {stage}, {done} из {total}"
+            )
 
+        if finished is not None:
+            self.job = None
+            self.cancel_button.config(state=tk.DISABLED)
+            kind = finished[0]
+            if kind == "done":
+                _, _, result, seconds = finished
+                self.progress_bar["value"] = 100
+                self.status_label.config(text=f"{self.job_name}: {seconds:.2f} с")
+                self.processed_image = result
+                if self.job_pipeline is not None:
+                    self.pipeline = self.job_pipeline
+                    self.pipeline_label.config(text=self.pipeline.describe())
+                self.display_images()
+            elif kind == "error":
+                self.progress_bar["value"] = 0
+                self.status_label.config(text=f"{self.job_name}: ошибка")
+                messagebox.showerror("Ошибка", str(finished[2]))
 
-    def apply_niblack(self):
-        """Применение метода Niblack для пороговой обработки"""
-        gray = self.get_grayscale()
-        if gray is None:
+        if self.job is None:
+            self.polling_jobs = False
+        else:
+            self.root.after(self.POLL_INTERVAL, self._poll_jobs)
+
+    def apply_step(self, name: str, op: str, **params):
+        """
+        Запуск одной операции цепочки: к исходному изображению или, если
+        включено «Применять к результату», к текущему результату
+        """
+        if self.original_image is None:
+            messagebox.showwarning("Предупреждение", "Сначала загрузите изображение")
             return
 
+        chain = self.chain_var.get() and len(self.pipeline) > 0
+        pipeline = self.pipeline.copy() if chain else Pipeline()
+        step = Pipeline()
+        try:
+            step.add(op, **params)
+            pipeline.add(op, **params)
+        except PipelineError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        def task(image, executor):
+            return step.run(image, executor, self.stats_cache)
+
+        image = self.processed_image if chain else self.original_image
+        self.run_filter(name, task, image, pipeline)
+
+    def apply_niblack(self):
+        """Применение метода Niblack для пороговой обработки"""
         window_size = self.niblack_window.get()
         k = self.niblack_k.get()
 
         if window_size % 2 == 0:
             window_size += 1
 
-        threshold = self.niblack_threshold(gray, window_size, k)
-        self.processed_image = ((gray > threshold) * 255).astype(np.uint8)
-        self.display_images()
-
-    def niblack_threshold(
-        self, image: np.ndarray, window_size: int, k: float
-    ) -> np.ndarray:
-        """
-        Метод Niblack для локальной пороговой обработки
-        T(x,y) = m(x,y) + k * s(x,y)
-        где m - локальное среднее, s - локальное стандартное отклонение
-        """
-        mean = cv2.blur(image.astype(np.float32), (window_size, window_size))
-        mean_sq = cv2.blur((image.astype(np.float32) ** 2), (window_size, window_size))
-        std = np.sqrt(mean_sq - mean**2)
-
-        threshold = mean + k * std
-        return threshold
+        self.apply_step(
+            "Niblack", "threshold", method="niblack", window=window_size, k=k
+        )
 
     def apply_sauvola(self):
         """Применение метода Sauvola для пороговой обработки"""
-        gray = self.get_grayscale()
-        if gray is None:
-            return
-
         window_size = self.sauvola_window.get()
         k = self.sauvola_k.get()
 
         if window_size % 2 == 0:
             window_size += 1
 
-        threshold = self.sauvola_threshold(gray, window_size, k)
-        self.processed_image = ((gray > threshold) * 255).astype(np.uint8)
-        self.display_images()
-
-    def sauvola_threshold(
-        self, image: np.ndarray, window_size: int, k: float, R: float = 128
-    ) -> np.ndarray:
-        """
-        Метод Sauvola для локальной пороговой обработки
-        T(x,y) = m(x,y) * (1 + k * (s(x,y)/R - 1))
-        где m - локальное среднее, s - локальное стандартное отклонение, R - динамический диапазон
-        """
-        mean = cv2.blur(image.astype(np.float32), (window_size, window_size))
-        mean_sq = cv2.blur((image.astype(np.float32) ** 2), (window_size, window_size))
-        std = np.sqrt(mean_sq - mean**2)
-
-        threshold = mean * (1 + k * (std / R - 1))
-        return threshold
+        self.apply_step(
+            "Sauvola", "threshold", method="sauvola", window=window_size, k=k
+        )
 
 
     def apply_adaptive_threshold(self, method: str):
         """Применение адаптивной пороговой обработки"""
-        gray = self.get_grayscale()
-        if gray is None:
-            return
-
         window_size = self.adaptive_window.get()
         c = self.adaptive_c.get()
 
         if window_size % 2 == 0:
             window_size += 1
 
-        adaptive_method = (
-            cv2.ADAPTIVE_THRESH_MEAN_C
-            if method == "mean"
-            else cv2.ADAPTIVE_THRESH_GAUSSIAN_C
-        )
-
-        self.processed_image = cv2.adaptiveThreshold(
-            gray, 255, adaptive_method, cv2.THRESH_BINARY, window_size, c
+        self.apply_step(
+            f"Adaptive {method.capitalize()}",
+            "threshold",
+            method=method,
+            window=window_size,
+            c=c,
         )
-        self.display_images()
 
 
     def apply_element_operation(self, operation: str):
@@ -610,27 +747,15 @@ class ImageProcessorApp:
             return
 
         value = self.element_value.get()
-        image = self.original_image.astype(np.float32)
-
-        if operation == "add":
-            result = image + value
-        elif operation == "subtract":
-            result = image - value
-        elif operation == "multiply":
-            result = image * (
-                value / 100.0
-            ) 
-        elif operation == "divide":
-            if value == 0:
-                messagebox.showerror("Ошибка", "Деление на ноль невозможно")
-                return
-            result = image / (value / 100.0)
-        else:
+        if operation == "divide" and value == 0:
+            messagebox.showerror("Ошибка", "Деление на ноль невозможно")
+            return
+        if operation not in filters.ELEMENT_OPERATIONS:
             return
 
-        result = np.clip(result, 0, 255).astype(np.uint8)
-        self.processed_image = result
-        self.display_images()
+        self.apply_step(
+            self.ELEMENT_NAMES[operation], "element", operation=operation, value=value
+        )
 
     def apply_linear_contrast(self):
         """Применение линейного контрастирования"""
@@ -647,28 +772,59 @@ class ImageProcessorApp:
             )
             return
 
-        image = self.original_image.astype(np.float32)
+        self.apply_step(
+            "Контрастирование", "contrast", min_out=min_out, max_out=max_out
+        )
 
-        min_in = image.min()
-        max_in = image.max()
+    def save_pipeline(self):
+        """Сохранение цепочки операций текущего результата в JSON"""
+        if not len(self.pipeline):
+            messagebox.showwarning("Предупреждение", "Цепочка операций пуста")
+            return
 
-        # out = (in - min_in) * (max_out - min_out) / (max_in - min_in) + min_out
-        if max_in - min_in > 0:
-            result = (image - min_in) * (max_out - min_out) / (
-                max_in - min_in
-            ) + min_out
-        else:
-            result = image
+        file_path = filedialog.asksaveasfilename(
+            title="Сохранить цепочку",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+        )
+        if file_path:
+            try:
+                self.pipeline.save(file_path)
+            except OSError as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить цепочку: {e}")
+
+    def load_pipeline(self):
+        """Загрузка цепочки из JSON и применение её к исходному изображению"""
+        if self.original_image is None:
+            messagebox.showwarning("Предупреждение", "Сначала загрузите изображение")
+            return
+
+        file_path = filedialog.askopenfilename(
+            title="Загрузить цепочку",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+        )
+        if not file_path:
+            return
+        try:
+            pipeline = Pipeline.load(file_path)
+        except (OSError, PipelineError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить цепочку: {e}")
+            return
 
-        result = np.clip(result, 0, 255).astype(np.uint8)
-        self.processed_image = result
-        self.display_images()
+        def task(image, executor):
+            result = pipeline.run(image, executor, self.stats_cache)
+            # Из цепочки с несколькими выходами показывается последний
+            return result[pipeline.outputs[-1]] if pipeline.outputs else result
 
+        self.run_filter("Цепочка", task, pipeline=pipeline)
 
     def reset_image(self):
         """Сброс обработанного изображения к оригиналу"""
         if self.original_image is not None:
+            self.cancel_job()
             self.processed_image = self.original_image.copy()
+            self.pipeline = Pipeline()
+            self.pipeline_label.config(text="")
             self.display_images()
 
     def save_image(self):
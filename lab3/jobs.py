@@ -0,0 +1,121 @@
+"""
+Фоновое выполнение фильтров с отменой устаревших задач
+
+JobRunner выполняет задачи по одной в фоновом потоке, чтобы обработка
+большого изображения не блокировала главный цикл Tk. Новая задача отменяет
+текущую и ожидающую: пользователь, передвинувший параметр несколько раз,
+ждёт только последний результат. Отмена срабатывает между полосами
+изображения (TileExecutor проверяет задачу после каждой полосы).
+
+События для потока Tk кладутся в очередь events:
+    ("progress", id, этап, сделано, всего)
+    ("done", id, результат, секунд)
+    ("cancelled", id)
+    ("error", id, исключение)
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """Одна задача: функция, флаг отмены и прогресс по этапам"""
+
+    def __init__(self, job_id: int, func: Callable[["Job"], Any], events: queue.SimpleQueue):
+        self.id = job_id
+        self.func = func
+        self.events = events
+        self._cancelled = threading.Event()
+        # Этап - один проход по полосам изображения
+        self.stage = 0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Прерывание задачи исключением JobCancelled, если она отменена"""
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def start_stage(self, total: int):
+        """Начало очередного прохода из total шагов"""
+        self.check()
+        self.stage += 1
+        self.events.put(("progress", self.id, self.stage, 0, total))
+
+    def advance(self, done: int, total: int):
+        self.events.put(("progress", self.id, self.stage, done, total))
+        self.check()
+
+
+class JobRunner:
+    """Фоновый поток, выполняющий только последнюю поставленную задачу"""
+
+    def __init__(self):
+        self.events: queue.SimpleQueue = queue.SimpleQueue()
+        self._condition = threading.Condition()
+        self._pending: Optional[Job] = None
+        self._current: Optional[Job] = None
+        self._next_id = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, func: Callable[[Job], Any]) -> Job:
+        """
+        Постановка задачи func(job) -> результат; текущая и ожидающая
+        задачи отменяются
+        """
+        with self._condition:
+            self._cancel_locked()
+            self._next_id += 1
+            job = Job(self._next_id, func, self.events)
+            self._pending = job
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return job
+
+    def cancel(self):
+        """Отмена текущей и ожидающей задач"""
+        with self._condition:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        for job in (self._current, self._pending):
+            if job is not None:
+                job.cancel()
+        if self._pending is not None:
+            self.events.put(("cancelled", self._pending.id))
+            self._pending = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                job = self._current = self._pending
+                self._pending = None
+
+            started = time.perf_counter()
+            try:
+                result = job.func(job)
+                job.check()
+            except JobCancelled:
+                self.events.put(("cancelled", job.id))
+            except Exception as e:
+                self.events.put(("error", job.id, e))
+            else:
+                self.events.put(("done", job.id, result, time.perf_counter() - started))
+            finally:
+                with self._condition:
+                    self._current = None
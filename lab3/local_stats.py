@@ -0,0 +1,225 @@
+"""
+Локальная статистика изображения через интегральные изображения
+
+Интегральное изображение (summed-area table) строится один раз, после чего
+сумма по любому прямоугольному окну вычисляется по четырём значениям,
+то есть за O(1) на пиксель независимо от размера окна. Это позволяет
+перебирать размер окна и коэффициент k в методах Niblack и Sauvola без
+повторного прохода по исходному изображению.
+
+LocalStatisticsCache дополнительно запоминает полутоновое изображение и
+карты среднего и отклонения для каждого окна, так что при изменении только
+k пересчитывается лишь итоговое выражение порога.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+
+class LocalStatistics:
+    """
+    Интегральные изображения суммы и суммы квадратов яркости
+
+    Изображение дополняется отражением границы (BORDER_REFLECT_101, как в
+    cv2.blur) на половину наибольшего окна. Суммы хранятся в float64:
+    для 8-битных изображений они целые и точные до 2^53, поэтому
+    дисперсия не теряет точность при вычитании, как в float32.
+    """
+
+    # Строк за один шаг при вычислении статистики (промежуточные
+    # массивы float64 остаются в кэше процессора)
+    BAND_ROWS = 16
+
+    def __init__(self, image: np.ndarray, max_window: int = 51, executor=None):
+        if image.ndim != 2:
+            raise ValueError("Ожидается одноканальное изображение")
+        self.image = image
+        # TileExecutor: карты среднего и отклонения считаются полосами строк
+        # параллельно (таблицы общие, поэтому поле между полосами не нужно)
+        self.executor = executor
+        self.height, self.width = image.shape
+        self.pad = 0
+        self.sum = None
+        self.sqsum = None
+        self._build(max_window)
+
+    def _build(self, max_window: int):
+        """Построение интегральных изображений с отступом под окно max_window"""
+        self.pad = max_window // 2
+        padded = cv2.copyMakeBorder(
+            self.image, self.pad, self.pad, self.pad, self.pad, cv2.BORDER_REFLECT_101
+        )
+        self.sum, self.sqsum = cv2.integral2(
+            padded, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.sum.nbytes + self.sqsum.nbytes
+
+    def mean_std(
+        self, window_size: int, executor=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Локальное среднее и стандартное отклонение (float32) в окне
+        window_size x window_size с центром в каждом пикселе
+        executor - вместо заданного в конструкторе (например, с отменой задачи)
+        """
+        if window_size < 1 or window_size % 2 == 0:
+            raise ValueError("Размер окна должен быть положительным и нечётным")
+        if window_size // 2 > self.pad:
+            # Окно больше запаса по краям - перестраиваем с большим отступом
+            self._build(window_size)
+
+        h, w = self.height, self.width
+        mean = np.empty((h, w), np.float32)
+        std = np.empty((h, w), np.float32)
+
+        def rows(y0: int, y1: int):
+            self._mean_std_rows(window_size, y0, y1, mean, std)
+
+        executor = executor or self.executor
+        if executor is None:
+            rows(0, h)
+        else:
+            executor.run_rows(h, rows)
+        return mean, std
+
+    def _mean_std_rows(
+        self, window_size: int, y0: int, y1: int, mean: np.ndarray, std: np.ndarray
+    ):
+        """Строки y0..y1 карт среднего и отклонения"""
+        w = self.width
+        n = window_size * window_size
+        offset = self.pad - window_size // 2
+
+        band = self.BAND_ROWS
+        sums = np.empty((band, w))
+        squares = np.empty((band, w))
+        for y in range(y0, y1, band):
+            rows = min(band, y1 - y)
+            s, q = sums[:rows], squares[:rows]
+            top, left = offset + y, offset
+            bottom, right = top + window_size, left + window_size
+            for table, out in ((self.sum, s), (self.sqsum, q)):
+                # S = I(y2, x2) - I(y1, x2) - I(y2, x1) + I(y1, x1)
+                np.subtract(
+                    table[bottom : bottom + rows, right : right + w],
+                    table[top : top + rows, right : right + w],
+                    out=out,
+                )
+                out -= table[bottom : bottom + rows, left : left + w]
+                out += table[top : top + rows, left : left + w]
+
+            s /= n
+            mean[y : y + rows] = s
+            # D = M(x^2) - M(x)^2, отрицательные значения - погрешность округления
+            q /= n
+            s *= s
+            q -= s
+            np.maximum(q, 0, out=q)
+            np.sqrt(q, out=q)
+            std[y : y + rows] = q
+
+        return mean, std
+
+
+class LocalStatisticsCache:
+    """
+    LRU-кэш полутонового изображения, интегральных изображений и карт
+    (среднее, отклонение) с ограничением по памяти
+
+    Ключ - (изображение, размер окна). Изображение определяется по
+    идентичности объекта: запись хранит ссылку на него, поэтому id не может
+    достаться другому массиву, пока запись в кэше. Изображения не должны
+    изменяться на месте после попадания в кэш.
+    """
+
+    DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # Кэш используется фоновой задачей и очищается из потока Tk
+        self.lock = threading.Lock()
+        self.total_bytes = 0
+        # ключ -> (изображение, значение, байт)
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def _get(self, key: tuple, image: np.ndarray):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] is not image:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def _put(self, key: tuple, image: np.ndarray, value, nbytes: int):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[2]
+            self.entries[key] = (image, value, nbytes)
+            self.total_bytes += nbytes
+            # Самые давно использованные записи вытесняются; новая остаётся,
+            # даже если одна больше бюджета
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, _, size) = self.entries.popitem(last=False)
+                self.total_bytes -= size
+
+    def grayscale(self, image: np.ndarray) -> np.ndarray:
+        """Изображение в градациях серого (BGR -> GRAY один раз на изображение)"""
+        if image.ndim == 2:
+            return image
+        key = ("gray", id(image))
+        gray = self._get(key, image)
+        if gray is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            self._put(key, image, gray, gray.nbytes)
+        return gray
+
+    def statistics(self, image: np.ndarray, executor=None) -> "CachedStatistics":
+        """
+        Статистика изображения с тем же интерфейсом, что у LocalStatistics;
+        executor (parallel.TileExecutor) - для расчёта карт по полосам
+        """
+        return CachedStatistics(self, image, executor)
+
+    def mean_std(
+        self, image: np.ndarray, window_size: int, executor=None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Карты среднего и отклонения полутонового варианта image"""
+        key = ("mean_std", id(image), window_size)
+        result = self._get(key, image)
+        if result is not None:
+            return result
+
+        tables_key = ("tables", id(image))
+        tables = self._get(tables_key, image)
+        if tables is None:
+            tables = LocalStatistics(self.grayscale(image))
+        result = tables.mean_std(window_size, executor)
+        # Размер таблиц мог вырасти, если окно больше запаса по краям
+        self._put(tables_key, image, tables, tables.nbytes)
+        self._put(key, image, result, result[0].nbytes + result[1].nbytes)
+        return result
+
+
+class CachedStatistics:
+    """Статистика одного изображения через LocalStatisticsCache"""
+
+    def __init__(self, cache: LocalStatisticsCache, image: np.ndarray, executor=None):
+        self.cache = cache
+        self.image = image
+        self.executor = executor
+
+    def mean_std(self, window_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.cache.mean_std(self.image, window_size, self.executor)
@@ -0,0 +1,136 @@
+"""
+Параллельное выполнение фильтров по горизонтальным полосам изображения
+
+Изображение делится на полосы во всю ширину, полосы обрабатываются в пуле
+потоков: OpenCV и NumPy отпускают GIL на время вычислений, поэтому потоки
+работают параллельно без копирования изображения между процессами.
+
+Фильтрам с окном полоса передаётся с полем (halo) сверху и снизу, которое
+затем отбрасывается. Слева и справа поле не нужно: полоса занимает всю
+ширину, и край полосы совпадает с краем изображения, где фильтр сам
+дополняет границу. Поэтому результат совпадает с обработкой изображения
+целиком бит в бит.
+"""
+
+import copy
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Строк в полосе: десятки полос на изображение 100 Мп - достаточно для
+# равномерной загрузки потоков, а промежуточные массивы полосы небольшие
+DEFAULT_STRIP_ROWS = 256
+
+
+class TileExecutor:
+    """Пул потоков для обработки изображения по полосам"""
+
+    def __init__(
+        self, workers: Optional[int] = None, strip_rows: int = DEFAULT_STRIP_ROWS
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.strip_rows = strip_rows
+        # Потоки пула создаются при первых задачах
+        self.pool: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tile")
+            if self.workers > 1
+            else None
+        )
+        # jobs.Job: отмена и прогресс проверяются после каждой полосы
+        self.job = None
+
+    def for_job(self, job) -> "TileExecutor":
+        """Тот же пул потоков, но с отменой и прогрессом задачи job"""
+        bound = copy.copy(self)
+        bound.job = job
+        return bound
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+
+    def strips(self, height: int, halo: int = 0) -> List[Tuple[int, int]]:
+        """Полосы (y0, y1); полоса не меньше 4 полей, чтобы поле не удваивало работу"""
+        rows = max(self.strip_rows, 4 * halo, 1)
+        return [(y0, min(y0 + rows, height)) for y0 in range(0, height, rows)]
+
+    def map(self, func: Callable, items: Iterable) -> Iterator:
+        """
+        Результаты func(item) в исходном порядке; одновременно выполняется
+        не больше 2 * workers задач, чтобы не держать в памяти все результаты
+        """
+        items = list(items)
+        job = self.job
+        if job is not None:
+            job.start_stage(len(items))
+
+        if self.pool is None:
+            for done, item in enumerate(items, 1):
+                result = func(item)
+                if job is not None:
+                    job.advance(done, len(items))
+                yield result
+            return
+
+        pending = deque()
+        done = 0
+        try:
+            for item in items:
+                pending.append(self.pool.submit(func, item))
+                if len(pending) < 2 * self.workers:
+                    continue
+                result = pending.popleft().result()
+                done += 1
+                if job is not None:
+                    job.advance(done, len(items))
+                yield result
+            while pending:
+                result = pending.popleft().result()
+                done += 1
+                if job is not None:
+                    job.advance(done, len(items))
+                yield result
+        finally:
+            # При отмене или ошибке ещё не начатые полосы не выполняются
+            for future in pending:
+                future.cancel()
+
+    def run_rows(self, height: int, func: Callable[[int, int], None], halo: int = 0):
+        """Вызов func(y0, y1) для каждой полосы; исключение из полосы пробрасывается"""
+        for _ in self.map(lambda strip: func(*strip), self.strips(height, halo)):
+            pass
+
+    def map_rows(
+        self, func: Callable[..., np.ndarray], *arrays: np.ndarray, halo: int = 0
+    ) -> np.ndarray:
+        """
+        Применение func к полосам массивов одинаковой высоты
+
+        func получает полосы всех arrays (с полем halo строк сверху и снизу,
+        обрезанным краями изображения) и возвращает результат той же высоты.
+        Выходной массив создаётся по результату первой полосы.
+        """
+        height = arrays[0].shape[0]
+        strips = self.strips(height, halo)
+        if len(strips) == 1:
+            return func(*arrays)
+
+        def process(strip: Tuple[int, int]) -> np.ndarray:
+            y0, y1 = strip
+            top, bottom = max(0, y0 - halo), min(height, y1 + halo)
+            result = func(*(array[top:bottom] for array in arrays))
+            return result[y0 - top : y1 - top]
+
+        first = process(strips[0])
+        output = np.empty((height,) + first.shape[1:], first.dtype)
+        output[: len(first)] = first
+
+        def store(strip: Tuple[int, int]):
+            output[strip[0] : strip[1]] = process(strip)
+
+        for _ in self.map(store, strips[1:]):
+            pass
+        return output
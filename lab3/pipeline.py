@@ -0,0 +1,439 @@
+"""
+Цепочки операций обработки изображений
+
+Pipeline - граф операций (grayscale, element, contrast, threshold), где
+каждый узел берёт результат другого узла или исходное изображение
+("source"). Узлы хранятся в порядке добавления, вход узла всегда раньше
+него, поэтому граф ацикличен и вычисляется одним проходом.
+
+Поэлементные операции и контрастирование отображают каждый байт в байт,
+поэтому подряд идущие такие узлы объединяются в одну таблицу из 256
+значений (LUT) и применяются к изображению за один проход cv2.LUT, без
+промежуточного изображения на каждом шаге. Таблица - композиция таблиц
+узлов из filters.py, поэтому результат совпадает с пошаговым бит в бит.
+Минимум и максимум для контрастирования внутри объединённой цепочки
+берутся по значениям, которые есть во входном изображении цепочки
+(гистограмма), пропущенным через уже построенную таблицу.
+
+Цепочка сохраняется в JSON и выполняется без интерфейса:
+    python pipeline.py chain.json input.png -o output.png
+    python pipeline.py chain.json scans/*.png -o results/
+"""
+
+import argparse
+import json
+import math
+import numbers
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+import filters
+from local_stats import LocalStatisticsCache
+from parallel import TileExecutor
+
+FORMAT_VERSION = 1
+SOURCE = "source"
+
+# Операция -> обязательные параметры
+OPERATIONS = {
+    "grayscale": (),
+    "element": ("operation", "value"),
+    "contrast": ("min_out", "max_out"),
+    "threshold": ("method", "window"),
+}
+# Операция -> необязательные параметры
+OPTIONAL = {
+    "grayscale": (),
+    "element": (),
+    "contrast": (),
+    "threshold": ("k", "c", "R"),
+}
+THRESHOLD_METHODS = ("niblack", "sauvola", "mean", "gaussian")
+
+# Операции, отображающие каждый байт в байт (объединяются в LUT)
+POINTWISE = ("element", "contrast")
+
+
+class PipelineError(ValueError):
+    pass
+
+
+class Pipeline:
+    """Граф операций над изображением"""
+
+    def __init__(self, nodes: Optional[List[dict]] = None, outputs=None):
+        self.nodes: List[dict] = []
+        # Узлы, результат которых возвращает run (по умолчанию последний)
+        self.outputs: List[str] = []
+        for node in nodes or ():
+            self.add(
+                node["op"],
+                input=node.get("input"),
+                id=node.get("id"),
+                **node.get("params", {}),
+            )
+        self.outputs = list(outputs or ())
+        self.validate()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def copy(self) -> "Pipeline":
+        return Pipeline.from_dict(self.to_dict())
+
+    def add(
+        self, op: str, input: Optional[str] = None, id: Optional[str] = None, **params
+    ) -> str:
+        """
+        Добавление узла; input - id узла-источника (по умолчанию последний
+        добавленный или исходное изображение). Возвращает id нового узла.
+        """
+        if input is None:
+            input = self.nodes[-1]["id"] if self.nodes else SOURCE
+        node = {
+            "id": str(id) if id is not None else str(len(self.nodes) + 1),
+            "op": op,
+            "input": input,
+            "params": params,
+        }
+        self._validate_node(node, {n["id"] for n in self.nodes})
+        self.nodes.append(node)
+        return node["id"]
+
+    # --- Проверка и сериализация -----------------------------------------
+
+    def _validate_node(self, node: dict, known: set):
+        op, params = node["op"], node["params"]
+        if node["id"] == SOURCE or node["id"] in known:
+            raise PipelineError(f"Повторяющийся id узла: {node['id']}")
+        if not isinstance(node["input"], str):
+            raise PipelineError(f"Узел {node['id']}: вход должен быть строкой")
+        if node["input"] != SOURCE and node["input"] not in known:
+            raise PipelineError(f"Узел {node['id']}: неизвестный вход {node['input']}")
+        if op not in OPERATIONS:
+            raise PipelineError(f"Узел {node['id']}: неизвестная операция {op}")
+        missing = [name for name in OPERATIONS[op] if name not in params]
+        if missing:
+            raise PipelineError(f"Узел {node['id']}: нет параметров {', '.join(missing)}")
+        unknown = [
+            name for name in params if name not in OPERATIONS[op] + OPTIONAL[op]
+        ]
+        if unknown:
+            raise PipelineError(
+                f"Узел {node['id']}: неизвестные параметры {', '.join(unknown)}"
+            )
+
+        def number(name: str, low=None, high=None, integer: bool = False):
+            value = params[name]
+            # bool - подкласс int, но в параметрах это ошибка описания
+            valid = (
+                isinstance(value, numbers.Integral if integer else numbers.Real)
+                and not isinstance(value, bool)
+                and math.isfinite(value)
+            )
+            if not valid:
+                kind = "целым числом" if integer else "числом"
+                raise PipelineError(f"Узел {node['id']}: {name} должен быть {kind}")
+            if (low is not None and value < low) or (high is not None and value > high):
+                raise PipelineError(
+                    f"Узел {node['id']}: {name} вне диапазона {low}..{high}"
+                )
+
+        if op == "element":
+            if params["operation"] not in filters.ELEMENT_OPERATIONS:
+                raise PipelineError(
+                    f"Узел {node['id']}: неизвестная операция {params['operation']}"
+                )
+            number("value")
+            if params["operation"] == "divide" and params["value"] == 0:
+                raise PipelineError(f"Узел {node['id']}: деление на ноль невозможно")
+        if op == "contrast":
+            number("min_out", 0, 255)
+            number("max_out", 0, 255)
+            if params["min_out"] >= params["max_out"]:
+                raise PipelineError(
+                    f"Узел {node['id']}: минимальное значение должно быть "
+                    "меньше максимального"
+                )
+        if op == "threshold":
+            if params["method"] not in THRESHOLD_METHODS:
+                raise PipelineError(
+                    f"Узел {node['id']}: неизвестный метод {params['method']}"
+                )
+            number("window", integer=True)
+            if params["window"] < 3 or params["window"] % 2 == 0:
+                raise PipelineError(
+                    f"Узел {node['id']}: размер окна должен быть нечётным и не меньше 3"
+                )
+            for name in ("k", "c"):
+                if name in params:
+                    number(name)
+            if "R" in params:
+                number("R")
+                if params["R"] <= 0:
+                    raise PipelineError(f"Узел {node['id']}: R должен быть больше 0")
+
+    def validate(self):
+        known = set()
+        for node in self.nodes:
+            known.add(node["id"])
+        for output in self.outputs:
+            if output not in known:
+                raise PipelineError(f"Неизвестный выход: {output}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": FORMAT_VERSION,
+            "nodes": [dict(node, params=dict(node["params"])) for node in self.nodes],
+            "outputs": list(self.outputs),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Pipeline":
+        if not isinstance(data, dict) or data.get("version") != FORMAT_VERSION:
+            raise PipelineError("Неподдерживаемый формат цепочки")
+        if not isinstance(data.get("nodes"), list):
+            raise PipelineError("nodes должен быть списком узлов")
+        if not isinstance(data.get("outputs", []), list):
+            raise PipelineError("outputs должен быть списком id узлов")
+        try:
+            return cls(data["nodes"], data.get("outputs"))
+        except (KeyError, TypeError) as e:
+            raise PipelineError(f"Некорректное описание узла: {e}") from e
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "Pipeline":
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise PipelineError(f"Некорректный JSON: {e}") from e
+        return cls.from_dict(data)
+
+    def describe(self) -> str:
+        """Краткое описание цепочки для интерфейса"""
+        parts = []
+        for node in self.nodes:
+            params = ", ".join(f"{k}={v}" for k, v in node["params"].items())
+            parts.append(f"{node['op']}({params})" if params else node["op"])
+        return " → ".join(parts)
+
+    # --- Выполнение ------------------------------------------------------
+
+    def plan(self) -> List[List[dict]]:
+        """
+        Этапы выполнения: список узлов, где подряд идущие поэлементные
+        узлы объединены в один этап. Узел присоединяется к этапу своего
+        входа, если вход - поэлементный узел, результат которого больше
+        никому не нужен.
+        """
+        consumers: Dict[str, int] = {}
+        for node in self.nodes:
+            consumers[node["input"]] = consumers.get(node["input"], 0) + 1
+
+        stages: List[List[dict]] = []
+        stage_of: Dict[str, List[dict]] = {}
+        for node in self.nodes:
+            stage = stage_of.get(node["input"])
+            if (
+                node["op"] in POINTWISE
+                and stage is not None
+                and stage[-1]["op"] in POINTWISE
+                and stage[-1]["id"] == node["input"]
+                and consumers[node["input"]] == 1
+                and node["input"] not in self.outputs
+            ):
+                stage.append(node)
+            else:
+                stage = [node]
+                stages.append(stage)
+            stage_of[node["id"]] = stage
+        return stages
+
+    def run(
+        self,
+        image: np.ndarray,
+        executor: Optional[TileExecutor] = None,
+        cache: Optional[LocalStatisticsCache] = None,
+    ):
+        """
+        Выполнение цепочки над image (uint8, GRAY или BGR)
+
+        Возвращает результат последнего узла или, если заданы outputs,
+        словарь id -> результат. cache - кэш локальной статистики для
+        Niblack/Sauvola (в приложении - общий с подбором k).
+        """
+        if not self.nodes:
+            return image if not self.outputs else {}
+        wanted = set(self.outputs) or {self.nodes[-1]["id"]}
+
+        # Сколько этапов ещё прочитают результат: промежуточные изображения
+        # освобождаются сразу после последнего использования
+        stages = self.plan()
+        readers: Dict[str, int] = {}
+        for stage in stages:
+            readers[stage[0]["input"]] = readers.get(stage[0]["input"], 0) + 1
+
+        results = {SOURCE: image}
+        for stage in stages:
+            source_id = stage[0]["input"]
+            source = results[source_id]
+            if stage[0]["op"] in POINTWISE:
+                result = filters.apply_lut(source, stage_lut(stage, source), executor)
+            else:
+                result = run_node(stage[0], source, executor, cache)
+            results[stage[-1]["id"]] = result
+
+            readers[source_id] -= 1
+            if readers[source_id] == 0 and source_id not in wanted | {SOURCE}:
+                del results[source_id]
+
+        if not self.outputs:
+            return results[self.nodes[-1]["id"]]
+        return {output: results[output] for output in self.outputs}
+
+
+def present_values(image: np.ndarray) -> np.ndarray:
+    """Маска из 256 значений: какие байты встречаются в изображении"""
+    # cv2.calcHist по uint8 в разы быстрее np.bincount, которому нужна
+    # int64-копия; каналы BGR разворачиваются в строку одноканального массива
+    hist = cv2.calcHist([image.reshape(image.shape[0], -1)], [0], None, [256], [0, 256])
+    return hist.ravel() > 0
+
+
+def stage_lut(stage: List[dict], source: np.ndarray) -> np.ndarray:
+    """
+    Таблица 256 значений для цепочки поэлементных узлов: композиция таблиц
+    узлов (lut[i] - результат всей цепочки для байта i)
+    """
+    lut = filters.BYTE_VALUES
+    present = None
+    for node in stage:
+        params = node["params"]
+        if node["op"] == "element":
+            step = filters.element_lut(params["operation"], params["value"])
+        else:
+            if present is None:
+                present = present_values(source)
+            # Минимум и максимум изображения после предыдущих узлов
+            values = lut[present]
+            step = filters.contrast_lut(
+                params["min_out"],
+                params["max_out"],
+                np.float32(values.min()),
+                np.float32(values.max()),
+            )
+        lut = step[lut]
+    return lut
+
+
+def run_node(
+    node: dict,
+    image: np.ndarray,
+    executor: Optional[TileExecutor] = None,
+    cache: Optional[LocalStatisticsCache] = None,
+) -> np.ndarray:
+    """Выполнение одного узла без объединения"""
+    op, params = node["op"], node["params"]
+    if op in POINTWISE:
+        return filters.apply_lut(image, stage_lut([node], image), executor)
+
+    gray = cache.grayscale(image) if cache is not None else filters.to_grayscale(image)
+    if op == "grayscale":
+        return gray
+
+    method, window = params["method"], params["window"]
+    if method in ("mean", "gaussian"):
+        return filters.adaptive_threshold(
+            gray, method, window, params.get("c", 2), executor
+        )
+
+    stats = cache.statistics(image, executor) if cache is not None else None
+    if method == "niblack":
+        threshold = filters.niblack_threshold(
+            gray, window, params.get("k", -0.2), stats, executor
+        )
+    else:
+        threshold = filters.sauvola_threshold(
+            gray, window, params.get("k", 0.2), params.get("R", 128), stats, executor
+        )
+    return filters.binarize(gray, threshold, executor)
+
+
+def output_images(output: str, result) -> Dict[str, np.ndarray]:
+    """
+    Файл -> изображение для результата run: один файл output или, если
+    run вернул словарь выходов, output с суффиксом _<id> для каждого
+    """
+    if not isinstance(result, dict):
+        return {output: result}
+    stem, ext = os.path.splitext(output)
+    return {f"{stem}_{node_id}{ext}": image for node_id, image in result.items()}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Выполнение сохранённой цепочки операций над изображениями"
+    )
+    parser.add_argument("pipeline", help="цепочка (JSON)")
+    parser.add_argument("input", nargs="+", help="исходные изображения")
+    parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        help="файл результата или, для нескольких изображений, папка; если в "
+        "цепочке заданы outputs, каждый выход пишется в <имя>_<id выхода>.<расширение>",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="потоков (по умолчанию - по числу ядер)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        pipeline = Pipeline.load(args.pipeline)
+    except (OSError, PipelineError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+    batch = len(args.input) > 1 or os.path.isdir(args.output)
+    if batch:
+        os.makedirs(args.output, exist_ok=True)
+    executor = TileExecutor(args.workers)
+    failed = 0
+    try:
+        for path in args.input:
+            image = cv2.imread(path)
+            if image is None:
+                print(f"Ошибка: не удалось загрузить {path}", file=sys.stderr)
+                failed += 1
+                continue
+            result = pipeline.run(image, executor)
+            output = (
+                os.path.join(args.output, os.path.basename(path)) if batch else args.output
+            )
+            for output, image in output_images(output, result).items():
+                try:
+                    saved = cv2.imwrite(output, image)
+                except cv2.error:
+                    saved = False
+                if not saved:
+                    print(f"Ошибка: не удалось сохранить {output}", file=sys.stderr)
+                    failed += 1
+    finally:
+        executor.shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
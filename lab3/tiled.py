@@ -0,0 +1,427 @@
+"""
+Обработка изображений больше оперативной памяти по тайлам
+
+Изображение читается частями из отображённого в память файла (BMP без
+сжатия, .npy) или, для остальных форматов, из cv2.imread. Каждый тайл
+обрабатывается с полем (halo) шириной в половину окна фильтра, поле
+отбрасывается, а результат сразу записывается в выходной файл (BMP или
+.npy), отображённый в память. В памяти одновременно находятся только
+несколько тайлов, поэтому размер изображения ограничен диском, а не RAM.
+
+Пример:
+    python tiled.py scan.bmp result.bmp sauvola --window 25 --k 0.3
+"""
+
+import argparse
+import struct
+import sys
+from typing import Callable, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import filters
+from parallel import TileExecutor
+
+DEFAULT_TILE_SIZE = 1024
+
+# Окраска границы, которую использует фильтр: поле тайла на краю
+# изображения заполняется так же, как фильтр дополнил бы всё изображение
+BORDER_REFLECT = cv2.BORDER_REFLECT_101
+BORDER_REPLICATE = cv2.BORDER_REPLICATE
+
+
+# --- Источники -------------------------------------------------------------
+
+
+class ArraySource:
+    """Изображение в виде массива (в памяти или np.memmap)"""
+
+    def __init__(self, array: np.ndarray, palette: Optional[np.ndarray] = None):
+        self.array = array
+        # Палитра BMP (256 x 3, BGR), если пиксели - индексы цветов
+        self.palette = palette
+        self.height, self.width = array.shape[:2]
+        self.channels = 1 if array.ndim == 2 and palette is None else 3
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        if self.channels == 1:
+            return (self.height, self.width)
+        return (self.height, self.width, self.channels)
+
+    def read(self, y0: int, y1: int, x0: int, x1: int) -> np.ndarray:
+        """Копия области [y0:y1, x0:x1] (uint8, GRAY или BGR)"""
+        region = np.ascontiguousarray(self.array[y0:y1, x0:x1])
+        if self.palette is not None:
+            region = self.palette[region]
+        elif region.ndim == 3 and region.shape[2] == 4:
+            region = np.ascontiguousarray(region[:, :, :3])
+        return region
+
+
+def _is_gray_palette(palette: np.ndarray) -> bool:
+    levels = np.arange(len(palette), dtype=np.uint8)
+    return bool((palette == levels[:, None]).all())
+
+
+def open_bmp(path: str) -> ArraySource:
+    """
+    BMP без сжатия (8, 24 или 32 бита), отображённый в память
+
+    Строки BMP хранятся снизу вверх и выровнены до 4 байт - массив
+    строится как представление файла с отрицательным шагом по строкам.
+    """
+    with open(path, "rb") as f:
+        header = f.read(54)
+        if len(header) < 54 or header[:2] != b"BM":
+            raise ValueError(f"{path}: не BMP файл")
+        offset = struct.unpack_from("<I", header, 10)[0]
+        dib_size = struct.unpack_from("<I", header, 14)[0]
+        width, height = struct.unpack_from("<ii", header, 18)
+        bits, compression = struct.unpack_from("<HI", header, 28)
+        colors = struct.unpack_from("<I", header, 46)[0]
+
+        if bits not in (8, 24, 32) or compression not in (0, 3):
+            raise ValueError(f"{path}: поддерживаются только BMP 8/24/32 бит без сжатия")
+        if compression == 3 and bits != 32:
+            raise ValueError(f"{path}: BMP с битовыми масками не поддерживается")
+        if compression == 3:
+            # Маски R, G, B идут сразу после 40-байтного заголовка
+            # (в BITMAPV4/V5 - внутри него, по тому же смещению)
+            masks = struct.unpack("<III", f.read(12))
+            if masks != (0xFF0000, 0xFF00, 0xFF):
+                raise ValueError(f"{path}: нестандартные битовые маски BMP")
+
+        palette = None
+        if bits == 8:
+            f.seek(14 + dib_size)
+            entries = np.frombuffer(f.read(4 * (colors or 256)), np.uint8)
+            palette = np.zeros((256, 3), np.uint8)
+            palette[: len(entries) // 4] = entries.reshape(-1, 4)[:, :3]
+
+    top_down = height < 0
+    height = abs(height)
+    pixel_bytes = bits // 8
+    stride = (width * bits + 31) // 32 * 4
+    raw = np.memmap(path, np.uint8, "r", offset=offset, shape=(height, stride))
+
+    if pixel_bytes == 1:
+        array = raw[:, :width]
+    else:
+        array = np.ndarray(
+            (height, width, pixel_bytes),
+            np.uint8,
+            buffer=raw,
+            strides=(stride, pixel_bytes, 1),
+        )
+    if not top_down:
+        array = array[::-1]
+
+    if palette is not None and _is_gray_palette(palette):
+        palette = None
+    return ArraySource(array, palette)
+
+
+def open_source(path: str) -> ArraySource:
+    """
+    Источник тайлов: BMP и .npy отображаются в память, остальные форматы
+    читаются cv2.imread целиком
+    """
+    lower = path.lower()
+    if lower.endswith(".bmp"):
+        try:
+            return open_bmp(path)
+        except ValueError:
+            # Сжатые и необычные BMP читает OpenCV
+            pass
+    elif lower.endswith(".npy"):
+        array = np.load(path, mmap_mode="r")
+        if array.dtype != np.uint8 or array.ndim not in (2, 3):
+            raise ValueError(f"{path}: ожидается массив uint8 (H x W или H x W x 3)")
+        return ArraySource(array)
+
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"{path}: не удалось загрузить изображение")
+    if image.dtype != np.uint8:
+        raise ValueError(f"{path}: поддерживаются только 8-битные изображения")
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = image[:, :, :3]
+    return ArraySource(image)
+
+
+# --- Запись ----------------------------------------------------------------
+
+
+def create_bmp(path: str, height: int, width: int, channels: int) -> np.ndarray:
+    """
+    Новый BMP (8 бит с серой палитрой или 24 бита), отображённый в память;
+    возвращает массив пикселей сверху вниз
+    """
+    bits = 8 if channels == 1 else 24
+    stride = (width * bits + 31) // 32 * 4
+    palette = (
+        np.repeat(np.arange(256, dtype=np.uint8), 4).reshape(256, 4)
+        if channels == 1
+        else np.zeros((0, 4), np.uint8)
+    )
+    palette[:, 3:] = 0
+    offset = 14 + 40 + palette.nbytes
+    size = offset + stride * height
+
+    with open(path, "wb") as f:
+        f.write(struct.pack("<2sIHHI", b"BM", size, 0, 0, offset))
+        f.write(
+            struct.pack(
+                "<IiiHHIIiiII", 40, width, height, 1, bits, 0, stride * height,
+                2835, 2835, len(palette), 0,
+            )
+        )
+        f.write(palette.tobytes())
+        f.truncate(size)
+
+    raw = np.memmap(path, np.uint8, "r+", offset=offset, shape=(height, stride))
+    if channels == 1:
+        array = raw[:, :width]
+    else:
+        array = np.ndarray(
+            (height, width, 3), np.uint8, buffer=raw, strides=(stride, 3, 1)
+        )
+    # BMP хранится снизу вверх
+    return array[::-1]
+
+
+def create_output(path: str, height: int, width: int, channels: int) -> np.ndarray:
+    """Выходной файл (BMP или .npy), отображённый в память"""
+    shape = (height, width) if channels == 1 else (height, width, channels)
+    if path.lower().endswith(".npy"):
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+    if path.lower().endswith(".bmp"):
+        return create_bmp(path, height, width, channels)
+    raise ValueError("Поддерживается запись только в BMP и .npy")
+
+
+def _flush(array: np.ndarray):
+    base = array
+    while base is not None and not isinstance(base, np.memmap):
+        base = base.base
+    if base is not None:
+        base.flush()
+
+
+# --- Обработка -------------------------------------------------------------
+
+
+def tile_grid(
+    height: int, width: int, tile_size: int = DEFAULT_TILE_SIZE
+) -> Iterator[Tuple[int, int, int, int]]:
+    """Тайлы (y0, y1, x0, x1) построчно"""
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def read_tile(
+    source: ArraySource,
+    y0: int,
+    y1: int,
+    x0: int,
+    x1: int,
+    halo: int = 0,
+    border: int = BORDER_REFLECT,
+) -> np.ndarray:
+    """
+    Тайл с полем halo со всех сторон. Внутри изображения поле берётся из
+    соседних пикселей, за его краем - дополняется как border, поэтому
+    результат фильтра внутри тайла совпадает с обработкой изображения целиком.
+    """
+    ry0, ry1 = max(0, y0 - halo), min(source.height, y1 + halo)
+    rx0, rx1 = max(0, x0 - halo), min(source.width, x1 + halo)
+    region = source.read(ry0, ry1, rx0, rx1)
+    top, bottom = halo - (y0 - ry0), halo - (ry1 - y1)
+    left, right = halo - (x0 - rx0), halo - (rx1 - x1)
+    if top or bottom or left or right:
+        region = cv2.copyMakeBorder(region, top, bottom, left, right, border)
+    return region
+
+
+def process_tiled(
+    source: ArraySource,
+    output_path: str,
+    func: Callable[[np.ndarray], np.ndarray],
+    halo: int = 0,
+    border: int = BORDER_REFLECT,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None,
+    executor: Optional[TileExecutor] = None,
+) -> np.ndarray:
+    """
+    Применение func к каждому тайлу с полем halo и запись результата в файл
+
+    func получает тайл с полем и возвращает массив того же размера (по
+    высоте и ширине); количество каналов результата определяется по первому
+    тайлу. С executor тайлы обрабатываются в пуле потоков (в памяти не больше
+    2 * workers тайлов), запись идёт в исходном порядке. Возвращает выходной
+    массив, отображённый в память.
+    """
+    tiles = list(tile_grid(source.height, source.width, tile_size))
+
+    def process(tile):
+        y0, y1, x0, x1 = tile
+        result = func(read_tile(source, y0, y1, x0, x1, halo, border))
+        return result[halo : halo + y1 - y0, halo : halo + x1 - x0]
+
+    results = map(process, tiles) if executor is None else executor.map(process, tiles)
+    output = None
+    for done, ((y0, y1, x0, x1), result) in enumerate(zip(tiles, results), 1):
+        if output is None:
+            channels = 1 if result.ndim == 2 else result.shape[2]
+            output = create_output(output_path, source.height, source.width, channels)
+        output[y0:y1, x0:x1] = result
+        if progress is not None:
+            progress(done, len(tiles))
+    _flush(output)
+    return output
+
+
+def min_max(source: ArraySource, tile_size: int = DEFAULT_TILE_SIZE) -> Tuple[int, int]:
+    """Минимум и максимум яркости по всему изображению (проход по тайлам)"""
+    low, high = 255, 0
+    for y0, y1, x0, x1 in tile_grid(source.height, source.width, tile_size):
+        tile = source.read(y0, y1, x0, x1)
+        low, high = min(low, int(tile.min())), max(high, int(tile.max()))
+    return low, high
+
+
+# --- Операции --------------------------------------------------------------
+
+
+def make_operation(
+    name: str, source: ArraySource, **params
+) -> Tuple[Callable[[np.ndarray], np.ndarray], int, int]:
+    """
+    Функция обработки тайла, ширина поля и окраска границы для операции
+    name ("niblack", "sauvola", "adaptive_mean", "adaptive_gaussian",
+    "add", "subtract", "multiply", "divide", "contrast")
+    """
+    if name in ("niblack", "sauvola"):
+        window, k = params["window"], params["k"]
+        threshold = (
+            filters.niblack_threshold if name == "niblack" else filters.sauvola_threshold
+        )
+
+        def func(tile):
+            gray = filters.to_grayscale(tile)
+            return filters.binarize(gray, threshold(gray, window, k))
+
+        # Как cv2.blur (BORDER_REFLECT_101) в исходной реализации
+        return func, window // 2, BORDER_REFLECT
+
+    if name in ("adaptive_mean", "adaptive_gaussian"):
+        window, c = params["window"], params["c"]
+        method = name.split("_", 1)[1]
+
+        def func(tile):
+            return filters.adaptive_threshold(
+                filters.to_grayscale(tile), method, window, c
+            )
+
+        # cv2.adaptiveThreshold дополняет границу повторением крайних пикселей
+        return func, window // 2, BORDER_REPLICATE
+
+    if name in filters.ELEMENT_OPERATIONS:
+        value = params["value"]
+
+        def func(tile):
+            return filters.element_operation(tile, name, value)
+
+        return func, 0, BORDER_REFLECT
+
+    if name == "contrast":
+        # Минимум и максимум нужны по всему изображению - отдельный проход
+        low, high = min_max(source)
+        min_in, max_in = np.float32(low), np.float32(high)
+        min_out, max_out = params["min_out"], params["max_out"]
+
+        def func(tile):
+            return filters.linear_contrast(tile, min_out, max_out, min_in, max_in)
+
+        return func, 0, BORDER_REFLECT
+
+    raise ValueError(f"Неизвестная операция: {name}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Обработка больших изображений по тайлам с записью результата на диск"
+    )
+    parser.add_argument(
+        "input", help="исходное изображение (BMP и .npy читаются без загрузки в память)"
+    )
+    parser.add_argument("output", help="результат (BMP или .npy)")
+    parser.add_argument(
+        "operation",
+        choices=("niblack", "sauvola", "adaptive_mean", "adaptive_gaussian")
+        + filters.ELEMENT_OPERATIONS
+        + ("contrast",),
+    )
+    parser.add_argument("--window", type=int, default=15, help="размер окна (нечётный)")
+    parser.add_argument("--k", type=float, default=None, help="k для Niblack/Sauvola")
+    parser.add_argument("--c", type=float, default=2, help="C для адаптивного порога")
+    parser.add_argument("--value", type=float, default=50, help="значение поэлементной операции")
+    parser.add_argument("--min-out", type=int, default=0)
+    parser.add_argument("--max-out", type=int, default=255)
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="потоков (по умолчанию - по числу ядер)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.window % 2 == 0:
+        args.window += 1
+    if args.k is None:
+        args.k = -0.2 if args.operation == "niblack" else 0.2
+
+    try:
+        source = open_source(args.input)
+        func, halo, border = make_operation(
+            args.operation,
+            source,
+            window=args.window,
+            k=args.k,
+            c=args.c,
+            value=args.value,
+            min_out=args.min_out,
+            max_out=args.max_out,
+        )
+
+        def progress(done, total):
+            print(f"\rТайлов: {done} из {total}", end="", file=sys.stderr)
+
+        executor = TileExecutor(args.workers)
+        try:
+            process_tiled(
+                source,
+                args.output,
+                func,
+                halo,
+                border,
+                args.tile_size,
+                progress,
+                executor,
+            )
+        finally:
+            executor.shutdown()
+        print(file=sys.stderr)
+    except (ValueError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())